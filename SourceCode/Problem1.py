@@ -1,4 +1,7 @@
 # Import necessary libraries
+import argparse
+import json
+import os
 import time
 import pandas as pd
 from collections import Counter
@@ -6,25 +9,31 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup, Comment
+import lxml.html
+import re
 import sys
+import threading
 import traceback
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
+import requests
+from results_io import RESULTS_FEATHER, to_typed_results, write_results, export_results_csv, read_results
+from scraping_utils import HostRateLimiter, DriverPool, fetch_concurrently, create_http_session, fetch_html, default_page_cache
 
 # Safe text retrieval function, returns 'N/a' on error
+# (lxml equivalent of BeautifulSoup's get_text(strip=True): stripped strings joined, comments skipped)
 def safe_get_text(element, default='N/a'):
-    if not element: return default
-    text = element.get_text(strip=True)
+    if element is None: return default
+    text = ''.join(s.strip() for s in element.itertext())
     return text or default
 
 # Function to process nationality (for 3-letter codes)
 def get_nationality(td_element):
     if td_element is None: return 'N/a'
     try:
-        strings = list(td_element.stripped_strings)
+        strings = [s.strip() for s in td_element.itertext() if s.strip()]
         full_text = ' '.join(strings)
         if not full_text: return 'N/a'
         parts = full_text.split()
@@ -35,8 +44,8 @@ def get_nationality(td_element):
              if len(part) == 3 and part.isupper() and part.isalpha():
                   return part
         # If not found, check text within link (if any)
-        link = td_element.find('a')
-        if link:
+        link = td_element.find('.//a')
+        if link is not None:
             link_text = safe_get_text(link)
             if link_text != 'N/a' and len(link_text) >= 2 and len(link_text) <= 4 and link_text.isupper() and link_text.isalpha():
                 return link_text
@@ -101,51 +110,128 @@ def calculate_age(age_or_birth_str, current_year=None):
     except (ValueError, TypeError): pass
     return 'N/a'
 
-# Function to scrape a table from a given URL
-def scrape_fbref_table(driver, url, table_id=None, required_stats=None, min_minutes=90):
+# XPath lookup for the class-based fallback (plain string: compiled lxml XPath objects are not thread-safe)
+STATS_TABLE_BY_CLASS = '//table[contains(concat(" ", normalize-space(@class), " "), " stats_table ")]'
+TABLE_WITH_ID_RE = re.compile(r'<table\b[^>]*?\bid="([^"]+)"')
+
+# Function to cut the raw HTML of the table with the given ID out of a page (live or commented out).
+# Returns (fragment, in_comment) or (None, False); only a substring search, no parsing.
+def slice_table_fragment(html, table_id):
+    id_pos = html.find(f'id="{table_id}"')
+    while id_pos >= 0:
+        start = html.rfind('<table', 0, id_pos)
+        if start >= 0 and '>' not in html[start:id_pos]: # The id belongs to this <table> tag
+            end = html.find('</table>', id_pos)
+            if end < 0: return None, False
+            in_comment = html.rfind('<!--', 0, start) > html.rfind('-->', 0, start)
+            return html[start:end + len('</table>')], in_comment
+        id_pos = html.find(f'id="{table_id}"', id_pos + 1)
+    return None, False
+
+# Function to collect every commented-out table of a page in one scan: {table_id: raw table HTML}.
+# fbref ships most stats tables inside HTML comments; only the fragments that are used get parsed.
+def extract_commented_tables(html):
+    tables = {}
+    pos = html.find('<!--')
+    while pos >= 0:
+        end = html.find('-->', pos + 4)
+        if end < 0: break
+        for match in TABLE_WITH_ID_RE.finditer(html, pos + 4, end):
+            close = html.find('</table>', match.end(), end)
+            if close >= 0: tables.setdefault(match.group(1), html[match.start():close + len('</table>')])
+        pos = html.find('<!--', end + 3)
+    return tables
+
+# Function to locate a stats table in page HTML: by ID via a raw-HTML slice,
+# otherwise the first 'stats_table' in the live DOM, then in HTML comments.
+def find_fbref_table(html, table_id=None):
+    if table_id:
+        fragment, in_comment = slice_table_fragment(html, table_id)
+        if fragment is not None:
+            if in_comment: print(f"  Found table with ID {table_id} in HTML comment.")
+            return lxml.html.fragment_fromstring(fragment)
+    found = lxml.html.fromstring(html).xpath(STATS_TABLE_BY_CLASS)
+    if found: return found[0]
+    for fragment in extract_commented_tables(html).values():
+        table = lxml.html.fragment_fromstring(fragment)
+        if 'stats_table' in (table.get('class') or '').split():
+            print("  Found table in HTML comment.")
+            return table
+    return None
+
+# Function to render a page in Chrome and return its HTML (fallback when plain HTTP lacks the table)
+def fetch_html_with_selenium(driver, url, table_id=None):
+    driver.get(url)
+    print("  Page requested in Chrome. Waiting for table...")
+    wait_time = 25
+    locator = (By.ID, table_id) if table_id else (By.CSS_SELECTOR, "table.stats_table")
+    print(f"  Waiting for table with {'ID: ' + table_id if table_id else 'class stats_table'}")
+    try:
+        WebDriverWait(driver, wait_time).until(EC.visibility_of_element_located(locator))
+        print(f"  Table {locator} visible.")
+    except TimeoutException:
+        print(f"  Warning: Table {locator} not visible within {wait_time}s on {url}. Checking HTML comments...")
+    return driver.page_source
+
+# Function to scrape a table from a given URL.
+# Tries the pooled HTTP session first; Chrome (from driver_pool) is only started when that fails.
+# With a page_cache, unchanged pages are served from disk (see scraping_utils.PageCache).
+# table_store (dict shared between calls) collects every commented table of each downloaded page,
+# so a category whose table already arrived with another page needs no download of its own.
+def scrape_fbref_table(url, table_id=None, required_stats=None, min_minutes=90, session=None, driver_pool=None, rate_limiter=None, page_cache=None, table_store=None):
     print(f"Attempting to scrape data from: {url}")
     try:
-        driver.get(url)
-        print("  Page requested. Waiting for table...")
-
-        wait_time = 25
-        locator = (By.ID, table_id) if table_id else (By.CSS_SELECTOR, "table.stats_table")
-        print(f"  Waiting for table with {'ID: ' + table_id if table_id else 'class stats_table'}")
-
-        try:
-            WebDriverWait(driver, wait_time).until(EC.visibility_of_element_located(locator))
-            print(f"  Table {locator} visible.")
-        except TimeoutException:
-            print(f"  Warning: Table {locator} not visible within {wait_time}s on {url}. Checking HTML comments...")
-
-        time.sleep(1) # Allow JS to fully render
-        html = driver.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-        print("  Parsed page source.")
-
-        data_table = soup.find('table', {'id': table_id}) if table_id else None
-        if not data_table: data_table = soup.find('table', {'class': lambda x: x and 'stats_table' in x.split()})
-
-        if not data_table: # Check HTML comments
-            comments = soup.find_all(string=lambda text: isinstance(text, Comment))
-            for comment in comments:
-                comment_soup = BeautifulSoup(comment, 'html.parser')
-                potential_table = comment_soup.find('table', {'id': table_id}) if table_id else None
-                if not potential_table: potential_table = comment_soup.find('table', {'class': lambda x: x and 'stats_table' in x.split()})
-                if potential_table:
-                    print(f"  Found table {'with ID '+table_id if table_id else ''} in HTML comment.")
-                    data_table = potential_table
-                    break
-        if not data_table:
+        data_table = None
+        if table_store is not None and table_id in table_store:
+            print(f"  Table {table_id} already extracted from another page. Skipping download.")
+            data_table = lxml.html.fragment_fromstring(table_store[table_id])
+        if data_table is None and session is not None:
+            try:
+                html = fetch_html(session, url, rate_limiter=rate_limiter, cache=page_cache)
+                print(f"  Got {len(html)} characters of HTML.")
+                if table_store is not None: table_store.update(extract_commented_tables(html))
+                data_table = find_fbref_table(html, table_id)
+                if data_table is None: print(f"  Warning: Table not in HTTP response for {url}. Falling back to Selenium...")
+            except requests.RequestException as http_err:
+                print(f"  Warning: HTTP fetch failed for {url} ({http_err}). Falling back to Selenium...")
+
+        if data_table is None and driver_pool is not None:
+            if rate_limiter is not None: rate_limiter.acquire(url)
+            with driver_pool.driver() as driver:
+                html = fetch_html_with_selenium(driver, url, table_id)
+            print("  Parsed page source.")
+            data_table = find_fbref_table(html, table_id)
+            if data_table is not None and page_cache is not None: page_cache.put(url, html) # Rendered copy, no validators
+
+        if data_table is None:
             print(f"Error: Table not found on {url}.")
             return pd.DataFrame()
 
+        return parse_fbref_table(data_table, url, required_stats=required_stats, min_minutes=min_minutes)
+    except TimeoutException as e:
+        print(f"Scraping error for {url}: Page element timed out. {e}")
+    except Exception as e:
+        print(f"Unknown error scraping {url}: {e}\nTraceback: {traceback.format_exc()}")
+    return pd.DataFrame()
+
+# Function to decode one table row in a single pass: {data-stat: cell} for the first cell of each stat
+def decode_row(row):
+    cells = {}
+    for cell in row:
+        if cell.tag in ('th', 'td'):
+            stat = (cell.get('data-stat') or '').strip()
+            if stat and stat not in cells: cells[stat] = cell
+    return cells
+
+# Function to turn a located stats table (lxml element) into a (Player, Team)-indexed DataFrame
+def parse_fbref_table(data_table, url, required_stats=None, min_minutes=90):
+    try:
         tbody = data_table.find('tbody')
-        rows = tbody.find_all('tr') if tbody else [r for r in data_table.find_all('tr') if r.find(['th', 'td'], {'data-stat': True}) and not r.find('th', {'scope':'col'})]
-        if not tbody and not rows:
+        rows = tbody.findall('tr') if tbody is not None else [r for r in data_table.iter('tr') if any(c.get('data-stat') is not None for c in r if c.tag in ('th', 'td')) and not r.xpath('./th[@scope="col"]')]
+        if tbody is None and not rows:
             print(f"Error: No data rows found in table on {url}")
             return pd.DataFrame()
-        elif not tbody:
+        elif tbody is None:
             print(f"  Found {len(rows)} potential data rows directly in table.")
 
         print(f"  Found {len(rows)} rows for {url}. Processing...")
@@ -157,28 +243,30 @@ def scrape_fbref_table(driver, url, table_id=None, required_stats=None, min_minu
         else: # If no required_stats, get from header
              print("  Warning: No specific list of required stats, will fetch from table header.")
              thead = data_table.find('thead')
-             if thead and (header_rows := thead.find_all('tr')):
+             if thead is not None and (header_rows := thead.findall('tr')):
                  last_header_row = header_rows[-1]
-                 header_stats = {th.get('data-stat', '').strip() for th in last_header_row.find_all('th')}
+                 header_stats = {(th.get('data-stat') or '').strip() for th in last_header_row.iter('th')}
                  stats_to_extract.update(stat for stat in header_stats if stat and stat not in ['ranker', 'matches', 'match_report'])
                  print(f"  Dynamically fetching stats from header: {sorted(list(stats_to_extract - base_stats_needed))}")
 
         players_data = []
         collected_count, skipped_header, skipped_minutes, skipped_no_player = 0, 0, 0, 0
 
-        for i, row in enumerate(rows):
-            if row.has_attr('class') and any(c in row['class'] for c in ['thead', 'partial_table', 'spacer']):
+        for row in rows:
+            if any(c in ('thead', 'partial_table', 'spacer') for c in (row.get('class') or '').split()):
                 skipped_header += 1; continue
-            if not row.find(['th','td'], {'data-stat' : True}): continue
+            cells = decode_row(row)
+            if not cells: continue
 
-            player_cell = row.find(['th', 'td'], {'data-stat': 'player'})
-            player_name = safe_get_text(player_cell)
+            player_name = safe_get_text(cells.get('player'))
             if player_name == 'N/a' or player_name == '' or player_name == 'Player':
                 skipped_no_player += 1; continue
 
             minutes_played_num = -1
-            minutes_td = row.find('td', {'data-stat': 'minutes'})
-            minutes_90s_td = row.find('td', {'data-stat': 'minutes_90s'})
+            minutes_td = cells.get('minutes')
+            minutes_90s_td = cells.get('minutes_90s')
+            if minutes_td is not None and minutes_td.tag != 'td': minutes_td = None
+            if minutes_90s_td is not None and minutes_90s_td.tag != 'td': minutes_90s_td = None
             minutes_str = safe_get_text(minutes_td, '').replace(',', '')
             minutes_90s_str = safe_get_text(minutes_90s_td, '').replace(',', '')
 
@@ -196,48 +284,35 @@ def scrape_fbref_table(driver, url, table_id=None, required_stats=None, min_minu
                  skipped_minutes += 1; continue
 
             player_stats = {}
-            all_cells = row.find_all(['th', 'td'])
-            processed_stats_in_row = set()
-
-            for cell in all_cells:
-                stat = cell.get('data-stat', '').strip()
-                if stat and stat in stats_to_extract and stat not in processed_stats_in_row:
-                    processed_stats_in_row.add(stat)
-                    if stat == 'nationality': player_stats['nationality'] = get_nationality(cell)
-                    elif stat == 'birth_year' or stat == 'age': # 'age' column often contains birth year or age
-                         age_birth_text = safe_get_text(cell)
-                         if 'original_age_value' not in player_stats: player_stats['original_age_value'] = age_birth_text
-                         calculated_age = calculate_age(age_birth_text)
-                         if calculated_age != 'N/a': player_stats['Age'] = calculated_age
-                         elif player_stats.get('Age', 'N/a') == 'N/a': player_stats['Age'] = age_birth_text if age_birth_text != 'N/a' else 'N/a'
-                    elif stat == 'player': player_stats['Player'] = player_name
-                    elif stat == 'team':
-                         team_name = safe_get_text(cell.find('a'), default=safe_get_text(cell))
-                         player_stats['Team'] = team_name
-                    elif stat == 'position':
-                         position_text = safe_get_text(cell)
-                         player_stats['Position'] = position_text.split(',')[0].strip() if ',' in position_text and position_text.split(',')[0].strip() else position_text
-                    elif stat == 'minutes': player_stats['minutes'] = minutes_str or '0'
-                    elif stat == 'minutes_90s': player_stats['minutes_90s'] = minutes_90s_str or '0.0'
-                    else: player_stats[stat] = safe_get_text(cell)
-
-            # Fallbacks for essential columns if not picked up by general loop
+            for stat, cell in cells.items():
+                if stat not in stats_to_extract: continue
+                if stat == 'nationality': player_stats['nationality'] = get_nationality(cell)
+                elif stat == 'birth_year' or stat == 'age': # 'age' column often contains birth year or age
+                     age_birth_text = safe_get_text(cell)
+                     if 'original_age_value' not in player_stats: player_stats['original_age_value'] = age_birth_text
+                     calculated_age = calculate_age(age_birth_text)
+                     if calculated_age != 'N/a': player_stats['Age'] = calculated_age
+                     elif player_stats.get('Age', 'N/a') == 'N/a': player_stats['Age'] = age_birth_text if age_birth_text != 'N/a' else 'N/a'
+                elif stat == 'player': player_stats['Player'] = player_name
+                elif stat == 'team':
+                     player_stats['Team'] = safe_get_text(cell.find('.//a'), default=safe_get_text(cell))
+                elif stat == 'position':
+                     position_text = safe_get_text(cell)
+                     player_stats['Position'] = position_text.split(',')[0].strip() if ',' in position_text and position_text.split(',')[0].strip() else position_text
+                elif stat == 'minutes': player_stats['minutes'] = minutes_str or '0'
+                elif stat == 'minutes_90s': player_stats['minutes_90s'] = minutes_90s_str or '0.0'
+                else: player_stats[stat] = safe_get_text(cell)
+
+            # Fallbacks for essential columns if not picked up by the decoded cells
             player_stats.setdefault('Player', player_name)
-            if 'Team' not in player_stats:
-                team_td_fallback = row.find('td', {'data-stat': 'team'})
-                player_stats['Team'] = safe_get_text(team_td_fallback.find('a'), default=safe_get_text(team_td_fallback)) if team_td_fallback else 'N/a'
-            if 'Position' not in player_stats:
-                pos_td_fallback = row.find('td', {'data-stat': 'position'})
-                pos_text_fb = safe_get_text(pos_td_fallback)
-                player_stats['Position'] = (pos_text_fb.split(',')[0].strip() if ',' in pos_text_fb and pos_text_fb.split(',')[0].strip() else pos_text_fb) if pos_td_fallback else 'N/a'
+            player_stats.setdefault('Team', 'N/a')
+            player_stats.setdefault('Position', 'N/a')
             if player_stats.get('Age', 'N/a') == 'N/a':
-                 age_td_fallback = row.find('td', {'data-stat': 'age'})
-                 age_text_fallback = safe_get_text(age_td_fallback)
+                 age_td_fallback = cells.get('age')
+                 age_text_fallback = safe_get_text(age_td_fallback if age_td_fallback is not None and age_td_fallback.tag == 'td' else None)
                  player_stats['Age'] = calculate_age(age_text_fallback)
                  if 'original_age_value' not in player_stats: player_stats['original_age_value'] = age_text_fallback
-            if 'nationality' not in player_stats:
-                 nat_td_fallback = row.find('td', {'data-stat': 'nationality'})
-                 player_stats['nationality'] = get_nationality(nat_td_fallback)
+            player_stats.setdefault('nationality', 'N/a')
             player_stats.setdefault('minutes', minutes_str or '0')
             player_stats.setdefault('minutes_90s', minutes_90s_str or '0.0')
 
@@ -270,12 +345,9 @@ def scrape_fbref_table(driver, url, table_id=None, required_stats=None, min_minu
         else:
             print(f"Error: Missing 'Player' or 'Team' in {url}. Columns: {df.columns.tolist()}")
             return df if not df.empty else pd.DataFrame()
-        time.sleep(1.5) # Anti-blocking delay
         return df
-    except TimeoutException as e:
-        print(f"Scraping error for {url}: Page element timed out. {e}")
     except Exception as e:
-        print(f"Unknown error scraping {url}: {e}\nTraceback: {traceback.format_exc()}")
+        print(f"Unknown error parsing table from {url}: {e}\nTraceback: {traceback.format_exc()}")
     return pd.DataFrame()
 
 # User-requested stats and FBRef mapping (Category, Sub-Category, Statistic Name) -> FBRef Key
@@ -302,193 +374,413 @@ USER_REQUESTED_STAT_MAPPING = {
     ('Miscellaneous Stats', 'Aerial Duels', 'Won'): 'aerials_won', ('Miscellaneous Stats', 'Aerial Duels', 'Lost'): 'aerials_lost', ('Miscellaneous Stats', 'Aerial Duels', 'Won%'): 'aerials_won_pct',
 }
 required_fbref_keys = set(USER_REQUESTED_STAT_MAPPING.values()) | {'player', 'team', 'birth_year', 'minutes_90s'} # Add basic keys
-print(f"\nTargeting {len(required_fbref_keys)} FBRef keys for scraping (user-requested + basic).")
 
-urls = {
-    'standard': 'https://fbref.com/en/comps/9/stats/Premier-League-Stats', 'shooting': 'https://fbref.com/en/comps/9/shooting/Premier-League-Stats',
-    'passing': 'https://fbref.com/en/comps/9/passing/Premier-League-Stats', 'gca': 'https://fbref.com/en/comps/9/gca/Premier-League-Stats',
-    'defense': 'https://fbref.com/en/comps/9/defense/Premier-League-Stats', 'possession': 'https://fbref.com/en/comps/9/possession/Premier-League-Stats',
-    'misc': 'https://fbref.com/en/comps/9/misc/Premier-League-Stats', 'keepers': 'https://fbref.com/en/comps/9/keepers/Premier-League-Stats',
+# Competitions and seasons: fbref competition IDs by URL name. Adding a league only needs an entry here
+# (and in Problem4/Transfer_Player.py's TRANSFER_LEAGUES for transfer values).
+COMPETITIONS = {
+    'Premier-League': 9, 'La-Liga': 12, 'Serie-A': 11, 'Bundesliga': 20, 'Ligue-1': 13,
+}
+DEFAULT_COMPETITION = 'Premier-League'
+CATEGORY_PATHS = { # Category -> fbref URL path segment
+    'standard': 'stats', 'shooting': 'shooting', 'passing': 'passing', 'gca': 'gca',
+    'defense': 'defense', 'possession': 'possession', 'misc': 'misc', 'keepers': 'keepers',
 }
+
+# Function to build the fbref URL of one (competition, season, category) table; season=None is the current season
+def build_category_url(competition, season, category):
+    comp_id, path = COMPETITIONS[competition], CATEGORY_PATHS[category]
+    if season is None:
+        return f'https://fbref.com/en/comps/{comp_id}/{path}/{competition}-Stats'
+    return f'https://fbref.com/en/comps/{comp_id}/{season}/{path}/{season}-{competition}-Stats'
+
+urls = {category: build_category_url(DEFAULT_COMPETITION, None, category) for category in CATEGORY_PATHS}
 table_ids = {
     'standard': 'stats_standard', 'shooting': 'stats_shooting', 'passing': 'stats_passing', 'gca': 'stats_gca',
     'defense': 'stats_defense', 'possession': 'stats_possession', 'playingtime': 'stats_playing_time', # Keep ID if URL re-enabled
     'misc': 'stats_misc', 'keepers': 'stats_keeper',
 }
 
-print("\nSetting up Selenium WebDriver...")
-try:
-    options = Options()
-    # options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--log-level=3") # Reduce browser logs
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
+# Function to turn a (Category, Sub-Category, Statistic) tuple into the flat CSV column name
+def flatten_column_tuple(col_tuple):
+    parts = [str(c).strip().replace(' ', '_').replace('/', '_').replace('%', 'Pct').replace('+/-','_Net').replace('#','Num').replace('(','').replace(')','').replace(':','').replace('.','').replace('&','_and_').replace('[','').replace(']','').replace('-', '_') for c in col_tuple if str(c).strip()]
+    return '_'.join(parts)
+
+# Declared schema of the typed results file: text ID columns, integer Age, every stat float64
+# (percentages as plain floats, 'N/a' as null). RESULTS_COLUMN_INFO is stored in the file metadata.
+RESULTS_COLUMN_TYPES = {'Player': 'string', 'Team': 'string'}
+RESULTS_COLUMN_INFO = {'Player': {'fbref_key': 'player'}, 'Team': {'fbref_key': 'team'}}
+for col_tuple, fbref_key in USER_REQUESTED_STAT_MAPPING.items():
+    flat_name = flatten_column_tuple(col_tuple)
+    RESULTS_COLUMN_TYPES[flat_name] = {'Nation': 'string', 'Position': 'string', 'Age': 'int16'}.get(flat_name, 'float64')
+    RESULTS_COLUMN_INFO[flat_name] = {'category': col_tuple[0], 'sub_category': col_tuple[1], 'statistic': col_tuple[2], 'fbref_key': fbref_key}
+
+# Function to decide, before joining, which category supplies each column: the first category
+# in priority order that has it (the same column the chained outer merges used to keep unsuffixed)
+def plan_column_provenance(all_dfs, category_priority):
+    provenance = {}
+    for category in category_priority:
+        for col in all_dfs[category].columns:
+            provenance.setdefault(col, category)
+    return provenance
+
+# Function to plan the join from the full category frames: (category order, column provenance).
+# An incremental run plans on the full frames and reuses the plan for the changed rows, so a category
+# with no changed players still supplies its columns (as 'N/a') instead of handing them to the next one
+def plan_results_join(all_dfs):
+    df_keys_priority = [k for k in ['standard', 'keepers'] + [k for k in all_dfs.keys() if k not in ['standard', 'keepers']]
+                        if k in all_dfs and not all_dfs[k].empty]
+    return df_keys_priority, plan_column_provenance(all_dfs, df_keys_priority)
+
+# Function to join the per-category frames and build the flat export table (ID columns first, sorted by Player)
+def build_results_table(all_dfs, join_plan=None):
+    print("\n--- Joining scraped DataFrames ---")
+    df_keys_priority, provenance = join_plan if join_plan is not None else plan_results_join(all_dfs)
+    df_keys_priority = [k for k in df_keys_priority if k in all_dfs]
+    if not any(not all_dfs[k].empty for k in df_keys_priority):
+         print("ERROR: No DataFrames merged. Cannot create result file.")
+         return None
+    requested_keys = set(USER_REQUESTED_STAT_MAPPING.values())
+    column_blocks = []
+    for category in df_keys_priority:
+        cols_from_category = [col for col in all_dfs[category].columns if provenance[col] == category and col in requested_keys]
+        column_blocks.append(all_dfs[category][cols_from_category]) # Frames that supply no column still contribute their players
+        print(f"  '{category}' supplies {len(cols_from_category)} columns for {len(all_dfs[category])} players.")
+    try:
+        merged_df = pd.concat(column_blocks, axis=1, join='outer', sort=True) # One keyed alignment on (Player, Team)
+    except Exception as merge_error:
+        print(f"CRITICAL ERROR joining category frames: {merge_error}")
+        return None
+    print(f"\nJoin complete. Total unique Player/Team pairs: {len(merged_df)}")
+    merged_df = merged_df.reset_index().fillna('N/a')
+
+    print("\n--- Building final DataFrame based on user request ---")
+    final_columns_structure = []
+    final_series = [merged_df['Player'], merged_df['Team']]
+    missing_stats_log = []
+    processed_fbref_keys_final = {'Player', 'Team'}
+
+    print(f"Processing {len(USER_REQUESTED_STAT_MAPPING)} requested stats...")
+    for col_tuple, base_key in USER_REQUESTED_STAT_MAPPING.items():
+        final_columns_structure.append(col_tuple)
+        if base_key in provenance:
+            final_series.append(merged_df[base_key])
+            processed_fbref_keys_final.add(base_key)
+        else:
+             final_series.append(pd.Series('N/a', index=merged_df.index))
+             missing_stats_log.append(f"Missing {col_tuple} (orig: {base_key}).")
+    final_df = pd.concat(final_series, axis=1, ignore_index=True)
+    final_df.columns = pd.Index(['Player', 'Team'] + final_columns_structure, tupleize_cols=False)
+    unused_original_columns = sorted(set(provenance) - processed_fbref_keys_final)
+
+    print("\n--- Checks and Reports ---")
+    if unused_original_columns: print(f"Info: {len(unused_original_columns)} unrequested columns dropped. (e.g., {', '.join(sorted(unused_original_columns)[:5])}{'...' if len(unused_original_columns) > 5 else ''})")
+    if missing_stats_log:
+         print("Warning - Mapping issues:")
+         for warning in sorted(list(set(missing_stats_log))): print(f"  - {warning}")
+    else: print("All requested stats mapped successfully.")
+    print("-------------------------------------------------------\n")
+
+    print("Creating column index for final DataFrame...")
+    try:
+        multiindex_tuples = [('','','Player'), ('','','Team')] + final_columns_structure
+        if len(multiindex_tuples) == final_df.shape[1]:
+             final_df.columns = pd.MultiIndex.from_tuples(multiindex_tuples, names=['Category', 'Sub-Category', 'Statistic'])
+             print("MultiIndex created.")
+        else: raise ValueError(f"Column count mismatch for MultiIndex: DF has {final_df.shape[1]}, tuples {len(multiindex_tuples)}.")
+    except Exception as multiindex_error:
+         print(f"Error creating MultiIndex: {multiindex_error}. Using flat column names as fallback.")
+         flat_fallback_cols = ['Player', 'Team'] + ['_'.join(filter(None, map(str, tpl))) for tpl in final_columns_structure]
+         final_df.columns = [f"{col}_{i}" if flat_fallback_cols.count(col) > 1 else col for i, col in enumerate(flat_fallback_cols)]
+
+    is_multiindex = isinstance(final_df.columns, pd.MultiIndex)
+    player_col_id = ('', '', 'Player') if is_multiindex else 'Player'
+    if player_col_id in final_df.columns:
+        try:
+            final_df = final_df.sort_values(by=player_col_id, ascending=True, key=lambda col: col.astype(str).str.lower(), na_position='last')
+            print("Sorted DataFrame by Player name.")
+        except Exception as e: print(f"Warning: Could not sort by Player ('{player_col_id}'): {e}.")
+    else: print(f"Warning: Player column '{player_col_id}' not found for sorting.")
+
+    print("\nReordering final columns...")
+    PRIORITY_COLS_TUPLE = [('', '', 'Player'), ('', '', 'Team'), ('', '', 'Nation'), ('', '', 'Position'), ('', '', 'Age')]
+    PRIORITY_COLS_FLAT = ['Player', 'Team', 'Nation', 'Position', 'Age']
+    priority_cols_definition = PRIORITY_COLS_TUPLE if is_multiindex else PRIORITY_COLS_FLAT
+    all_current_cols = final_df.columns.tolist()
+    priority_cols_present = [col for col in priority_cols_definition if col in all_current_cols]
+    other_cols = sorted([col for col in all_current_cols if col not in priority_cols_present])
+    final_column_order = priority_cols_present + other_cols
+    try:
+        final_df = final_df[final_column_order]
+        print("Column reordering successful.")
+    except Exception as e: print(f"Error reordering columns: {e}.")
+
+    print("\nPreparing to export final CSV file...")
+    final_df_export = final_df.copy()
+    if isinstance(final_df_export.columns, pd.MultiIndex):
+        print("Flattening MultiIndex columns for CSV...")
+        flat_columns = []
+        processed_flat_names = set()
+        for col_tuple in final_df_export.columns:
+            base_flat_col = flatten_column_tuple(col_tuple) or f"col_{len(flat_columns)}"
+            original_base = base_flat_col
+            current_count = 1
+            while base_flat_col in processed_flat_names:
+                 base_flat_col = f"{original_base}_{current_count}"; current_count += 1
+            flat_columns.append(base_flat_col)
+            processed_flat_names.add(base_flat_col)
+        if len(flat_columns) == final_df_export.shape[1]: final_df_export.columns = flat_columns
+        else:
+            print(f"CRITICAL ERROR: Column count mismatch after flattening ({len(flat_columns)} vs {final_df_export.shape[1]}). Aborting save.")
+            return None
+
+    print("Reordering flattened columns for export...")
+    PRIORITY_COLS_FLAT_FINAL = ['Player', 'Team', 'Nation', 'Position', 'Age']
+    id_cols_flat_final = [c for c in PRIORITY_COLS_FLAT_FINAL if c in final_df_export.columns]
+    other_cols_flat_final = sorted([c for c in final_df_export.columns if c not in id_cols_flat_final])
+    final_export_order_flat = id_cols_flat_final + other_cols_flat_final
+    try:
+        final_df_export = final_df_export[final_export_order_flat]
+        print("Flat column reordering for export successful.")
+    except Exception as e: print(f"Error reordering flat columns for export: {e}")
+    return final_df_export
+
+# Incremental refresh: the per-category frames of the last run are kept in STATE_DIR. The next
+# --incremental run diffs the new frames against them on (Player, Team), re-merges only the changed
+# players, patches those rows into the previous results and appends them to CHANGE_LOG_CSV.
+RESULTS_CSV = 'results.csv' # Optional CSV export of the typed RESULTS_FEATHER table
+STATE_DIR = 'results_state'
+CHANGE_LOG_CSV = 'results_changes.csv'
+
+# Function to identify the stat mapping a saved state was built with (a changed mapping forces a full rebuild)
+def mapping_signature():
+    return sorted('|'.join(col_tuple) + '=' + key for col_tuple, key in USER_REQUESTED_STAT_MAPPING.items())
+
+# Function to save this run's per-category frames as the baseline for the next incremental run
+def save_run_state(all_dfs, state_dir=STATE_DIR):
+    try:
+        os.makedirs(state_dir, exist_ok=True)
+        for category, df_cat in all_dfs.items():
+            df_cat.to_pickle(os.path.join(state_dir, f'{category}.pkl'))
+        meta = {'categories': sorted(all_dfs), 'mapping': mapping_signature(), 'saved_at': pd.Timestamp.now().isoformat()}
+        with open(os.path.join(state_dir, 'state.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=1)
+        print(f"Saved run state for {len(all_dfs)} categories to {state_dir}/")
+    except Exception as e:
+        print(f"Warning: Could not save run state to {state_dir}: {e}")
+
+# Function to load the previous run's per-category frames, or None if missing/incompatible
+def load_run_state(state_dir=STATE_DIR):
     try:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        print("WebDriver using ChromeDriverManager.")
-    except Exception as driver_manager_err:
-        print(f"Warning: ChromeDriverManager failed ({driver_manager_err}). Trying default ChromeDriver from PATH...")
-        driver = webdriver.Chrome(options=options) # Fallback to system PATH
-        print("WebDriver using ChromeDriver from system PATH.")
+        with open(os.path.join(state_dir, 'state.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('mapping') != mapping_signature():
+            print("  Stat mapping changed since the saved run state.")
+            return None
+        return {category: pd.read_pickle(os.path.join(state_dir, f'{category}.pkl')) for category in meta['categories']}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"  Warning: Could not load run state from {state_dir}: {e}")
+        return None
+
+# Function to find the (Player, Team) keys that were added, removed or changed in one category frame
+def diff_category_frame(previous_df, new_df):
+    prev = previous_df.fillna('N/a').astype(str)
+    new = new_df.fillna('N/a').astype(str)
+    columns = prev.columns.union(new.columns)
+    prev = prev.reindex(columns=columns, fill_value='N/a')
+    new = new.reindex(columns=columns, fill_value='N/a')
+    common = new.index.intersection(prev.index)
+    differs = (prev.loc[common] != new.loc[common]).any(axis=1).to_numpy()
+    return set(new.index.difference(prev.index)) | set(prev.index.difference(new.index)) | set(common[differs])
+
+# Function to compare two cells; missing values (NaN, None, pd.NA) only equal each other
+def values_differ(a, b):
+    a_missing, b_missing = pd.isna(a), pd.isna(b)
+    return a_missing != b_missing or (not a_missing and bool(a != b))
+
+# Function to patch re-merged rows into the previous typed results. Returns (patched results, change log rows)
+def apply_incremental_update(previous_export, changed_export, changed_keys):
+    prev = previous_export.set_index(['Player', 'Team'])
+    new = changed_export.set_index(['Player', 'Team'])
+    run_at = pd.Timestamp.now().isoformat(timespec='seconds')
+    log_rows = []
+    for key in sorted(changed_keys):
+        in_prev, in_new = key in prev.index, key in new.index
+        if in_prev and in_new:
+            changed_cols = [c for c in new.columns if values_differ(prev.at[key, c], new.at[key, c])]
+            if changed_cols: log_rows.append({'run_at': run_at, 'Player': key[0], 'Team': key[1], 'change': 'updated', 'changed_columns': '; '.join(changed_cols)})
+        elif in_new:
+            log_rows.append({'run_at': run_at, 'Player': key[0], 'Team': key[1], 'change': 'added', 'changed_columns': ''})
+        elif in_prev:
+            log_rows.append({'run_at': run_at, 'Player': key[0], 'Team': key[1], 'change': 'removed', 'changed_columns': ''})
+    unchanged = prev[~prev.index.isin(list(changed_keys))]
+    patched = pd.concat([unchanged, new]).reset_index()
+    patched = patched.sort_values(by='Player', key=lambda col: col.astype(str).str.lower(), kind='mergesort').reset_index(drop=True)
+    return patched[previous_export.columns.tolist()], pd.DataFrame(log_rows, columns=['run_at', 'Player', 'Team', 'change', 'changed_columns'])
+
+# Fetch scheduler configuration: category pages are fetched concurrently over a pooled HTTP session
+# (Chrome drivers are only started for pages where the table is missing from the raw HTML),
+# and the politeness budget is a per-host token bucket instead of fixed sleeps.
+FETCH_MAX_WORKERS = 4          # Parallel fetches (HTTP connections / Chrome instances)
+RATE_LIMIT_PER_MINUTE = 10     # Sustained requests per minute per host (fbref asks for <= 10/min)
+RATE_LIMIT_BURST = len(urls)   # Requests allowed back-to-back before the sustained rate applies
+
+chrome_options = Options()
+# chrome_options.add_argument("--headless")
+chrome_options.add_argument("--no-sandbox")
+chrome_options.add_argument("--disable-dev-shm-usage")
+chrome_options.add_argument("--log-level=3") # Reduce browser logs
+chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
+chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+chrome_options.add_experimental_option('useAutomationExtension', False)
+
+chromedriver_path = None
+chromedriver_lock = threading.Lock()
+
+# Function to start one configured Chrome instance (used by the driver pool, only on HTTP fallback)
+def create_driver():
+    global chromedriver_path
+    with chromedriver_lock: # Resolve the driver binary once, before any thread starts Chrome
+        if chromedriver_path is None:
+            try:
+                chromedriver_path = ChromeDriverManager().install()
+                print("WebDriver using ChromeDriverManager.")
+            except Exception as driver_manager_err:
+                print(f"Warning: ChromeDriverManager failed ({driver_manager_err}). Using default ChromeDriver from PATH...")
+                chromedriver_path = ''
+    if chromedriver_path: driver = webdriver.Chrome(service=Service(chromedriver_path), options=chrome_options)
+    else: driver = webdriver.Chrome(options=chrome_options) # Fallback to system PATH
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})") # Hide webdriver property
-    print("WebDriver setup complete.")
-except Exception as e:
-    print(f"Critical error during WebDriver setup: {e}")
-    sys.exit(1)
+    print("  WebDriver started.")
+    return driver
 
-all_dfs = {}
 MIN_MINUTES_PLAYED = 90
-scraping_successful = False
-
-print("\n--- Starting to scrape data from URLs ---")
-for category, url in urls.items():
-    table_id = table_ids.get(category)
-    df_cat = scrape_fbref_table(driver, url, table_id=table_id, min_minutes=MIN_MINUTES_PLAYED, required_stats=required_fbref_keys)
-    if df_cat is not None and not df_cat.empty:
-        cols_to_keep = [col for col in df_cat.columns if col in required_fbref_keys]
-        if cols_to_keep:
-             all_dfs[category] = df_cat[cols_to_keep]
-             print(f"--> Success: Fetched data for {category} ({all_dfs[category].shape[0]} players, {len(cols_to_keep)} stats)")
-             scraping_successful = True
-        else: print(f"--> Warning: {category} contained no required stats.")
-    else: print(f"--> Warning: Fetching failed or no data for {category} from {url}")
-    print("-" * 30)
-driver.quit()
-
-if not scraping_successful or not all_dfs:
-    print("ERROR: No data successfully fetched. Cannot continue.")
-    sys.exit(1)
-
-print("\n--- Merging scraped DataFrames ---")
-merged_df = None
-df_keys_priority = ['standard', 'keepers'] + [k for k in all_dfs.keys() if k not in ['standard', 'keepers']]
-for category in df_keys_priority:
-    if category not in all_dfs or all_dfs[category].empty: continue
-    df_cat = all_dfs[category]
-    if merged_df is None: merged_df = df_cat
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Scrape fbref Premier League player stats into {RESULTS_FEATHER} (and {RESULTS_CSV})")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only re-merge players whose rows changed since the last run and patch them into the previous results")
+    parser.add_argument('--no-csv', dest='csv', action='store_false', help=f"Skip the {RESULTS_CSV} export (typed {RESULTS_FEATHER} is always written)")
+    args = parser.parse_args()
+    print(f"\nTargeting {len(required_fbref_keys)} FBRef keys for scraping (user-requested + basic).")
+
+    driver_pool = DriverPool(create_driver, FETCH_MAX_WORKERS)
+    http_session = create_http_session(pool_size=FETCH_MAX_WORKERS)
+    page_cache = default_page_cache() # PAGE_CACHE_DIR / PAGE_CACHE_TTL_HOURS / PAGE_CACHE_MAX_MB / SCRAPE_OFFLINE=1
+    table_store = {} # table_id -> raw HTML of every commented table seen in any downloaded page
+    rate_limiter = HostRateLimiter(RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST)
+
+    all_dfs = {}
+    scraping_successful = False
+
+    # Function to fetch one category page (HTTP first, pooled Chrome as fallback)
+    def scrape_category(category, url):
+        return scrape_fbref_table(url, table_id=table_ids.get(category), min_minutes=MIN_MINUTES_PLAYED, required_stats=required_fbref_keys,
+                                  session=http_session, driver_pool=None if page_cache.offline else driver_pool,
+                                  rate_limiter=rate_limiter, page_cache=page_cache, table_store=table_store)
+
+    print(f"\n--- Starting to scrape data from {len(urls)} URLs ({FETCH_MAX_WORKERS} workers, {RATE_LIMIT_PER_MINUTE}/min per host, burst {RATE_LIMIT_BURST}) ---")
+    fetch_started = time.perf_counter()
+    try:
+        fetched_dfs = fetch_concurrently(urls, scrape_category, max_workers=FETCH_MAX_WORKERS)
+    except Exception as e:
+        print(f"Critical error during concurrent fetch: {e}")
+        driver_pool.close_all()
+        sys.exit(1)
+    driver_pool.close_all()
+    http_session.close()
+    print(f"Fetched {len(urls)} category pages in {time.perf_counter() - fetch_started:.1f}s.")
+
+    for category, url in urls.items(): # Report in the configured order, not completion order
+        df_cat = fetched_dfs.get(category)
+        if df_cat is not None and not df_cat.empty:
+            cols_to_keep = [col for col in df_cat.columns if col in required_fbref_keys]
+            if cols_to_keep:
+                 all_dfs[category] = df_cat[cols_to_keep]
+                 print(f"--> Success: Fetched data for {category} ({all_dfs[category].shape[0]} players, {len(cols_to_keep)} stats)")
+                 scraping_successful = True
+            else: print(f"--> Warning: {category} contained no required stats.")
+        else: print(f"--> Warning: Fetching failed or no data for {category} from {url}")
+        print("-" * 30)
+
+    if not scraping_successful or not all_dfs:
+        print("ERROR: No data successfully fetched. Cannot continue.")
+        sys.exit(1)
+
+    changed_keys = None # None = full rebuild
+    if args.incremental:
+        print("\n--- Incremental mode: diffing against the previous run ---")
+        previous_dfs = load_run_state() if os.path.exists(RESULTS_FEATHER) or os.path.exists(RESULTS_CSV) else None
+        if previous_dfs is None:
+            print(f"No usable previous run state or {RESULTS_FEATHER}. Doing a full rebuild.")
+        else:
+            for category, prev_df in previous_dfs.items():
+                if category not in all_dfs:
+                    print(f"  Keeping previous data for '{category}' (not fetched this run).")
+                    all_dfs[category] = prev_df
+            changed_keys = set()
+            for category, df_cat in all_dfs.items():
+                category_changes = diff_category_frame(previous_dfs.get(category, df_cat.iloc[0:0]), df_cat)
+                print(f"  {category}: {len(category_changes)} changed Player/Team rows")
+                changed_keys |= category_changes
+            print(f"Total changed Player/Team pairs: {len(changed_keys)}")
+
+    if changed_keys is not None and not changed_keys:
+        print(f"\nNo player rows changed since the last run. {RESULTS_FEATHER} left untouched.")
+        save_run_state(all_dfs)
+        print("\n--- Script complete ---")
+        sys.exit(0)
+
+    if changed_keys is None:
+        final_df_export = build_results_table(all_dfs)
+        if final_df_export is None:
+            sys.exit(1)
+        results_df = to_typed_results(final_df_export, RESULTS_COLUMN_TYPES)
     else:
+        changed_dfs = {category: df_cat[df_cat.index.isin(list(changed_keys))] for category, df_cat in all_dfs.items()}
+        previous_results = to_typed_results(read_results(), RESULTS_COLUMN_TYPES)
+        changed_export = build_results_table(changed_dfs, join_plan=plan_results_join(all_dfs)) if any(not df_cat.empty for df_cat in changed_dfs.values()) else None
+        changed_results = to_typed_results(changed_export, RESULTS_COLUMN_TYPES) if changed_export is not None else previous_results.iloc[0:0] # Only removals
+        if changed_results.columns.tolist() != previous_results.columns.tolist():
+            print("Warning: Columns of the previous results differ from the new build. Doing a full rebuild instead.")
+            changed_export = build_results_table(all_dfs)
+            if changed_export is None:
+                sys.exit(1)
+            changed_results = to_typed_results(changed_export, RESULTS_COLUMN_TYPES)
+            changed_keys = set(zip(changed_results['Player'], changed_results['Team'])) | set(zip(previous_results['Player'], previous_results['Team']))
+            previous_results = changed_results.iloc[0:0]
+        results_df, change_log = apply_incremental_update(previous_results, changed_results, changed_keys)
+        print(f"Patched {len(changed_results)} re-merged rows into the previous {len(previous_results)} rows. Changes logged: {len(change_log)}")
         try:
-            merged_df = merged_df.merge(df_cat, left_index=True, right_index=True, how='outer', suffixes=(None, f'__{category}'))
-        except Exception as merge_error:
-            print(f"CRITICAL ERROR merging '{category}': {merge_error}") # Potentially log more details or stop
-    print(f"  {'Started with' if merged_df is df_cat else 'Merged'} '{category}'. Current shape: {merged_df.shape if merged_df is not None else 'N/A'}")
-if merged_df is None:
-     print("ERROR: No DataFrames merged. Cannot create result file.")
-     sys.exit(1)
-print(f"\nInitial merge complete. Total unique Player/Team pairs: {len(merged_df)}")
-merged_df = merged_df.reset_index().fillna('N/a')
-
-print("\n--- Building final DataFrame based on user request ---")
-final_df = pd.DataFrame({'Player': merged_df['Player'], 'Team': merged_df['Team']})
-final_columns_structure = []
-missing_stats_log = []
-processed_fbref_keys_final = {'Player', 'Team'}
-merged_df_columns_list = merged_df.columns.tolist()
-
-def find_column_match(df_columns, base_key, suffix_marker='__'):
-    if base_key in df_columns: return base_key
-    suffixed_cols = [c for c in df_columns if isinstance(c, str) and c.startswith(base_key + suffix_marker)]
-    return suffixed_cols[0] if suffixed_cols else None
-
-print(f"Processing {len(USER_REQUESTED_STAT_MAPPING)} requested stats...")
-for col_tuple, base_key in USER_REQUESTED_STAT_MAPPING.items():
-    final_columns_structure.append(col_tuple)
-    matched_col = find_column_match(merged_df_columns_list, base_key)
-    if matched_col:
-        final_df[col_tuple] = merged_df[matched_col]
-        processed_fbref_keys_final.add(matched_col)
-        if matched_col != base_key: missing_stats_log.append(f"Used suffixed '{matched_col}' for {col_tuple} (orig: {base_key})")
-    else:
-         final_df[col_tuple] = 'N/a'
-         missing_stats_log.append(f"Missing {col_tuple} (orig: {base_key}).")
-
-print("\n--- Checks and Reports ---")
-unused_original_columns = [col for col in merged_df_columns_list if col not in processed_fbref_keys_final]
-if unused_original_columns: print(f"Info: {len(unused_original_columns)} unrequested columns dropped. (e.g., {', '.join(sorted(unused_original_columns)[:5])}{'...' if len(unused_original_columns) > 5 else ''})")
-if missing_stats_log:
-     print("Warning - Mapping issues:")
-     for warning in sorted(list(set(missing_stats_log))): print(f"  - {warning}")
-else: print("All requested stats mapped successfully.")
-print("-------------------------------------------------------\n")
-
-print("Creating column index for final DataFrame...")
-try:
-    multiindex_tuples = [('','','Player'), ('','','Team')] + final_columns_structure
-    if len(multiindex_tuples) == final_df.shape[1]:
-         final_df.columns = pd.MultiIndex.from_tuples(multiindex_tuples, names=['Category', 'Sub-Category', 'Statistic'])
-         print("MultiIndex created.")
-    else: raise ValueError(f"Column count mismatch for MultiIndex: DF has {final_df.shape[1]}, tuples {len(multiindex_tuples)}.")
-except Exception as multiindex_error:
-     print(f"Error creating MultiIndex: {multiindex_error}. Using flat column names as fallback.")
-     flat_fallback_cols = ['Player', 'Team'] + ['_'.join(filter(None, map(str, tpl))) for tpl in final_columns_structure]
-     final_df.columns = [f"{col}_{i}" if flat_fallback_cols.count(col) > 1 else col for i, col in enumerate(flat_fallback_cols)]
-
-is_multiindex = isinstance(final_df.columns, pd.MultiIndex)
-player_col_id = ('', '', 'Player') if is_multiindex else 'Player'
-if player_col_id in final_df.columns:
+            change_log.to_csv(CHANGE_LOG_CSV, mode='a', header=not os.path.exists(CHANGE_LOG_CSV), index=False, encoding='utf-8-sig')
+            print(f"Appended change log to {CHANGE_LOG_CSV}")
+        except Exception as e:
+            print(f"Warning: Could not write change log {CHANGE_LOG_CSV}: {e}")
+
+    print(f"\nSaving typed results to {RESULTS_FEATHER}...")
     try:
-        final_df = final_df.sort_values(by=player_col_id, ascending=True, key=lambda col: col.astype(str).str.lower(), na_position='last')
-        print("Sorted DataFrame by Player name.")
-    except Exception as e: print(f"Warning: Could not sort by Player ('{player_col_id}'): {e}.")
-else: print(f"Warning: Player column '{player_col_id}' not found for sorting.")
-
-print("\nReordering final columns...")
-PRIORITY_COLS_TUPLE = [('', '', 'Player'), ('', '', 'Team'), ('', '', 'Nation'), ('', '', 'Position'), ('', '', 'Age')]
-PRIORITY_COLS_FLAT = ['Player', 'Team', 'Nation', 'Position', 'Age']
-priority_cols_definition = PRIORITY_COLS_TUPLE if is_multiindex else PRIORITY_COLS_FLAT
-all_current_cols = final_df.columns.tolist()
-priority_cols_present = [col for col in priority_cols_definition if col in all_current_cols]
-other_cols = sorted([col for col in all_current_cols if col not in priority_cols_present])
-final_column_order = priority_cols_present + other_cols
-try:
-    final_df = final_df[final_column_order]
-    print("Column reordering successful.")
-except Exception as e: print(f"Error reordering columns: {e}.")
-
-print("\nPreparing to export final CSV file...")
-final_df_export = final_df.copy()
-if isinstance(final_df_export.columns, pd.MultiIndex):
-    print("Flattening MultiIndex columns for CSV...")
-    flat_columns = []
-    processed_flat_names = set()
-    for col_tuple in final_df_export.columns:
-        parts = [str(c).strip().replace(' ', '_').replace('/', '_').replace('%', 'Pct').replace('+/-','_Net').replace('#','Num').replace('(','').replace(')','').replace(':','').replace('.','').replace('&','_and_').replace('[','').replace(']','').replace('-', '_') for c in col_tuple if str(c).strip()]
-        base_flat_col = '_'.join(parts) if parts else f"col_{len(flat_columns)}"
-        original_base = base_flat_col
-        current_count = 1
-        while base_flat_col in processed_flat_names:
-             base_flat_col = f"{original_base}_{current_count}"; current_count += 1
-        flat_columns.append(base_flat_col)
-        processed_flat_names.add(base_flat_col)
-    if len(flat_columns) == final_df_export.shape[1]: final_df_export.columns = flat_columns
-    else:
-        print(f"CRITICAL ERROR: Column count mismatch after flattening ({len(flat_columns)} vs {final_df_export.shape[1]}). Aborting save.")
+        if results_df.empty or results_df.shape[1] == 0: print("Warning: Final DataFrame is empty or has no columns. Saving empty table.")
+        missing_protected = [col for col in ['Player', 'Team'] if col not in results_df.columns]
+        if missing_protected: print(f"CRITICAL WARNING: Basic ID columns lost before saving: {missing_protected}.")
+        schema = write_results(results_df, RESULTS_COLUMN_TYPES, RESULTS_FEATHER, column_info=RESULTS_COLUMN_INFO)
+        print(f"Successfully saved results to {RESULTS_FEATHER}. Shape: {results_df.shape}")
+        print(f"Schema: {sum(1 for f in schema if str(f.type) == 'double')} float64 stats, ID columns: {[f'{f.name}:{f.type}' for f in schema if str(f.type) != 'double']}")
+    except Exception as e:
+        print(f"ERROR saving '{RESULTS_FEATHER}': {e}\nTraceback: {traceback.format_exc()}")
         sys.exit(1)
 
-print("Reordering flattened columns for export...")
-PRIORITY_COLS_FLAT_FINAL = ['Player', 'Team', 'Nation', 'Position', 'Age']
-id_cols_flat_final = [c for c in PRIORITY_COLS_FLAT_FINAL if c in final_df_export.columns]
-other_cols_flat_final = sorted([c for c in final_df_export.columns if c not in id_cols_flat_final])
-final_export_order_flat = id_cols_flat_final + other_cols_flat_final
-try:
-    final_df_export = final_df_export[final_export_order_flat]
-    print("Flat column reordering for export successful.")
-except Exception as e: print(f"Error reordering flat columns for export: {e}")
-
-output_filename = 'results.csv'
-print(f"\nSaving final results to {output_filename}...")
-try:
-    if final_df_export.empty or final_df_export.shape[1] == 0: print("Warning: Final DataFrame is empty or has no columns. Saving empty CSV.")
-    missing_protected = [col for col in id_cols_flat_final if col not in final_df_export.columns]
-    if missing_protected: print(f"CRITICAL WARNING: Basic ID columns lost before saving: {missing_protected}.")
-    final_df_export.to_csv(output_filename, index=False, encoding='utf-8-sig')
-    print(f"Successfully saved results to {output_filename}. Shape: {final_df_export.shape}")
-    print(f"Final columns (first 25): {final_df_export.columns.tolist()[:25]}{'...' if len(final_df_export.columns) > 25 else ''}")
-except Exception as e:
-    print(f"ERROR saving CSV '{output_filename}': {e}\nTraceback: {traceback.format_exc()}")
-print("\n--- Script complete ---")
+    if args.csv:
+        print(f"\nExporting CSV copy to {RESULTS_CSV}...")
+        try:
+            export_results_csv(results_df, RESULTS_CSV)
+            print(f"Successfully saved results to {RESULTS_CSV}.")
+            print(f"Final columns (first 25): {results_df.columns.tolist()[:25]}{'...' if len(results_df.columns) > 25 else ''}")
+        except Exception as e:
+            print(f"ERROR saving CSV '{RESULTS_CSV}': {e}\nTraceback: {traceback.format_exc()}")
+    save_run_state(all_dfs)
+    print("\n--- Script complete ---")
+
+if __name__ == "__main__":
+    main()
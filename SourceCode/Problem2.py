@@ -1,71 +1,60 @@
+import argparse
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import os
 import sys
+import time
 import traceback
 import re
+from results_io import read_results, iter_results_chunks
+from ranking import rank_top_bottom
+from aggregation import TeamAggregates
+from histogram_render import prebin_histograms, render_histograms, report_render_timings
+from streaming_stats import StreamingStats, StreamingHistograms
+from stat_taxonomy import StatTaxonomy
+from numeric_block import coerce_numeric_block, MIN_VALID_RATIO
 
 # --- Configuration ---
+INPUT_FEATHER = 'results.feather' # Typed output of Problem1.py, preferred when present
 INPUT_CSV = 'results.csv'
 OUTPUT_TOP_BOTTOM = 'top_3.txt'
+TOP_BOTTOM_K = 3
+TOP_BOTTOM_TIES = 'first' # 'first': earliest rows (by Player order) win ties at the k-th place; 'all': list every tied player
 OUTPUT_STATS_SUMMARY = 'results2.csv'
 OUTPUT_HISTOGRAM_DIR = 'histograms'
 HIST_SUBDIR_ALL = 'all_players'
 HIST_SUBDIR_TEAMS = 'by_team'
+HIST_TIMINGS_CSV = 'render_timings.csv' # Per-plot render times, written inside OUTPUT_HISTOGRAM_DIR
+HISTOGRAM_WORKERS = os.cpu_count() or 1 # Processes used to render the PNGs
+STREAM_CHUNK_SIZE = 50_000 # Rows per chunk in --streaming mode
 OUTPUT_HIGHEST_SCORING_TEAMS = 'highest_scoring_teams.txt' # For highest scoring teams output
+OUTPUT_CONVERSION_REPORT = 'numeric_conversion_report.csv' # How every stat column was converted to numbers
 
 ID_COLS = ['Player', 'Team', 'Nation', 'Position', 'Age']
 
-# Patterns for selecting specific stats for histograms
-HISTOGRAM_OFFENSIVE_PATTERNS = [
-    'gls', 'goal', 'sh', 'shot', 'sot', 'xg', 'npxg', 'xa', 'assist', 'keypass', 'kp',
-    'sca', 'gca', 'att_pen', 'crspa', 'succ_dribbles', 'prog_passes_rec', 'touches_att_pen',
-    'progcarry', 'progpass' # Added for progressive carries/passes if named as such
-]
-HISTOGRAM_DEFENSIVE_PATTERNS = [
-    'tkl', 'tackle', 'tklw', 'int', 'interception', 'block', 'clr', 'clearance',
-    'sav', 'save', 'cs', 'clean_sheet', 'ga', 'goals_against', 'err', # 'ga' and 'goals_against' for goals against
-    'crdy', 'crdr', 'card', 'foul', 'aerialswon', 'pkcon', 'pressure', 'recover'
-]
-
-
 # --- Helper Functions ---
-def clean_numeric_column(series):
-    series_str = series.astype(str)
-    series_cleaned = series_str.str.replace('%', '', regex=False)
-    series_cleaned = series_cleaned.str.replace(',', '', regex=False)
-    series_numeric = pd.to_numeric(series_cleaned, errors='coerce')
-    return series_numeric
-
 def get_numeric_columns(df, exclude_cols):
-    numeric_cols = []
     potential_cols = [col for col in df.columns if col not in exclude_cols]
     print(f"  Potentially analyzing {len(potential_cols)} columns (excluding: {', '.join(exclude_cols)})")
-    original_dtypes = df[potential_cols].dtypes
-
-    for col in potential_cols:
-        if pd.api.types.is_numeric_dtype(original_dtypes[col]):
-            numeric_cols.append(col)
-            continue
-        try:
-            # Attempt to coerce to numeric, then check ratio of valid numbers
-            coerced = pd.to_numeric(df[col].astype(str).str.replace(',', ''), errors='coerce')
-            valid_ratio = coerced.notna().sum() / len(coerced) if len(coerced) > 0 else 0
-            if valid_ratio > 0.1: # Consider a column numeric if more than 10% can be converted
-                numeric_cols.append(col)
-        except Exception as e:
-            print(f"  Skipping column '{col}' due to error during numeric check: {e}", file=sys.stderr)
-    return sorted(list(set(numeric_cols)))
+    return sorted(potential_cols) # Text columns are parsed to numbers by coerce_numeric_block
 
 def format_player_list(series):
     return [f"{player} ({score})" for player, score in series.items()]
 
 # --- Main Analysis Logic ---
 if __name__ == "__main__":
-    print(f"Loading data from {INPUT_CSV}...")
+    parser = argparse.ArgumentParser(description="Statistics, rankings and histograms of the Problem1 results table")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Read the table in chunks with mergeable accumulators (constant memory; medians from a KLL sketch)")
+    parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE, help="Rows per chunk in --streaming mode")
+    args = parser.parse_args()
+
+    print(f"Loading data from {INPUT_FEATHER} (or {INPUT_CSV})...")
     try:
-        df = pd.read_csv(INPUT_CSV)
+        if args.streaming:
+            result_chunks = iter_results_chunks(INPUT_FEATHER, INPUT_CSV, args.chunk_size)
+            df = next(result_chunks, pd.DataFrame()) # Only the first chunk is used to identify the columns
+        else:
+            df = read_results(INPUT_FEATHER, INPUT_CSV)
         print(f"Data loaded successfully. Shape: {df.shape}")
         if df.empty:
             print(f"Error: {INPUT_CSV} is empty. Cannot proceed.", file=sys.stderr)
@@ -81,17 +70,7 @@ if __name__ == "__main__":
         print(traceback.format_exc(), file=sys.stderr)
         sys.exit(1)
 
-    print("\nApplying cleaning to potential numeric columns...")
-    df_cleaned = df.copy()
-    potential_numeric_cols_for_cleaning = [col for col in df.columns if col not in ID_COLS]
-    cleaned_count = 0
-    for col in potential_numeric_cols_for_cleaning:
-        if col in df_cleaned.columns and not pd.api.types.is_numeric_dtype(df_cleaned[col]):
-            df_cleaned[col] = clean_numeric_column(df_cleaned[col])
-            cleaned_count += 1
-    print(f"Attempted cleaning on {cleaned_count} non-numeric columns (excluding ID cols).")
-
-    print("\nIdentifying numeric columns for analysis after cleaning...")
+    print("\nIdentifying numeric columns for analysis...")
     NON_STAT_COLS = list(ID_COLS)
     # Add specific playing time columns from your CSV structure to NON_STAT_COLS
     # Common playing time columns that might appear from Problem1.py
@@ -99,11 +78,23 @@ if __name__ == "__main__":
     # Adjust these based on the actual output of Problem1.py if needed
     generated_playing_time_cols = ['Playing_Time_Min', 'Playing_Time_MP', 'Playing_Time_Starts', 'Min', 'MP', 'Starts']
     for pt_col in generated_playing_time_cols:
-        if pt_col in df_cleaned.columns:
+        if pt_col in df.columns:
             NON_STAT_COLS.append(pt_col)
     NON_STAT_COLS = sorted(list(set(NON_STAT_COLS))) # Ensure unique
 
-    stat_cols = get_numeric_columns(df_cleaned, NON_STAT_COLS)
+    stat_cols = get_numeric_columns(df, NON_STAT_COLS)
+
+    print("\nConverting statistic columns to numbers (once, shared by every task)...")
+    numeric_block = coerce_numeric_block(df, stat_cols)
+    conversion_report = numeric_block.report
+    text_columns = conversion_report[conversion_report['source'] == 'text']
+    print(f"Converted {len(stat_cols)} columns ({len(text_columns)} parsed from text, {int(conversion_report['unparseable'].sum())} unparseable cells).")
+    for _, row in text_columns[text_columns['valid_ratio'] <= MIN_VALID_RATIO].iterrows():
+        print(f"  Note: Only {row['valid_ratio']:.0%} of '{row['column']}' is numeric (sparse or mostly text).")
+    try:
+        conversion_report.to_csv(OUTPUT_CONVERSION_REPORT, index=False, encoding='utf-8-sig', float_format='%.4f')
+    except Exception as e:
+        print(f"Warning: Could not write {OUTPUT_CONVERSION_REPORT}: {e}", file=sys.stderr)
 
     if not stat_cols:
         print("\nError: No numeric statistic columns identified after cleaning.", file=sys.stderr)
@@ -115,136 +106,80 @@ if __name__ == "__main__":
     # Example: print first 5 stat_cols
     print(f"  Sample stats: {', '.join(stat_cols[:min(5, len(stat_cols))])}...")
     # GK stats identification (remains useful)
-    potential_gk_cols_in_stats = [c for c in stat_cols if 'gk' in c.lower() or 'goal' in c.lower() or 'sav' in c.lower() or 'pk' in c.lower() or 'ga' in c.lower() or 'cs' in c.lower()]
+    taxonomy = StatTaxonomy(stat_cols) # Every stat classified once; all tasks below look categories up here
+    potential_gk_cols_in_stats = taxonomy.columns_in('goalkeeping')
     if potential_gk_cols_in_stats:
         print(f"  Potential GK stats identified: {', '.join(sorted(potential_gk_cols_in_stats))}")
     else:
         print("  No columns matching typical Goalkeeping patterns found in identified stats.")
-    df_numeric = df_cleaned
-
-    print(f"\nCalculating Top/Bottom 3 players per statistic -> {OUTPUT_TOP_BOTTOM}")
+    df_numeric = df # ID columns only; the stats are read from numeric_block
+
+    stream_stats = None
+    if args.streaming:
+        print(f"\nStreaming statistics over chunks of {args.chunk_size} rows...")
+        stream_stats = StreamingStats(stat_cols, k=TOP_BOTTOM_K)
+        stream_stats.update(df_numeric, numeric_block.values)
+        for chunk in result_chunks:
+            stream_stats.update(chunk, coerce_numeric_block(chunk, stat_cols).values)
+        print(f"Processed {stream_stats.rows} rows. Medians are {'exact' if stream_stats.exact_medians() else 'KLL sketch estimates'}.")
+        if TOP_BOTTOM_TIES != 'first':
+            print(f"Note: --streaming keeps exactly {TOP_BOTTOM_K} players per list (ties='first').")
+
+    print(f"\nCalculating Top/Bottom {TOP_BOTTOM_K} players per statistic -> {OUTPUT_TOP_BOTTOM}")
     try:
+        ranked_cols = [col for col in stat_cols if col in df_numeric.columns]
+        if 'Player' not in df_numeric.columns: rankings = None
+        elif stream_stats is not None: rankings = stream_stats.top_k.to_frame()
+        else: rankings = rank_top_bottom(df_numeric, ranked_cols, k=TOP_BOTTOM_K, ties=TOP_BOTTOM_TIES, values=numeric_block.take(ranked_cols))
+        ranking_groups = dict(tuple(rankings.groupby(['Statistic', 'Direction'], sort=False))) if rankings is not None else {}
         with open(OUTPUT_TOP_BOTTOM, 'w', encoding='utf-8') as f:
-            f.write("Top and Bottom 3 Players per Statistic\n")
+            f.write(f"Top and Bottom {TOP_BOTTOM_K} Players per Statistic\n")
             f.write("=======================================\n\n")
             for col in stat_cols:
-                if 'Player' not in df_numeric.columns:
+                if rankings is None:
                     f.write(f"--- {col} ---\n")
                     f.write("Error: 'Player' column not found. Cannot determine top/bottom players.\n\n")
                     continue
-                
-                # Ensure the column actually exists in df_numeric before proceeding
                 if col not in df_numeric.columns:
                     f.write(f"--- {col} ---\n")
                     f.write(f"Error: Column '{col}' not found in DataFrame for Top/Bottom analysis.\n\n")
                     continue
-
-                stat_df = df_numeric[['Player', col]].copy()
-                stat_df[col] = pd.to_numeric(stat_df[col], errors='coerce') # Coerce to numeric
-                stat_df.dropna(subset=[col], inplace=True)
-
-                if stat_df.empty:
+                top_k = ranking_groups.get((col, 'top'))
+                bottom_k = ranking_groups.get((col, 'bottom'))
+                if top_k is None:
                     f.write(f"--- {col} ---\n")
                     f.write(f"No valid numeric data for this statistic ('{col}').\n\n")
                     continue
-                try:
-                    highest = stat_df.sort_values(by=col, ascending=False).set_index('Player')[col]
-                    lowest = stat_df.sort_values(by=col, ascending=True).set_index('Player')[col]
-                    top_3 = highest.head(3)
-                    bottom_3 = lowest.head(3)
-                    f.write(f"--- {col} ---\n")
-                    f.write("Top 3:\n")
-                    if not top_3.empty:
-                        for player, score in top_3.items():
-                            score_str = f"{score:.2f}" if pd.notna(score) else "N/A"
-                            f.write(f"  - {player}: {score_str}\n")
-                    else:
-                        f.write("  (No players found for Top 3)\n")
-                    f.write("\nBottom 3:\n")
-                    if not bottom_3.empty:
-                        for player, score in bottom_3.items():
-                            score_str = f"{score:.2f}" if pd.notna(score) else "N/A"
-                            f.write(f"  - {player}: {score_str}\n")
-                    else:
-                        f.write("  (No players found for Bottom 3)\n")
-                    f.write("\n---------------------------------------\n\n")
-                except Exception as sort_err:
-                    f.write(f"--- {col} ---\n")
-                    f.write(f"Error sorting data for statistic '{col}': {sort_err}\n\n")
-                    f.write("---------------------------------------\n\n")
-        print("Top/Bottom 3 players saved.")
+                f.write(f"--- {col} ---\n")
+                f.write(f"Top {TOP_BOTTOM_K}:\n")
+                for player, score in zip(top_k['Player'], top_k['Value']):
+                    f.write(f"  - {player}: {score:.2f}\n")
+                f.write(f"\nBottom {TOP_BOTTOM_K}:\n")
+                for player, score in zip(bottom_k['Player'], bottom_k['Value']):
+                    f.write(f"  - {player}: {score:.2f}\n")
+                f.write("\n---------------------------------------\n\n")
+        print(f"Top/Bottom {TOP_BOTTOM_K} players saved.")
     except Exception as e:
-        print(f"Error during Task 1 (Top/Bottom 3): {e}", file=sys.stderr)
+        print(f"Error during Task 1 (Top/Bottom {TOP_BOTTOM_K}): {e}", file=sys.stderr)
         print(traceback.format_exc(), file=sys.stderr)
 
     print(f"\nCalculating Median, Mean, Std Dev per statistic -> {OUTPUT_STATS_SUMMARY}")
-    results_data = []
+    team_aggregates = None # Built once here; the highest-team and analysis tasks below read it
     try:
-        if not stat_cols:
+        valid_stat_cols_for_agg = [sc for sc in stat_cols if sc in df_numeric.columns]
+        if not valid_stat_cols_for_agg:
             print("Warning: No numeric stats columns identified for Task 2.", file=sys.stderr)
         else:
-            # Ensure only existing stat_cols are used for aggregation
-            valid_stat_cols_for_agg = [sc for sc in stat_cols if sc in df_numeric.columns]
-            if not valid_stat_cols_for_agg:
-                 print("Warning: None of the identified stat_cols exist in the DataFrame for aggregation.", file=sys.stderr)
-            else:
-                global_agg = df_numeric[valid_stat_cols_for_agg].agg(['median', 'mean', 'std'])
-                for stat in valid_stat_cols_for_agg:
-                    if stat in global_agg.columns:
-                        results_data.append({
-                            'Team': 'all',
-                            'Statistic': stat,
-                            'Median': global_agg.loc['median', stat],
-                            'Mean': global_agg.loc['mean', stat],
-                            'Std': global_agg.loc['std', stat]
-                        })
-                    else:
-                        print(f"Warning: Statistic '{stat}' not found in global aggregation results.", file=sys.stderr)
-
-        if 'Team' in df_numeric.columns:
-            valid_teams_df = df_numeric[df_numeric['Team'].astype(str).str.lower() != 'all']
-            if not valid_teams_df.empty:
-                teams_for_grouping = valid_teams_df['Team'].unique()
-                if len(teams_for_grouping) > 0 and valid_stat_cols_for_agg: # Also check if there are stats to group by
-                    grouped = valid_teams_df.groupby('Team')[valid_stat_cols_for_agg]
-                    if not grouped.groups:
-                        print("Warning: Grouping by 'Team' resulted in empty groups.", file=sys.stderr)
-                    else:
-                        try:
-                            team_agg = grouped.agg(['median', 'mean', 'std'])
-                            if team_agg.empty:
-                                print("Warning: Aggregation per team produced empty results.", file=sys.stderr)
-                            else:
-                                for team_name_idx in team_agg.index:
-                                    for stat_col_name_agg in valid_stat_cols_for_agg:
-                                        median_key = (stat_col_name_agg, 'median')
-                                        mean_key = (stat_col_name_agg, 'mean')
-                                        std_key = (stat_col_name_agg, 'std')
-                                        if median_key in team_agg.columns and mean_key in team_agg.columns and std_key in team_agg.columns:
-                                            results_data.append({
-                                                'Team': team_name_idx,
-                                                'Statistic': stat_col_name_agg,
-                                                'Median': team_agg.loc[team_name_idx, median_key],
-                                                'Mean': team_agg.loc[team_name_idx, mean_key],
-                                                'Std': team_agg.loc[team_name_idx, std_key]
-                                            })
-                        except Exception as group_agg_e:
-                            print(f"Error during per-team aggregation: {group_agg_e}", file=sys.stderr)
-                            print(traceback.format_exc(), file=sys.stderr)
-                elif not valid_stat_cols_for_agg:
-                    print("Warning: No valid stat columns to perform per-team aggregation.", file=sys.stderr)
-                else:
-                    print("Warning: No unique teams found for per-team statistics (excluding 'all').", file=sys.stderr)
-            else:
-                print("Warning: DataFrame became empty after filtering out 'all' team. No per-team stats.", file=sys.stderr)
-        else:
-            print("Warning: 'Team' column not found. Cannot calculate per-team statistics.", file=sys.stderr)
+            team_aggregates = stream_stats.team_aggregates() if stream_stats is not None else TeamAggregates(df_numeric, valid_stat_cols_for_agg, values=numeric_block.take(valid_stat_cols_for_agg))
+            if 'Team' not in df_numeric.columns:
+                print("Warning: 'Team' column not found. Cannot calculate per-team statistics.", file=sys.stderr)
+            elif not len(team_aggregates.teams):
+                print("Warning: No unique teams found for per-team statistics (excluding 'all').", file=sys.stderr)
 
-        if not results_data:
+        if team_aggregates is None:
             print("Error: No statistics could be calculated for Task 2.", file=sys.stderr)
         else:
-            summary_long_df = pd.DataFrame(results_data)
-            summary_long_df.fillna(value=np.nan, inplace=True)
+            summary_long_df = team_aggregates.summary_long
             if summary_long_df.empty or not {'Team', 'Statistic', 'Median', 'Mean', 'Std'}.issubset(summary_long_df.columns):
                 print("Error: Cannot create pivot table due to missing columns or empty data frame after aggregation.", file=sys.stderr)
             else:
@@ -275,62 +210,33 @@ if __name__ == "__main__":
     # --- Task: Identify teams with the highest average score per statistic (Requirement 1) ---
     print(f"\nIdentifying teams with the highest average score per statistic -> {OUTPUT_HIGHEST_SCORING_TEAMS}")
     highest_scoring_teams_dict = {} # Renamed to avoid conflict
-    if 'Team' in df_numeric.columns and stat_cols: # Check if stat_cols is not empty
+    if team_aggregates is not None and len(team_aggregates.teams):
         try:
-            valid_teams_df_for_means = df_numeric[df_numeric['Team'].astype(str).str.lower() != 'all'].copy()
-            # Ensure only existing stat_cols are used
-            existing_stat_cols_for_means = [sc for sc in stat_cols if sc in valid_teams_df_for_means.columns]
-
-            if not valid_teams_df_for_means.empty and existing_stat_cols_for_means:
-                for col in existing_stat_cols_for_means: # Ensure numeric type for mean calculation
-                    valid_teams_df_for_means[col] = pd.to_numeric(valid_teams_df_for_means[col], errors='coerce')
-                
-                team_means = valid_teams_df_for_means.groupby('Team')[existing_stat_cols_for_means].mean()
-
-                if not team_means.empty:
-                    with open(OUTPUT_HIGHEST_SCORING_TEAMS, 'w', encoding='utf-8') as f_highest:
-                        f_highest.write("Team with Highest Average Score per Statistic\n")
-                        f_highest.write("=============================================\n\n")
-                        for col in existing_stat_cols_for_means:
-                            if col in team_means.columns and team_means[col].notna().any():
-                                try:
-                                    best_team_idx = team_means[col].idxmax()
-                                    highest_score_val = team_means[col].max()
-                                    highest_scoring_teams_dict[col] = (best_team_idx, highest_score_val)
-                                    f_highest.write(f"- Highest Avg {col}: {best_team_idx} ({highest_score_val:.2f})\n")
-                                    # print(f"- Highest Avg {col}: {best_team_idx} ({highest_score_val:.2f})") # Optional console print
-                                except ValueError:
-                                    f_highest.write(f"- Highest Avg {col}: N/A (all values NaN or empty after grouping)\n")
-                                except Exception as idxmax_e:
-                                    f_highest.write(f"- Highest Avg {col}: Error ({idxmax_e})\n")
-                            else:
-                                f_highest.write(f"- Highest Avg {col}: N/A (column data insufficient or all NaN)\n")
-                    print(f"Highest scoring team data saved to {OUTPUT_HIGHEST_SCORING_TEAMS}")
-                else:
-                    print("Warning: Calculating team means resulted in an empty DataFrame.", file=sys.stderr)
-            elif not existing_stat_cols_for_means:
-                 print("Warning: No valid statistic columns found in DataFrame to calculate team means.", file=sys.stderr)
-            else: # valid_teams_df_for_means is empty
-                print("Warning: No valid team data (excluding 'all') to calculate highest scores.", file=sys.stderr)
+            with open(OUTPUT_HIGHEST_SCORING_TEAMS, 'w', encoding='utf-8') as f_highest:
+                f_highest.write("Team with Highest Average Score per Statistic\n")
+                f_highest.write("=============================================\n\n")
+                for col in team_aggregates.stats:
+                    best = team_aggregates.best_team(col)
+                    if best is not None:
+                        highest_scoring_teams_dict[col] = best
+                        f_highest.write(f"- Highest Avg {col}: {best[0]} ({best[1]:.2f})\n")
+                    else:
+                        f_highest.write(f"- Highest Avg {col}: N/A (column data insufficient or all NaN)\n")
+            print(f"Highest scoring team data saved to {OUTPUT_HIGHEST_SCORING_TEAMS}")
         except Exception as e:
             print(f"Error during Highest Team Scores task: {e}", file=sys.stderr)
             print(traceback.format_exc(), file=sys.stderr)
     elif not 'Team' in df_numeric.columns:
         print("Warning: 'Team' column not found. Cannot perform Highest Team Scores task.", file=sys.stderr)
-    else: # stat_cols is empty
-        print("Warning: No numeric statistics identified. Cannot perform Highest Team Scores task.", file=sys.stderr)
+    else: # No stats or no teams
+        print("Warning: No team means available. Cannot perform Highest Team Scores task.", file=sys.stderr)
 
 
     # --- Filter stats for histograms (Requirement 2) ---
     print("\nSelecting Offensive and Defensive statistics for histogram generation...")
     stats_for_histograms = []
     if stat_cols: # Ensure stat_cols is not empty
-        all_hist_patterns = HISTOGRAM_OFFENSIVE_PATTERNS + HISTOGRAM_DEFENSIVE_PATTERNS
-        for col in stat_cols:
-            if col not in df_numeric.columns: continue # Skip if col somehow isn't in df
-            col_lower = col.lower()
-            if any(pattern in col_lower for pattern in all_hist_patterns):
-                stats_for_histograms.append(col)
+        stats_for_histograms = [col for col in taxonomy.columns_in('histogram_offensive', 'histogram_defensive') if col in df_numeric.columns]
 
     if not stats_for_histograms:
         print("Warning: No offensive or defensive statistics identified for histogram plotting based on current patterns.", file=sys.stderr)
@@ -348,60 +254,33 @@ if __name__ == "__main__":
         print(f"Error creating histogram directories: {e}", file=sys.stderr)
         # Decide if to exit or continue: sys.exit(1) or pass
 
-    plot_errors_all = 0
-    plots_generated_all = 0
-    plot_errors_teams = 0
-    plots_generated_teams = 0
-
-    for col in stats_for_histograms: # Use the filtered list
-        try:
-            data_to_plot_all = df_numeric[col].dropna() # Ensure col exists
-            if data_to_plot_all.empty or not pd.api.types.is_numeric_dtype(data_to_plot_all):
-                pass
-            else:
-                plt.figure(figsize=(10, 6))
-                plt.hist(data_to_plot_all, bins=20, edgecolor='black', color='skyblue')
-                plt.title(f'Distribution of {col} (All Players)')
-                plt.xlabel(col)
-                plt.ylabel('Frequency (Number of Players)')
-                plt.grid(axis='y', alpha=0.75)
-                safe_col_name = "".join(c if c.isalnum() else "_" for c in col)
-                plot_filename_all = os.path.join(hist_path_all, f'hist_all_{safe_col_name}.png')
-                plt.savefig(plot_filename_all)
-                plt.close()
-                plots_generated_all += 1
-        except Exception as e:
-            plot_errors_all += 1
-            print(f"Error generating histogram for {col} (All Players): {e}", file=sys.stderr)
-            plt.close()
-
-        if 'Team' in df_numeric.columns:
-            # Ensure team names are strings for filtering and file naming
-            teams_list = df_numeric[df_numeric['Team'].astype(str).str.lower() != 'all']['Team'].astype(str).dropna().unique()
-            if len(teams_list) == 0:
-                continue
-            for team_name_str in teams_list:
-                try:
-                    team_data = df_numeric[df_numeric['Team'] == team_name_str][col].dropna()
-                    if team_data.empty or not pd.api.types.is_numeric_dtype(team_data):
-                        continue
-                    plt.figure(figsize=(8, 5))
-                    plt.hist(team_data, bins=15, edgecolor='black', color='lightcoral')
-                    plt.title(f'Distribution of {col} for {team_name_str}', fontsize=10)
-                    plt.xlabel(col, fontsize=9)
-                    plt.ylabel('Frequency', fontsize=9)
-                    plt.xticks(fontsize=8); plt.yticks(fontsize=8)
-                    plt.grid(axis='y', alpha=0.6)
-                    safe_col_name = "".join(c if c.isalnum() else "_" for c in col)
-                    safe_team_name = "".join(c if c.isalnum() else "_" for c in team_name_str) # team_name_str is already string
-                    plot_filename_team = os.path.join(hist_path_teams, f'hist_{safe_team_name}_{safe_col_name}.png')
-                    plt.savefig(plot_filename_team)
-                    plt.close()
-                    plots_generated_teams += 1
-                except Exception as e:
-                    plot_errors_teams += 1
-                    print(f"Error generating histogram for {col} - {team_name_str}: {e}", file=sys.stderr)
-                    plt.close()
+    print(f"  Pre-binning {len(stats_for_histograms)} stats (all players and per team)...")
+    if stream_stats is not None: # Second pass: bins are fixed by the min/max found in the first one
+        stream_histograms = StreamingHistograms(stats_for_histograms, stream_stats)
+        for chunk in iter_results_chunks(INPUT_FEATHER, INPUT_CSV, args.chunk_size):
+            stream_histograms.update(chunk, coerce_numeric_block(chunk, stats_for_histograms).values)
+        hist_jobs = stream_histograms.jobs(hist_path_all, hist_path_teams)
+    else:
+        hist_jobs = prebin_histograms(df_numeric, stats_for_histograms, hist_path_all, hist_path_teams, values=numeric_block.take(stats_for_histograms))
+    print(f"  Rendering {len(hist_jobs)} histograms on {HISTOGRAM_WORKERS} processes...")
+    render_started = time.perf_counter()
+    try:
+        render_results = render_histograms(hist_jobs, max_workers=HISTOGRAM_WORKERS)
+    except Exception as e:
+        print(f"Error in parallel histogram rendering ({e}). Retrying in this process.", file=sys.stderr)
+        render_results = render_histograms(hist_jobs, max_workers=1)
+    report_render_timings(render_results, time.perf_counter() - render_started, os.path.join(OUTPUT_HISTOGRAM_DIR, HIST_TIMINGS_CSV))
+
+    plots_generated_all = plot_errors_all = plots_generated_teams = plot_errors_teams = 0
+    for plot_file, plot_team, plot_seconds, plot_error in render_results:
+        if plot_error:
+            print(f"Error generating histogram {plot_file}: {plot_error}", file=sys.stderr)
+        if plot_team is None:
+            plots_generated_all += plot_error is None
+            plot_errors_all += plot_error is not None
+        else:
+            plots_generated_teams += plot_error is None
+            plot_errors_teams += plot_error is not None
 
     print(f"\nHistograms generation summary (Offensive/Defensive Stats):")
     print(f"  - All Players: {plots_generated_all} successful, {plot_errors_all} errors.")
@@ -413,35 +292,16 @@ if __name__ == "__main__":
     analysis_text = "Based on the average statistics per team:\n"
     team_mentions_high = {}
     team_mentions_low = {}
-    
-    # Define patterns for interpreting stats (can be reused or adjusted)
-    # These are used for the textual analysis part.
-    LOWER_IS_BETTER_PATTERNS = ['ga', 'goals_against', 'offside', 'fls', 'foul', 'lost', 'crd', 'card', 'pkcon', 'err_leading_to_shot'] # Added more specific
-    KEY_OFFENSIVE_PATTERNS_TEXT = ['gls', 'goal', 'xg', 'sot', 'sca', 'gca', 'att_pen', 'shot', 'assist', 'key_pass', 'prog_pass_rec']
-    KEY_DEFENSIVE_PATTERNS_TEXT = ['tklw', 'tackles_won', 'int', 'interception', 'block', 'clr', 'clearance', 'sav', 'save', 'cs', 'clean_sheet', 'aerial_won']
-    KEY_POSSESSION_PATTERNS_TEXT = ['cmp_pct', 'pass_accuracy', 'prgp', 'progressive_pass', 'prgc', 'progressive_carr', 'touch', 'progression', 'prog']
 
 
     if highest_scoring_teams_dict:
-        current_team_means_for_analysis = pd.DataFrame() # Initialize
-        if 'Team' in df_numeric.columns and stat_cols:
-            temp_df = df_numeric[df_numeric['Team'].astype(str).str.lower() != 'all'].copy()
-            valid_cols = [c for c in stat_cols if c in temp_df.columns]
-            if valid_cols:
-                for c in valid_cols: temp_df[c] = pd.to_numeric(temp_df[c], errors='coerce')
-                current_team_means_for_analysis = temp_df.groupby('Team')[valid_cols].mean()
-
         for stat, (team, score) in highest_scoring_teams_dict.items():
-            stat_lower = stat.lower()
-            is_lower_better_stat = any(pattern in stat_lower for pattern in LOWER_IS_BETTER_PATTERNS)
+            is_lower_better_stat = taxonomy.is_in(stat, 'lower_is_better')
 
             if is_lower_better_stat:
-                if not current_team_means_for_analysis.empty and stat in current_team_means_for_analysis.columns and current_team_means_for_analysis[stat].notna().any():
-                    try:
-                        min_team_idx = current_team_means_for_analysis[stat].idxmin()
-                        team_mentions_low[min_team_idx] = team_mentions_low.get(min_team_idx, 0) + 1
-                    except ValueError: pass # All NaN for this stat
-                    except Exception as min_err: print(f"  (Error determining min for {stat}: {min_err})")
+                worst = team_aggregates.worst_team(stat)
+                if worst is not None:
+                    team_mentions_low[worst[0]] = team_mentions_low.get(worst[0], 0) + 1
             else:
                 team_mentions_high[team] = team_mentions_high.get(team, 0) + 1
         
@@ -453,26 +313,23 @@ if __name__ == "__main__":
         if most_mentioned_low:
             analysis_text += f"- '{most_mentioned_low[0][0]}' leads {most_mentioned_low[0][1]} 'lower-is-better' stats.\n"
 
-        def get_leaders_text_analysis(patterns, means_df, lower_better_def):
+        def get_leaders_text_analysis(categories, aggregates):
             leaders = {} # Store as {team: count_of_leading_stats}
-            if means_df.empty: return {"N/A"}
-            for stat_col in means_df.columns:
-                stat_col_lower = stat_col.lower()
-                if any(p in stat_col_lower for p in patterns):
-                    if means_df[stat_col].notna().any():
-                        try:
-                            best_team = means_df[stat_col].idxmin() if any(lb in stat_col_lower for lb in lower_better_def) else means_df[stat_col].idxmax()
-                            leaders[best_team] = leaders.get(best_team, 0) + 1
-                        except ValueError: pass # All NaN
+            if not len(aggregates.teams): return {"N/A"}
+            for stat_col in aggregates.stats:
+                if taxonomy.is_in(stat_col, *categories):
+                    leader = aggregates.worst_team(stat_col) if taxonomy.is_in(stat_col, 'lower_is_better') else aggregates.best_team(stat_col)
+                    if leader is not None: # None = all team means NaN
+                        leaders[leader[0]] = leaders.get(leader[0], 0) + 1
             # Return teams sorted by how many relevant stats they lead
             sorted_leaders = sorted(leaders.items(), key=lambda x:x[1], reverse=True)
             return {team for team, count in sorted_leaders[:3]} if sorted_leaders else {"N/A"} # Top 3 or N/A
 
 
-        if not current_team_means_for_analysis.empty:
-            off_leaders = get_leaders_text_analysis(KEY_OFFENSIVE_PATTERNS_TEXT, current_team_means_for_analysis, LOWER_IS_BETTER_PATTERNS)
-            def_leaders = get_leaders_text_analysis(KEY_DEFENSIVE_PATTERNS_TEXT + LOWER_IS_BETTER_PATTERNS, current_team_means_for_analysis, LOWER_IS_BETTER_PATTERNS) # include lower_is_better in def patterns
-            poss_leaders = get_leaders_text_analysis(KEY_POSSESSION_PATTERNS_TEXT, current_team_means_for_analysis, LOWER_IS_BETTER_PATTERNS)
+        if len(team_aggregates.teams):
+            off_leaders = get_leaders_text_analysis(['key_offensive'], team_aggregates)
+            def_leaders = get_leaders_text_analysis(['key_defensive', 'lower_is_better'], team_aggregates) # include lower_is_better in def patterns
+            poss_leaders = get_leaders_text_analysis(['key_possession'], team_aggregates)
             analysis_text += f"- Offensive Leaders (top teams by # of led stats): {', '.join(sorted(list(off_leaders)))}\n"
             analysis_text += f"- Defensive Leaders: {', '.join(sorted(list(def_leaders)))}\n"
             analysis_text += f"- Possession Leaders: {', '.join(sorted(list(poss_leaders)))}\n"
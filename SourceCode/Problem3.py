@@ -1,172 +1,247 @@
+import argparse
+import matplotlib
+matplotlib.use('Agg') # Plots are written to files, never shown in a window
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.decomposition import PCA
 import matplotlib.pyplot as plt
 import seaborn as sns
-
-# Load the dataset
-try:
-    df = pd.read_csv('results.csv')
-    print(f"Successfully loaded results.csv. Dataset size: {df.shape}")
-except FileNotFoundError:
-    print("Error: File 'results.csv' not found.")
-    print("Please ensure you have run the BTL-BAI1.py script first and the CSV file is created in the same directory.")
-    exit()
-except Exception as e:
-    print(f"Error while reading CSV file: {e}")
-    exit()
-
-# Extract player information
-player_info = df[['Player', 'Team', 'Position', 'Age']].copy()
-
-# Identify numeric and categorical features
-potential_numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
-cols_to_exclude = ['Age']
-numeric_features = [col for col in potential_numeric_cols if col not in cols_to_exclude]
-categorical_features = ['Position']
-
-# Create features dataframe
-features_df = df[numeric_features + categorical_features].copy()
-
-# Define preprocessing pipelines
-numeric_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='mean')),
-    ('scaler', StandardScaler())
-])
-
-categorical_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='most_frequent')),
-    ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
-])
-
-# Combine preprocessors
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', numeric_transformer, numeric_features),
-        ('cat', categorical_transformer, categorical_features)
-    ],
-    remainder='drop'
-)
-
-# Preprocess the data
-try:
-    X_processed = preprocessor.fit_transform(features_df)
-    print(f"Data preprocessing completed. Feature matrix size: {X_processed.shape}")
+from results_io import read_results
+from clustering import (MINIBATCH_SIZE, MINIBATCH_EPOCHS, batched_inertia_and_labels, minibatch_elbow,
+                        parallel_k_sweep, score_clustering, select_k, save_selection_curves, SWEEP_SEEDS)
+from model_artifacts import ARTIFACT_DIR, artifact_key, load_artifacts, save_artifacts, mark_latest
+from similarity_index import ensure_similarity_indexes
+from reduction import PCA_SOLVERS, PCA_BATCH_SIZE, fit_reduction
+
+OUTPUT_SELECTION_PLOT = 'k_selection_curves.png'
+OUTPUT_SELECTION_CSV = 'k_selection.csv'
+OUTPUT_CLUSTER_PLOT = 'clusters_pca_2d.png'
+# With --pca-solver randomized/incremental the one-hot block is encoded sparse, but the stacked matrix is only kept
+# as CSR when its density (one non-zero per categorical feature + every numeric column, over all columns) is below
+# this; otherwise a dense numeric block would be stored as CSR (value + index per cell) and slow KMeans/PCA down
+SPARSE_THRESHOLD = 0.3
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cluster players (KMeans) on the Problem1 results table")
+    parser.add_argument('--cluster-mode', choices=['full', 'minibatch'], default='full',
+                        help="'full': one KMeans per (k, seed) on a process pool, best seed kept per k; 'minibatch': MiniBatchKMeans trained with partial_fit on row batches, warm-started across k")
+    parser.add_argument('--batch-size', type=int, default=MINIBATCH_SIZE, help="Rows per batch in minibatch mode")
+    parser.add_argument('--epochs', type=int, default=MINIBATCH_EPOCHS, help="Passes over the batches per k in minibatch mode")
+    parser.add_argument('--workers', type=int, default=None, help="Processes for the (k, seed) sweep in full mode (default: CPU count)")
+    parser.add_argument('--k', type=int, default=None, help="Use this number of clusters instead of the automatic choice")
+    parser.add_argument('--pca-solver', choices=PCA_SOLVERS, default='full',
+                        help="'full': dense PCA (full SVD); 'randomized'/'incremental': randomized SVD or IncrementalPCA over batches, with a sparse matrix when the one-hot block dominates it")
+    parser.add_argument('--pca-batch-size', type=int, default=PCA_BATCH_SIZE, help="Rows per batch for --pca-solver incremental")
+    parser.add_argument('--refit', action='store_true', help=f"Ignore the fitted artifacts in '{ARTIFACT_DIR}' and fit everything again")
+    args = parser.parse_args()
+
+    # Load the dataset
+    try:
+        df = read_results('results.feather', 'results.csv')
+        print(f"Successfully loaded results. Dataset size: {df.shape}")
+    except FileNotFoundError:
+        print("Error: Neither 'results.feather' nor 'results.csv' was found.")
+        print("Please ensure you have run the BTL-BAI1.py script first and the CSV file is created in the same directory.")
+        exit()
+    except Exception as e:
+        print(f"Error while reading CSV file: {e}")
+        exit()
+
+    # Extract player information
+    player_info = df[['Player', 'Team', 'Position', 'Age']].copy()
+
+    # Identify numeric and categorical features
+    potential_numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
+    cols_to_exclude = ['Age']
+    numeric_features = [col for col in potential_numeric_cols if col not in cols_to_exclude]
+    categorical_features = ['Position']
+
+    # Create features dataframe
+    features_df = df[numeric_features + categorical_features].copy()
+
+    # Look up fitted artifacts for this exact schema, data and settings
+    possible_k = range(2, 11)
+    fit_settings = {'cluster_mode': args.cluster_mode, 'possible_k': list(possible_k)}
+    if args.cluster_mode == 'minibatch':
+        fit_settings.update(batch_size=args.batch_size, epochs=args.epochs)
+    else:
+        fit_settings.update(seeds=list(SWEEP_SEEDS))
+    fit_settings.update(pca_solver=args.pca_solver, pca_batch_size=args.pca_batch_size if args.pca_solver == 'incremental' else None)
+    keep_sparse = args.pca_solver != 'full' # Sparse one-hot block; see SPARSE_THRESHOLD for when the stacked matrix stays sparse
+    if keep_sparse:
+        fit_settings.update(sparse_threshold=SPARSE_THRESHOLD)
+    cache_key = artifact_key(features_df, fit_settings)
+    cached = None if args.refit else load_artifacts(cache_key)
+    print(f"Artifact key {cache_key}: " + ("reusing the fitted preprocessor, KMeans models and PCA." if cached else "fitting from scratch."))
+
+    # Define preprocessing pipelines
+    numeric_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='mean')),
+        ('scaler', StandardScaler())
+    ])
+
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=keep_sparse))
+    ])
+
+    # Combine preprocessors
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, numeric_features),
+            ('cat', categorical_transformer, categorical_features)
+        ],
+        remainder='drop',
+        sparse_threshold=SPARSE_THRESHOLD # CSR only when the stacked matrix is mostly zeros, i.e. the one-hot block dominates
+    )
+
+    # Preprocess the data (transform only when the fitted preprocessor is cached)
     try:
-        feature_names_out = preprocessor.get_feature_names_out()
-    except AttributeError:
-        feature_names_out = numeric_features + \
-                            list(preprocessor.transformers_[1][1].named_steps['onehot'] \
-                                 .get_feature_names_out(categorical_features))
-except Exception as e:
-    print(f"Error during data preprocessing: {e}")
-    print("Selected numeric columns:", numeric_features)
-    print("Selected categorical columns:", categorical_features)
-    print("Data types of numeric columns:")
-    print(df[numeric_features].dtypes)
-    print("Data types of categorical columns:")
-    print(df[categorical_features].dtypes)
-    print("Number of NA values in numeric columns:")
-    print(df[numeric_features].isna().sum())
-    print("Number of NA values in categorical columns:")
-    print(df[categorical_features].isna().sum())
-    exit()
-
-# Calculate inertia for different k values (Elbow Method)
-inertia = []
-possible_k = range(2, 11)
-
-print("\nCalculating Inertia for different k values (Elbow Method)...")
-for k in possible_k:
-    kmeans = KMeans(n_clusters=k, init='k-means++', random_state=42, n_init=10)
-    kmeans.fit(X_processed)
-    inertia.append(kmeans.inertia_)
-
-# Plot the Elbow curve
-plt.figure(figsize=(10, 6))
-plt.plot(possible_k, inertia, marker='o')
-plt.title('Elbow Method for Determining Optimal Number of Clusters (k)')
-plt.xlabel('Number of Clusters (k)')
-plt.ylabel('Inertia (Within-cluster Sum of Squares)')
-plt.xticks(possible_k)
-plt.grid(True)
-plt.show()
-
-# Select optimal number of clusters
-optimal_k = 4
-print(f"\n=> Based on the Elbow plot, selected k = {optimal_k}")
-
-# Perform final clustering
-kmeans_final = KMeans(n_clusters=optimal_k, init='k-means++', random_state=42, n_init=10)
-clusters = kmeans_final.fit_predict(X_processed)
-
-# Add cluster labels to dataframes
-player_info['Cluster'] = clusters
-df['Cluster'] = clusters
-
-print(f"\nAssigned {len(df)} players to {optimal_k} clusters.")
-print("Number of players in each cluster:")
-print(player_info['Cluster'].value_counts().sort_index())
-
-# Perform PCA for dimensionality reduction
-print("\nPerforming PCA to reduce data to 2 dimensions...")
-pca = PCA(n_components=2, random_state=42)
-X_pca = pca.fit_transform(X_processed)
-
-# Create PCA dataframe
-pca_df = pd.DataFrame(data=X_pca, columns=['Principal Component 1', 'Principal Component 2'])
-pca_df['Cluster'] = clusters
-pca_df['Player'] = player_info['Player'].values
-pca_df['Position'] = player_info['Position'].values
-
-# Plot 2D cluster visualization
-print("Plotting 2D cluster visualization...")
-plt.figure(figsize=(12, 8))
-sns.scatterplot(
-    x="Principal Component 1", y="Principal Component 2",
-    hue="Cluster",
-    palette=sns.color_palette("hsv", optimal_k),
-    data=pca_df,
-    legend="full",
-    alpha=0.8
-)
-
-plt.title(f'Player Clustering ({optimal_k} Clusters) After PCA Reduction')
-plt.xlabel('Principal Component 1')
-plt.ylabel('Principal Component 2')
-plt.grid(True)
-plt.show()
-
-# Analyze cluster characteristics
-print(f"\nAnalyzing basic characteristics of {optimal_k} clusters:")
-cluster_summary = player_info.groupby('Cluster').agg(
-    count=('Player', 'size'),
-    common_position=('Position', lambda x: x.mode()[0] if not x.mode().empty else 'N/A'),
-    avg_age=('Age', lambda x: pd.to_numeric(x, errors='coerce').mean())
-).reset_index()
-
-print("\nOverview of cluster characteristics (Count, Most Common Position, Average Age):")
-print(cluster_summary)
-
-# Calculate mean statistics for each cluster
-print("\nMean values of original statistics for each cluster:")
-numeric_original_df = df[numeric_features + ['Cluster']].copy()
-for col in numeric_features:
-    numeric_original_df[col] = pd.to_numeric(numeric_original_df[col], errors='coerce')
-
-cluster_means = numeric_original_df.groupby('Cluster').mean()
-print(cluster_means.round(2))
-
-# PCA information
-print("\nPCA Information:")
-explained_variance = pca.explained_variance_ratio_
-print(f"Variance explained by PC1: {explained_variance[0]:.2%}")
-print(f"Variance explained by PC2: {explained_variance[1]:.2%}")
-print(f"Total variance explained by 2 PCs: {explained_variance.sum():.2%}")
-
-print("\n--- End ---")
+        if cached:
+            preprocessor = cached['preprocessor']
+            X_processed = preprocessor.transform(features_df)
+        else:
+            X_processed = preprocessor.fit_transform(features_df)
+        print(f"Data preprocessing completed. Feature matrix size: {X_processed.shape}" + (" (sparse CSR)" if sp.issparse(X_processed) else ""))
+        try:
+            feature_names_out = preprocessor.get_feature_names_out()
+        except AttributeError:
+            feature_names_out = numeric_features + \
+                                list(preprocessor.transformers_[1][1].named_steps['onehot'] \
+                                     .get_feature_names_out(categorical_features))
+    except Exception as e:
+        print(f"Error during data preprocessing: {e}")
+        print("Selected numeric columns:", numeric_features)
+        print("Selected categorical columns:", categorical_features)
+        print("Data types of numeric columns:")
+        print(df[numeric_features].dtypes)
+        print("Data types of categorical columns:")
+        print(df[categorical_features].dtypes)
+        print("Number of NA values in numeric columns:")
+        print(df[numeric_features].isna().sum())
+        print("Number of NA values in categorical columns:")
+        print(df[categorical_features].isna().sum())
+        exit()
+
+    # Fit the k grid and score every k (inertia, sampled silhouette, Davies-Bouldin)
+    if cached:
+        models, labels_by_k = cached['models'], {}
+        inertia, silhouette, davies_bouldin = cached['inertia'], cached['silhouette'], cached['davies_bouldin']
+    elif args.cluster_mode == 'minibatch':
+        print(f"\nFitting k = {possible_k.start}..{possible_k.stop - 1} and scoring each k ({args.cluster_mode} mode)...")
+        models, inertia = minibatch_elbow(X_processed, possible_k, batch_size=args.batch_size, epochs=args.epochs)
+        labels_by_k = {k: batched_inertia_and_labels(models[k], X_processed, args.batch_size)[1] for k in possible_k}
+        scores = [score_clustering(X_processed, labels_by_k[k]) for k in possible_k]
+        silhouette, davies_bouldin = [s for s, _ in scores], [d for _, d in scores]
+    else:
+        print(f"\nFitting k = {possible_k.start}..{possible_k.stop - 1} and scoring each k ({args.cluster_mode} mode)...")
+        models, inertia, silhouette, davies_bouldin = parallel_k_sweep(X_processed, possible_k, max_workers=args.workers)
+        labels_by_k = {k: models[k].labels_ for k in possible_k}
+
+    # Select the number of clusters (rule documented in clustering.select_k)
+    auto_k, selection_table = select_k(possible_k, inertia, silhouette, davies_bouldin)
+    optimal_k = args.k if args.k is not None else auto_k
+    print(selection_table.round(4).to_string(index=False))
+    if args.k is not None:
+        print(f"\n=> Using k = {optimal_k} from --k (automatic choice: k = {auto_k})")
+    else:
+        print(f"\n=> Selected k = {optimal_k} (lowest rank sum of elbow distance, silhouette and Davies-Bouldin)")
+    save_selection_curves(selection_table, optimal_k, OUTPUT_SELECTION_PLOT, OUTPUT_SELECTION_CSV)
+    print(f"Saved the selection curves to '{OUTPUT_SELECTION_PLOT}' and the table to '{OUTPUT_SELECTION_CSV}'.")
+
+    # Final clustering: the model of the chosen k from the sweep (or the artifacts) is reused, nothing is refitted
+    artifacts_changed = not cached
+    if optimal_k in labels_by_k:
+        kmeans_final, clusters = models[optimal_k], labels_by_k[optimal_k]
+    elif optimal_k in models:
+        kmeans_final = models[optimal_k]
+        clusters = batched_inertia_and_labels(kmeans_final, X_processed, args.batch_size)[1]
+    else:
+        kmeans_final = KMeans(n_clusters=optimal_k, init='k-means++', random_state=42, n_init=10)
+        clusters = kmeans_final.fit_predict(X_processed)
+        models[optimal_k], artifacts_changed = kmeans_final, True
+
+    # Add cluster labels to dataframes
+    player_info['Cluster'] = clusters
+    df['Cluster'] = clusters
+
+    print(f"\nAssigned {len(df)} players to {optimal_k} clusters.")
+    print("Number of players in each cluster:")
+    print(player_info['Cluster'].value_counts().sort_index())
+
+    # Perform PCA for dimensionality reduction
+    print(f"\nPerforming PCA to reduce data to 2 dimensions ({args.pca_solver} solver)...")
+    if cached:
+        pca = cached['pca']
+        X_pca = pca.transform(X_processed)
+    else:
+        pca, X_pca = fit_reduction(X_processed, args.pca_solver, n_components=2, batch_size=args.pca_batch_size)
+
+    # Persist the fitted objects so later runs and new players only need transform/predict
+    if artifacts_changed:
+        save_artifacts(cache_key, {'numeric_features': numeric_features, 'categorical_features': categorical_features,
+                                   'preprocessor': preprocessor, 'models': models, 'pca': pca, 'inertia': list(inertia),
+                                   'silhouette': list(silhouette), 'davies_bouldin': list(davies_bouldin)}, fit_settings)
+        print(f"Saved the fitted artifacts to '{ARTIFACT_DIR}/{cache_key}'.")
+    mark_latest(cache_key, optimal_k)
+    ensure_similarity_indexes(cache_key, X_processed, player_info) # For `python similarity_index.py <player>` queries
+
+    # Create PCA dataframe
+    pca_df = pd.DataFrame(data=X_pca, columns=['Principal Component 1', 'Principal Component 2'])
+    pca_df['Cluster'] = clusters
+    pca_df['Player'] = player_info['Player'].values
+    pca_df['Position'] = player_info['Position'].values
+
+    # Plot 2D cluster visualization
+    print("Plotting 2D cluster visualization...")
+    plt.figure(figsize=(12, 8))
+    sns.scatterplot(
+        x="Principal Component 1", y="Principal Component 2",
+        hue="Cluster",
+        palette=sns.color_palette("hsv", optimal_k),
+        data=pca_df,
+        legend="full",
+        alpha=0.8
+    )
+
+    plt.title(f'Player Clustering ({optimal_k} Clusters) After PCA Reduction')
+    plt.xlabel('Principal Component 1')
+    plt.ylabel('Principal Component 2')
+    plt.grid(True)
+    plt.savefig(OUTPUT_CLUSTER_PLOT)
+    plt.close()
+    print(f"Saved the cluster plot to '{OUTPUT_CLUSTER_PLOT}'.")
+
+    # Analyze cluster characteristics
+    print(f"\nAnalyzing basic characteristics of {optimal_k} clusters:")
+    cluster_summary = player_info.groupby('Cluster').agg(
+        count=('Player', 'size'),
+        common_position=('Position', lambda x: x.mode()[0] if not x.mode().empty else 'N/A'),
+        avg_age=('Age', lambda x: pd.to_numeric(x, errors='coerce').mean())
+    ).reset_index()
+
+    print("\nOverview of cluster characteristics (Count, Most Common Position, Average Age):")
+    print(cluster_summary)
+
+    # Calculate mean statistics for each cluster
+    print("\nMean values of original statistics for each cluster:")
+    numeric_original_df = df[numeric_features + ['Cluster']].copy()
+    for col in numeric_features:
+        numeric_original_df[col] = pd.to_numeric(numeric_original_df[col], errors='coerce')
+
+    cluster_means = numeric_original_df.groupby('Cluster').mean()
+    print(cluster_means.round(2))
+
+    # PCA information
+    print("\nPCA Information:")
+    explained_variance = pca.explained_variance_ratio_
+    print(f"Variance explained by PC1: {explained_variance[0]:.2%}")
+    print(f"Variance explained by PC2: {explained_variance[1]:.2%}")
+    print(f"Total variance explained by 2 PCs: {explained_variance.sum():.2%}")
+
+    print("\n--- End ---")
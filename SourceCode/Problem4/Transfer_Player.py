@@ -1,11 +1,29 @@
 # --- Import necessary libraries ---
+import argparse
+import os
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import WebDriverException
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # SourceCode/ for shared helpers
+from scraping_utils import DriverPool, HostRateLimiter, default_page_cache
+from transfer_parsing import PLAYER_COLUMNS, discover_page_count, parse_player_table
+
+# --- Crawl configuration: pages are fetched by a pool of Chrome instances, throttled by a per-host token bucket ---
+TRANSFER_MAX_WORKERS = 3            # Chrome instances fetching list pages in parallel
+TRANSFER_RATE_LIMIT_PER_MINUTE = 20 # Sustained page loads per minute to footballtransfers.com
+TRANSFER_RATE_LIMIT_BURST = 3       # Page loads allowed back-to-back before the sustained rate applies
+TABLE_WAIT_SECONDS = 15             # Max wait for the player table to render (replaces the flat 3 s sleep)
+PLAYER_TABLE_CSS = 'table.similar-players-table'
+EMPTY_PAGE = pd.DataFrame(columns=PLAYER_COLUMNS)
 
 # --- Function to set up Selenium WebDriver ---
 def setup_driver():
@@ -24,117 +42,148 @@ def setup_driver():
         print(f"Unknown error initializing driver: {e}")
         return None
 
-# --- Function to scrape data from a specific URL ---
-def scrape_page(driver, url):
-    """Scrape player data from a URL using Selenium driver."""
+# --- Function to start a driver for the DriverPool (raises instead of returning None) ---
+def create_driver():
+    driver = setup_driver()
     if driver is None:
-        print("Error: Invalid driver.")
-        return []
-    try:
+        raise WebDriverException("Could not start Chrome")
+    return driver
+
+# --- Function to get the HTML of a list page: the page cache when fresh, else a pooled Chrome instance ---
+def fetch_page_html(url, driver_pool, page_cache=None, rate_limiter=None):
+    if page_cache is not None and page_cache.is_fresh(url) and (html := page_cache.read(url)) is not None:
+        print(f"Using cached copy of: {url}")
+        return html
+    if driver_pool is None or (page_cache is not None and page_cache.offline):
+        print(f"Error: {url} is not in the page cache and no WebDriver is available.")
+        return None
+    if rate_limiter is not None:
+        waited = rate_limiter.acquire(url)
+        if waited: print(f"  Rate limiter delayed {url} by {waited:.1f}s")
+    with driver_pool.driver() as driver:
         driver.get(url)
         print(f"Accessing: {url}")
-        time.sleep(3)
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        try:
+            WebDriverWait(driver, TABLE_WAIT_SECONDS).until(EC.presence_of_element_located((By.CSS_SELECTOR, PLAYER_TABLE_CSS)))
+        except TimeoutException:
+            print(f"Warning: Player table did not appear within {TABLE_WAIT_SECONDS}s on {url}")
+        return driver.page_source
 
-        table = soup.find('table', class_='table table-hover no-cursor table-striped leaguetable mvp-table similar-players-table mb-0')
-        if not table:
+# --- Function to scrape data from a specific URL ---
+def scrape_page(driver_pool, url, page_cache=None, rate_limiter=None):
+    """Scrape player data from a URL using the driver pool (or the page cache when it is fresh). Returns (DataFrame, html)."""
+    try:
+        html = fetch_page_html(url, driver_pool, page_cache, rate_limiter)
+        if html is None:
+            return EMPTY_PAGE, None
+        data, row_count = parse_player_table(html)
+        if data is None:
             print(f"Warning: No data table found on page {url}")
-            return []
-
-        tbody = table.find('tbody')
-        if not tbody:
-            print(f"Warning: No tbody tag found in table on page {url}")
-            return []
-
-        data = []
-        rows = tbody.find_all('tr')
-        print(f"Found {len(rows)} rows on page {url}")
-
-        for row in rows:
-            try:
-                skill_div = row.find('div', class_='table-skill__skill')
-                pot_div = row.find('div', class_='table-skill__pot')
-                skill_text = skill_div.text.strip() if skill_div else None
-                pot_text = pot_div.text.strip() if pot_div else None
-                skill = float(skill_text) if skill_text else None
-                pot = float(pot_text) if pot_text else None
-                skill_pot = f"{skill}/{pot}" if skill is not None and pot is not None else None
-
-                player_link = row.select_one('td.td-player div.text a')
-                player_name = player_link.text.strip() if player_link else None
-
-                team_span = row.find('span', class_='td-team__teamname')
-                team = team_span.text.strip() if team_span else None
-
-                etv_span = row.find('span', class_='player-tag')
-                etv = etv_span.text.strip() if etv_span else None
-
-                if player_name and team and etv and skill_pot:
-                    data.append({
-                        'player_name': player_name,
-                        'team': team,
-                        'price': etv,
-                        'skill/pot': skill_pot
-                    })
-
-            except Exception as e:
-                print(f"Error processing a row: {e}. Skipping this row.")
-                continue
-
-        return data
+            return EMPTY_PAGE, html
+        if page_cache is not None and not page_cache.is_fresh(url):
+            page_cache.put(url, html) # Only cache pages that actually contain the table
+        print(f"Found {row_count} rows on page {url}")
+        return data, html
 
     except WebDriverException as e:
         print(f"WebDriver error accessing {url}: {e}")
-        return []
+        return EMPTY_PAGE, None
     except Exception as e:
         print(f"Unknown error scraping page {url}: {e}")
-        return []
+        return EMPTY_PAGE, None
+
+# --- Function to crawl pages 2..total_pages concurrently and append their rows to `out_file` in page order ---
+# A page that finishes early waits in `finished` until all pages before it are written, so the CSV has the
+# same row order as a sequential crawl while only out-of-order pages are held in memory.
+def crawl_remaining_pages(page_urls, out_file, driver_pool, page_cache, rate_limiter, max_workers=TRANSFER_MAX_WORKERS):
+    written, next_page, finished = 0, 2, {}
+    if len(page_urls) < 2:
+        return written
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(page_urls) - 1))) as executor:
+        futures = {executor.submit(scrape_page, driver_pool, url, page_cache, rate_limiter): page
+                   for page, url in enumerate(page_urls[1:], start=2)}
+        for future in as_completed(futures):
+            page = futures[future]
+            try:
+                finished[page] = future.result()[0]
+            except Exception as e:
+                print(f"Error on page {page}: {e}")
+                finished[page] = EMPTY_PAGE
+            print(f"  [{time.perf_counter() - started:.1f}s] Page {page}/{len(page_urls)}: {len(finished[page])} records.")
+            while next_page in finished:
+                rows = finished.pop(next_page)
+                rows.to_csv(out_file, header=False, index=False)
+                written += len(rows)
+                next_page += 1
+            out_file.flush()
+    return written
+
+# --- League configuration: league name (as in Problem1.COMPETITIONS) -> (footballtransfers.com URL slug, fallback page count) ---
+# The page count is read from the first page's pagination; the configured count is only used when that fails.
+# Adding a league only needs an entry here.
+TRANSFER_LEAGUES = {
+    'Premier-League': ('uk-premier-league', 22),
+}
+DEFAULT_LEAGUE = 'Premier-League'
+
+# Function to build the player-list URL of a league
+def league_base_url(league):
+    return f"https://www.footballtransfers.com/en/players/{TRANSFER_LEAGUES[league][0]}"
+
+# Function to name the output CSV (the default league keeps the original file name)
+def output_csv_for(league):
+    return 'football_transfers_players.csv' if league == DEFAULT_LEAGUE else f'football_transfers_players_{league}.csv'
 
 # --- Main section to perform scraping ---
-base_url = "https://www.footballtransfers.com/en/players/uk-premier-league"
-total_pages = 22
-all_data = []
-
-print("Initializing WebDriver...")
-driver = setup_driver()
-
-if driver:
-    try:
-        print(f"Starting to scrape data from {total_pages} pages...")
-        for page in range(1, total_pages + 1):
-            print(f"\n--- Processing page {page}/{total_pages} ---")
-            if page == 1:
-                url = base_url
-            else:
-                url = f"{base_url}/{page}"
-
-            page_data = scrape_page(driver, url)
-
-            if page_data:
-                all_data.extend(page_data)
-                print(f"Added {len(page_data)} records from page {page}.")
-            else:
-                print(f"No valid data returned from page {page}.")
-
-    except Exception as e:
-        print(f"An error occurred during scraping: {e}")
-    finally:
-        print("\nClosing WebDriver...")
-        driver.quit()
-
-    if all_data:
-        print(f"\nTotal of {len(all_data)} records scraped.")
-        df_final = pd.DataFrame(all_data)
-        try:
-            df_final.to_csv('football_transfers_players.csv', index=False, encoding='utf-8-sig')
-            print("Data successfully saved to 'football_transfers_players.csv'")
-            print("\nPreview of the first 5 rows of data:")
-            print(df_final.head())
-        except Exception as e:
-            print(f"Error saving CSV file: {e}")
-    else:
-        print("\nNo data collected. CSV file will not be created.")
+parser = argparse.ArgumentParser(description="Scrape player transfer values from footballtransfers.com")
+parser.add_argument('--league', default=DEFAULT_LEAGUE, choices=sorted(TRANSFER_LEAGUES), help="League to scrape")
+parser.add_argument('--pages', type=int, default=None, help="Number of list pages (default: read from the first page's pagination)")
+parser.add_argument('--workers', type=int, default=TRANSFER_MAX_WORKERS, help="Pages fetched in parallel (one Chrome instance each)")
+parser.add_argument('--rate', type=float, default=TRANSFER_RATE_LIMIT_PER_MINUTE, help="Max page loads per minute")
+args = parser.parse_args()
+
+base_url = league_base_url(args.league)
+output_csv = output_csv_for(args.league)
+tmp_csv = output_csv + '.tmp' # Rows are streamed here; it replaces the output only when the crawl wrote rows
+page_cache = default_page_cache() # Shared with Problem1.py; SCRAPE_OFFLINE=1 uses cached pages only
+driver_pool = DriverPool(create_driver, args.workers) # Chrome only starts for pages missing from the cache
+rate_limiter = HostRateLimiter(args.rate, burst=TRANSFER_RATE_LIMIT_BURST)
+total_records = 0
+
+try:
+    with open(tmp_csv, 'w', newline='', encoding='utf-8-sig') as out_file:
+        EMPTY_PAGE.to_csv(out_file, index=False) # Header only; every page then appends its typed rows
+
+        print("\n--- Processing page 1 ---")
+        first_rows, first_html = scrape_page(driver_pool, base_url, page_cache, rate_limiter)
+        first_rows.to_csv(out_file, header=False, index=False)
+        total_records += len(first_rows)
+        total_pages = args.pages or (discover_page_count(first_html, base_url) if first_html else None)
+        if total_pages:
+            print(f"Added {len(first_rows)} records from page 1. {total_pages} pages in total.")
+        else:
+            total_pages = TRANSFER_LEAGUES[args.league][1]
+            print(f"Added {len(first_rows)} records from page 1. Pagination not found; using the configured {total_pages} pages.")
+
+        page_urls = [base_url if page == 1 else f"{base_url}/{page}" for page in range(1, total_pages + 1)]
+        print(f"Fetching pages 2..{total_pages} ({args.workers} workers, {args.rate:g}/min)...")
+        total_records += crawl_remaining_pages(page_urls, out_file, driver_pool, page_cache, rate_limiter, args.workers)
+except Exception as e:
+    print(f"An error occurred during scraping: {e}")
+finally:
+    print("\nClosing WebDriver(s)...")
+    driver_pool.close_all()
+
+if total_records:
+    os.replace(tmp_csv, output_csv)
+    print(f"\nTotal of {total_records} records scraped.")
+    print(f"Data successfully saved to '{output_csv}'")
+    print("\nPreview of the first 5 rows of data:")
+    print(pd.read_csv(output_csv, nrows=5))
 else:
-    print("Failed to initialize WebDriver. Unable to proceed with scraping.")
+    if os.path.exists(tmp_csv):
+        os.remove(tmp_csv)
+    print("\nNo data collected. CSV file will not be created.")
 
 print("\nCompleted.")
@@ -0,0 +1,109 @@
+# --- One-shot per-team aggregation kernel (used by Problem2.py) ---
+# Teams are factorized and the rows sorted by team once; every per-team statistic is then computed
+# for all stat columns at the same time as aligned (n_teams x n_stats) arrays.
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+
+# Function to sum every column of a (rows x columns) block. The block is transposed to contiguous columns first,
+# so numpy's pairwise summation runs down each column (an axis-0 sum of a row-major block adds row after row).
+def column_sums(block):
+    return np.add.reduce(np.ascontiguousarray(np.asarray(block, dtype='float64').T), axis=1)
+
+
+class TeamAggregates:
+    """
+    Median/mean/std of every stat, over all rows and per team, plus the best/worst team per stat.
+    Built once; every later consumer reads the cached arrays and frames instead of regrouping.
+    Rows whose team is 'all' (any case) are left out of the per-team statistics, like the original groupby.
+    """
+
+    def __init__(self, df, stat_cols, team_col='Team', values=None):
+        self.stats = list(stat_cols)
+        if values is None: # Else an already converted (rows x stat_cols) float64 block
+            values = df[self.stats].to_numpy(dtype='float64', na_value=np.nan)
+        self.global_median, self.global_mean, self.global_std = self._aggregate_block(values)
+
+        teams = df[team_col].astype(str) if team_col in df.columns else pd.Series('all', index=df.index) # No team column: no per-team stats
+        keep = (teams.str.lower() != 'all').to_numpy()
+        codes, self.teams = pd.factorize(teams.to_numpy(dtype=object)[keep], sort=True)
+        self.teams = np.asarray(self.teams, dtype=object)
+        team_values = values[keep]
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(self.teams) + 1))
+        sorted_values = team_values[order]
+        n_teams, n_stats = len(self.teams), len(self.stats)
+        self.median = np.full((n_teams, n_stats), np.nan)
+        self.mean = np.full((n_teams, n_stats), np.nan)
+        self.std = np.full((n_teams, n_stats), np.nan)
+        self.count = np.zeros((n_teams, n_stats), dtype=np.int64)
+        for code in range(n_teams):
+            block = sorted_values[bounds[code]:bounds[code + 1]]
+            self.median[code], self.mean[code], self.std[code] = self._aggregate_block(block)
+            self.count[code] = (~np.isnan(block)).sum(axis=0)
+        self._index_leaders()
+
+    @classmethod
+    def from_arrays(cls, stats, teams, global_stats, team_stats, count):
+        """Build from precomputed (median, mean, std) arrays, e.g. merged by the streaming accumulators."""
+        self = cls.__new__(cls)
+        self.stats = list(stats)
+        self.teams = np.asarray(teams, dtype=object)
+        self.global_median, self.global_mean, self.global_std = global_stats
+        self.median, self.mean, self.std = team_stats
+        self.count = count
+        self._index_leaders()
+        return self
+
+    def _index_leaders(self):
+        n_teams, n_stats = len(self.teams), len(self.stats)
+        # Team with the highest/lowest mean per stat (first team in name order wins ties, like idxmax/idxmin)
+        has_mean = ~np.isnan(self.mean).all(axis=0)
+        best = np.argmax(np.where(np.isnan(self.mean), -np.inf, self.mean), axis=0) if n_teams else np.zeros(n_stats, dtype=np.intp)
+        worst = np.argmin(np.where(np.isnan(self.mean), np.inf, self.mean), axis=0) if n_teams else np.zeros(n_stats, dtype=np.intp)
+        self.best_team_idx = np.where(has_mean, best, -1)
+        self.worst_team_idx = np.where(has_mean, worst, -1)
+        self._stat_pos = {stat: i for i, stat in enumerate(self.stats)}
+
+    @staticmethod
+    def _aggregate_block(block):
+        # NaN-skipping median/mean/sample std of every column; NaN where a column has no (or, for std, one) value
+        count = (~np.isnan(block)).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, column_sums(np.where(np.isnan(block), 0.0, block)) / count, np.nan)
+            deviations = np.where(np.isnan(block), 0.0, block - mean)
+            std = np.where(count > 1, np.sqrt((deviations ** 2).sum(axis=0) / (count - 1)), np.nan)
+        median = np.full(block.shape[1], np.nan)
+        has_values = count > 0
+        if has_values.any():
+            median[has_values] = np.nanmedian(block[:, has_values], axis=0)
+        return median, mean, std
+
+    @cached_property
+    def team_means(self):
+        """Per-team means as a DataFrame (index Team, one column per stat)."""
+        return pd.DataFrame(self.mean, index=pd.Index(self.teams, name='Team'), columns=self.stats)
+
+    @cached_property
+    def summary_long(self):
+        """Long table (Team, Statistic, Median, Mean, Std): the 'all' rows first, then every team."""
+        n_teams, n_stats = len(self.teams), len(self.stats)
+        return pd.DataFrame({
+            'Team': np.r_[np.full(n_stats, 'all', dtype=object), np.repeat(self.teams, n_stats)],
+            'Statistic': np.tile(np.asarray(self.stats, dtype=object), n_teams + 1),
+            'Median': np.r_[self.global_median, self.median.ravel()],
+            'Mean': np.r_[self.global_mean, self.mean.ravel()],
+            'Std': np.r_[self.global_std, self.std.ravel()],
+        })
+
+    def best_team(self, stat):
+        """(team, mean) with the highest mean for `stat`, or None if every team mean is NaN."""
+        i = self.best_team_idx[self._stat_pos[stat]]
+        return (self.teams[i], self.mean[i, self._stat_pos[stat]]) if i >= 0 else None
+
+    def worst_team(self, stat):
+        """(team, mean) with the lowest mean for `stat`, or None if every team mean is NaN."""
+        i = self.worst_team_idx[self._stat_pos[stat]]
+        return (self.teams[i], self.mean[i, self._stat_pos[stat]]) if i >= 0 else None
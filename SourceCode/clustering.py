@@ -0,0 +1,176 @@
+# --- KMeans helpers for Problem3.py: mini-batch training and the parallel k sweep ---
+# Mini-batch mode: the matrix is only ever read in row batches, so it can be a np.memmap or any array-like that
+# supports slicing. Models for increasing k are warm-started from the centers of the previous k.
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import davies_bouldin_score, silhouette_score
+
+MINIBATCH_SIZE = 1024
+MINIBATCH_EPOCHS = 5 # Passes over the batches for every k
+
+
+# Function to yield consecutive row batches of X
+def iter_row_batches(X, batch_size=MINIBATCH_SIZE):
+    for start in range(0, X.shape[0], batch_size):
+        yield X[start:start + batch_size]
+
+# Function to get a dense float64 copy of a (small) block of rows; sparse matrices are only densified this way
+def dense_rows(X):
+    return X.toarray() if sp.issparse(X) else np.asarray(X, dtype='float64')
+
+# Function to pick k-means++ style extra centers: rows far from the existing centers are more likely
+def add_centers(centers, X_sample, n_new, rng):
+    centers = np.asarray(centers, dtype='float64').reshape(-1, X_sample.shape[1])
+    for _ in range(n_new):
+        if len(centers):
+            dist_sq = ((X_sample[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+            probs = dist_sq / dist_sq.sum() if dist_sq.sum() > 0 else None
+        else:
+            probs = None
+        centers = np.vstack([centers, X_sample[rng.choice(len(X_sample), p=probs)]])
+    return centers
+
+# Function to compute the exact inertia and labels of a fitted model batch by batch
+def batched_inertia_and_labels(model, X, batch_size=MINIBATCH_SIZE):
+    labels, inertia = [], 0.0
+    for batch in iter_row_batches(X, batch_size):
+        batch_labels = model.predict(batch)
+        inertia += ((dense_rows(batch) - model.cluster_centers_[batch_labels]) ** 2).sum()
+        labels.append(batch_labels)
+    return inertia, np.concatenate(labels) if labels else np.empty(0, dtype=np.int32)
+
+# Function to train MiniBatchKMeans with partial_fit over `epochs` passes of the row batches
+def fit_minibatch_kmeans(X, k, init_centers, batch_size=MINIBATCH_SIZE, epochs=MINIBATCH_EPOCHS, random_state=42):
+    model = MiniBatchKMeans(n_clusters=k, init=init_centers, n_init=1, batch_size=batch_size, random_state=random_state)
+    for _ in range(epochs):
+        for batch in iter_row_batches(X, batch_size):
+            if batch.shape[0] >= k: # partial_fit needs at least k rows
+                model.partial_fit(batch)
+    return model
+
+# Function to fit every k of `possible_k` (ascending), each warm-started from the previous k's centers.
+# Returns ({k: model}, [exact inertia per k]).
+def minibatch_elbow(X, possible_k, batch_size=MINIBATCH_SIZE, epochs=MINIBATCH_EPOCHS, random_state=42, sample_size=2000):
+    rng = np.random.default_rng(random_state)
+    sample_rows = np.sort(rng.choice(X.shape[0], size=min(sample_size, X.shape[0]), replace=False))
+    X_sample = dense_rows(X[sample_rows]) # Only a sample is held to seed new centers
+    models, inertia, centers = {}, [], np.empty((0, X.shape[1]))
+    for k in sorted(possible_k):
+        centers = add_centers(centers, X_sample, k - len(centers), rng) if k > len(centers) else centers[:k]
+        model = fit_minibatch_kmeans(X, k, centers, batch_size, epochs, random_state)
+        centers = model.cluster_centers_
+        models[k] = model
+        inertia.append(batched_inertia_and_labels(model, X, batch_size)[0])
+        print(f"  k={k}: inertia {inertia[-1]:.1f} (warm start from k={k - 1})" if len(models) > 1 else f"  k={k}: inertia {inertia[-1]:.1f}")
+    return models, inertia
+
+
+# --- Parallel k / seed sweep with automatic k selection ---
+SWEEP_SEEDS = range(42, 52) # One KMeans(n_init=1) per seed; each k keeps the best (lowest inertia) of these 10 single-init runs
+SILHOUETTE_SAMPLE = 2000 # Rows used for the silhouette score (it is quadratic in the rows)
+
+_sweep_X = {} # Feature matrix of the current worker process, set once by _init_sweep_worker
+
+
+def _init_sweep_worker(X):
+    _sweep_X['X'] = X
+
+# Function run by the sweep workers: fit one (k, seed) and score it
+def fit_sweep_candidate(k, seed):
+    X = _sweep_X['X']
+    model = KMeans(n_clusters=k, init='k-means++', n_init=1, random_state=seed).fit(X)
+    return k, seed, model, *score_clustering(X, model.labels_)
+
+# Function to compute the Davies-Bouldin score of a sparse X without densifying it:
+# ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2 gives every row's distance to its own centroid
+def sparse_davies_bouldin(X, labels):
+    clusters, labels = np.unique(labels, return_inverse=True)
+    membership = sp.csr_matrix((np.ones(len(labels)), (labels, np.arange(len(labels)))), shape=(len(clusters), len(labels)))
+    sizes = np.asarray(membership.sum(axis=1)).ravel()
+    centroids = (membership @ X).toarray() / sizes[:, None]
+    row_norms = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+    cross = np.asarray(X @ centroids.T)[np.arange(len(labels)), labels] # rows x clusters, never rows x columns
+    distances = np.sqrt(np.maximum(row_norms - 2 * cross + (centroids ** 2).sum(axis=1)[labels], 0))
+    scatter = np.bincount(labels, weights=distances) / sizes
+    centroid_distances = np.sqrt(((centroids[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2))
+    np.fill_diagonal(centroid_distances, np.inf)
+    return float(((scatter[:, None] + scatter[None, :]) / centroid_distances).max(axis=1).mean())
+
+# Function to compute the silhouette (on a sample) and Davies-Bouldin score of a labelling
+def score_clustering(X, labels, sample_size=SILHOUETTE_SAMPLE, random_state=0):
+    if len(np.unique(labels)) < 2:
+        return np.nan, np.nan
+    silhouette = silhouette_score(X, labels, sample_size=min(sample_size, X.shape[0]), random_state=random_state)
+    return silhouette, sparse_davies_bouldin(X, labels) if sp.issparse(X) else davies_bouldin_score(X, labels)
+
+# Function to measure how far each point of the inertia curve bends below the straight line from the first to the
+# last point (both axes scaled to [0, 1]); the largest value is the "knee" of the elbow curve
+def elbow_distances(possible_k, inertia):
+    k = np.asarray(possible_k, dtype='float64')
+    y = np.asarray(inertia, dtype='float64')
+    if len(k) < 3 or y[0] == y[-1]:
+        return np.zeros(len(k))
+    k_norm = (k - k[0]) / (k[-1] - k[0])
+    y_norm = (y - y[-1]) / (y[0] - y[-1])
+    return (1 - k_norm) - y_norm
+
+# Function to pick k. Rule: every k is ranked on three criteria - elbow distance (higher is better),
+# sampled silhouette (higher is better) and Davies-Bouldin (lower is better); the k with the smallest
+# sum of ranks wins, and ties go to the smaller k. Returns (k, selection DataFrame).
+def select_k(possible_k, inertia, silhouette, davies_bouldin):
+    table = pd.DataFrame({'k': list(possible_k), 'inertia': inertia, 'elbow_distance': elbow_distances(possible_k, inertia),
+                          'silhouette': silhouette, 'davies_bouldin': davies_bouldin})
+    table['rank_sum'] = (table['elbow_distance'].rank(ascending=False, method='min')
+                         + table['silhouette'].rank(ascending=False, method='min', na_option='bottom')
+                         + table['davies_bouldin'].rank(ascending=True, method='min', na_option='bottom'))
+    best = table.sort_values(['rank_sum', 'k'], kind='stable').iloc[0]
+    return int(best['k']), table
+
+# Function to fit every (k, seed) pair on a process pool; returns ({k: best model}, inertia, silhouette, davies_bouldin)
+# with the lists in `possible_k` order. The best model of a k is the seed with the lowest inertia.
+def parallel_k_sweep(X, possible_k, seeds=SWEEP_SEEDS, max_workers=None):
+    jobs = [(k, seed) for k in possible_k for seed in seeds]
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(jobs)))
+    best = {}
+
+    def keep_best(k, seed, model, silhouette, davies_bouldin): # Ties go to the lower seed, whatever the finishing order
+        if k not in best or (model.inertia_, seed) < (best[k][0].inertia_, best[k][0].random_state):
+            best[k] = (model, silhouette, davies_bouldin)
+
+    if max_workers == 1:
+        _init_sweep_worker(X)
+        for k, seed in jobs:
+            keep_best(*fit_sweep_candidate(k, seed))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker, initargs=(X,)) as executor:
+            futures = [executor.submit(fit_sweep_candidate, k, seed) for k, seed in jobs]
+            for future in as_completed(futures):
+                keep_best(*future.result())
+    models = {k: best[k][0] for k in possible_k}
+    return (models, [best[k][0].inertia_ for k in possible_k],
+            [best[k][1] for k in possible_k], [best[k][2] for k in possible_k])
+
+# Function to save the inertia / silhouette / Davies-Bouldin curves (PNG) and the selection table (CSV)
+def save_selection_curves(table, chosen_k, png_path, csv_path):
+    table.to_csv(csv_path, index=False, encoding='utf-8-sig', float_format='%.4f')
+    fig = Figure(figsize=(15, 4.5))
+    FigureCanvasAgg(fig)
+    for ax, (col, label) in zip(fig.subplots(1, 3), [('inertia', 'Inertia (Within-cluster Sum of Squares)'),
+                                                     ('silhouette', f'Silhouette (sample of {SILHOUETTE_SAMPLE})'),
+                                                     ('davies_bouldin', 'Davies-Bouldin (lower is better)')]):
+        ax.plot(table['k'], table[col], marker='o')
+        ax.axvline(chosen_k, color='red', linestyle='--', alpha=0.6)
+        ax.set_xlabel('Number of Clusters (k)')
+        ax.set_ylabel(label)
+        ax.set_xticks(table['k'])
+        ax.grid(True)
+    fig.suptitle(f'Model selection for KMeans (chosen k = {chosen_k})')
+    fig.tight_layout()
+    fig.savefig(png_path)
@@ -0,0 +1,122 @@
+# --- Parallel histogram rendering for Problem2.py ---
+# The data is binned once in the main process (np.histogram, the same bins plt.hist would use),
+# then only the counts/edges are sent to a process pool. Each worker keeps one Agg figure per
+# plot size and redraws it for every job, so no pyplot global state is involved.
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+HistogramJob = namedtuple('HistogramJob', ['stat', 'team', 'counts', 'edges', 'filename'])
+
+BINS_ALL = 20
+BINS_TEAM = 15
+HISTOGRAM_STYLES = { # 'all': one plot over all players, 'team': one plot per team
+    'all': {'figsize': (10, 6), 'color': 'skyblue', 'title_size': None, 'label_size': None, 'tick_size': None, 'grid_alpha': 0.75},
+    'team': {'figsize': (8, 5), 'color': 'lightcoral', 'title_size': 10, 'label_size': 9, 'tick_size': 8, 'grid_alpha': 0.6},
+}
+RENDER_CHUNK_SIZE = 16 # Jobs sent to a worker at once
+
+_figures = {} # Per-process figure reused for every plot of the same style
+
+
+# Function to make a column/team name safe for use in a file name
+def safe_file_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+# Function to build the output path of a histogram (team None = all players)
+def histogram_filename(stat, team, hist_path_all, hist_path_teams):
+    if team is None:
+        return os.path.join(hist_path_all, f'hist_all_{safe_file_name(stat)}.png')
+    return os.path.join(hist_path_teams, f'hist_{safe_file_name(team)}_{safe_file_name(stat)}.png')
+
+# Function to bin every (stat, all players) and (stat, team) histogram once; returns the list of HistogramJob.
+# `values` is an optional already converted (rows x stats) float64 block.
+def prebin_histograms(df, stats, hist_path_all, hist_path_teams, team_col='Team', values=None):
+    jobs = []
+    teams_list, team_rows = [], {}
+    if team_col in df.columns:
+        team_names = df[team_col].astype(str)
+        teams_list = team_names[team_names.str.lower() != 'all'].dropna().unique()
+        team_rows = {team: np.flatnonzero((df[team_col] == team).to_numpy()) for team in teams_list}
+    for j, col in enumerate(stats):
+        if values is not None:
+            col_values = values[:, j]
+        elif col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+            col_values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            continue
+        valid = col_values[~np.isnan(col_values)]
+        if valid.size:
+            counts, edges = np.histogram(valid, bins=BINS_ALL)
+            jobs.append(HistogramJob(col, None, counts, edges, histogram_filename(col, None, hist_path_all, hist_path_teams)))
+        for team in teams_list:
+            team_values = col_values[team_rows[team]]
+            team_values = team_values[~np.isnan(team_values)]
+            if not team_values.size:
+                continue
+            counts, edges = np.histogram(team_values, bins=BINS_TEAM)
+            jobs.append(HistogramJob(col, team, counts, edges, histogram_filename(col, team, hist_path_all, hist_path_teams)))
+    return jobs
+
+# Function to draw one pre-binned histogram on the reused figure of its style and save it
+def draw_histogram(job):
+    style_name = 'all' if job.team is None else 'team'
+    style = HISTOGRAM_STYLES[style_name]
+    fig = _figures.get(style_name)
+    if fig is None:
+        fig = _figures[style_name] = Figure(figsize=style['figsize'])
+        FigureCanvasAgg(fig)
+    fig.clear()
+    ax = fig.add_subplot()
+    ax.bar(job.edges[:-1], job.counts, width=np.diff(job.edges), align='edge', edgecolor='black', color=style['color'])
+    if job.team is None:
+        ax.set_title(f'Distribution of {job.stat} (All Players)')
+        ax.set_xlabel(job.stat)
+        ax.set_ylabel('Frequency (Number of Players)')
+    else:
+        ax.set_title(f'Distribution of {job.stat} for {job.team}', fontsize=style['title_size'])
+        ax.set_xlabel(job.stat, fontsize=style['label_size'])
+        ax.set_ylabel('Frequency', fontsize=style['label_size'])
+        ax.tick_params(labelsize=style['tick_size'])
+    ax.grid(axis='y', alpha=style['grid_alpha'])
+    fig.savefig(job.filename)
+
+# Function run by the workers: render a job, returning (filename, team, seconds, error message or None)
+def render_job(job):
+    started = time.perf_counter()
+    try:
+        draw_histogram(job)
+        return job.filename, job.team, time.perf_counter() - started, None
+    except Exception as e:
+        return job.filename, job.team, time.perf_counter() - started, str(e)
+
+# Function to render all jobs on a process pool (in this process when max_workers <= 1)
+def render_histograms(jobs, max_workers=None):
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers <= 1 or len(jobs) <= RENDER_CHUNK_SIZE:
+        return [render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(render_job, jobs, chunksize=RENDER_CHUNK_SIZE))
+
+# Function to write the per-plot timings to CSV and print a short summary
+def report_render_timings(timings, wall_seconds, timings_csv=None):
+    timing_df = pd.DataFrame(timings, columns=['file', 'team', 'seconds', 'error'])
+    if timings_csv:
+        try:
+            timing_df.to_csv(timings_csv, index=False, encoding='utf-8-sig', float_format='%.4f')
+        except Exception as e:
+            print(f"Warning: Could not write render timings to {timings_csv}: {e}", file=sys.stderr)
+    if timing_df.empty:
+        return timing_df
+    print(f"  Rendered {len(timing_df)} plots in {wall_seconds:.1f}s wall time "
+          f"(sum of plot times {timing_df['seconds'].sum():.1f}s, mean {timing_df['seconds'].mean() * 1000:.1f} ms per plot).")
+    for _, row in timing_df.nlargest(3, 'seconds').iterrows():
+        print(f"    Slowest: {os.path.basename(row['file'])} ({row['seconds'] * 1000:.1f} ms)")
+    return timing_df
@@ -0,0 +1,158 @@
+# --- Multi-league / multi-season fbref scraper ---
+# Every (competition, season, category) page is one job on a process pool. As soon as all categories
+# of a (competition, season) partition are in, that partition is merged and written to
+#   data/league=<competition>/season=<season>/results.feather
+# Usage: python league_engine.py --leagues Premier-League La-Liga --seasons 2023-2024 current
+# Adding a league is a config change: an entry in Problem1.COMPETITIONS, or --config leagues.json
+# with {"competitions": {"Eredivisie": 23}}.
+import argparse
+import atexit
+import json
+import os
+import sys
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from results_io import write_results, to_typed_results, export_results_csv
+from scraping_utils import DriverPool, HostRateLimiter, create_http_session, default_page_cache
+import Problem1
+
+ScrapeJob = namedtuple('ScrapeJob', ['competition', 'season', 'category'])
+
+DATA_DIR = 'data'
+CURRENT_SEASON = 'current' # Partition name for season=None (fbref's current-season pages)
+ENGINE_MAX_WORKERS = 4
+
+# Per-process fetch state, created once by _init_worker in every pool process
+_worker_state = {}
+
+
+# Function to set up the session, page cache and rate limiter of one worker process.
+# The rate limiter is process-local, so the per-host budget is split evenly across the workers:
+# together they never exceed Problem1.RATE_LIMIT_PER_MINUTE requests per minute to fbref.
+def _init_worker(requests_per_minute, burst):
+    _worker_state['session'] = create_http_session(pool_size=1)
+    _worker_state['page_cache'] = default_page_cache() # Safe to share between processes
+    _worker_state['rate_limiter'] = HostRateLimiter(requests_per_minute, burst=burst)
+    _worker_state['driver_pool'] = DriverPool(Problem1.create_driver, 1)
+    _worker_state['table_stores'] = {} # (competition, season) -> {table_id: html}; table ids repeat across leagues
+    atexit.register(_worker_state['driver_pool'].close_all)
+
+# Function to scrape one category page inside a worker process
+def run_scrape_job(job, url):
+    state = _worker_state
+    page_cache = state['page_cache']
+    table_store = state['table_stores'].setdefault((job.competition, job.season), {})
+    df_cat = Problem1.scrape_fbref_table(url, table_id=Problem1.table_ids.get(job.category), min_minutes=Problem1.MIN_MINUTES_PLAYED,
+                                         required_stats=Problem1.required_fbref_keys, session=state['session'],
+                                         driver_pool=None if page_cache.offline else state['driver_pool'],
+                                         rate_limiter=state['rate_limiter'], page_cache=page_cache, table_store=table_store)
+    if df_cat is None or df_cat.empty:
+        return None
+    cols_to_keep = [col for col in df_cat.columns if col in Problem1.required_fbref_keys]
+    return df_cat[cols_to_keep] if cols_to_keep else None
+
+# Function to build the on-disk directory of one (competition, season) partition
+def partition_dir(competition, season, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"league={competition}", f"season={season or CURRENT_SEASON}")
+
+# Function to merge the category frames of one partition and write its typed results file
+def merge_partition(competition, season, all_dfs, data_dir=DATA_DIR, csv=False):
+    final_df_export = Problem1.build_results_table(all_dfs)
+    if final_df_export is None:
+        return None
+    results_df = to_typed_results(final_df_export, Problem1.RESULTS_COLUMN_TYPES)
+    out_dir = partition_dir(competition, season, data_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, Problem1.RESULTS_FEATHER)
+    column_info = dict(Problem1.RESULTS_COLUMN_INFO, _partition={'league': competition, 'season': season or CURRENT_SEASON})
+    write_results(results_df, Problem1.RESULTS_COLUMN_TYPES, out_path, column_info=column_info)
+    if csv:
+        export_results_csv(results_df, os.path.join(out_dir, Problem1.RESULTS_CSV))
+    return out_path, results_df.shape
+
+# Function to expand leagues x seasons x categories into the job list (with the URL of each job)
+def plan_jobs(competitions, seasons, categories):
+    return {ScrapeJob(comp, season, category): Problem1.build_category_url(comp, season, category)
+            for comp in competitions for season in seasons for category in categories}
+
+# Function to run all jobs on a process pool, merging each partition as soon as it is complete
+def run_engine(jobs, max_workers=ENGINE_MAX_WORKERS, data_dir=DATA_DIR, csv=False):
+    partitions = {}
+    for job in jobs:
+        partitions.setdefault((job.competition, job.season), set()).add(job.category)
+    collected = {key: {} for key in partitions}
+    pending_categories = {key: set(categories) for key, categories in partitions.items()}
+    written = {}
+
+    max_workers = max(1, min(max_workers, len(jobs)))
+    per_worker_rate = Problem1.RATE_LIMIT_PER_MINUTE / max_workers
+    per_worker_burst = max(1, Problem1.RATE_LIMIT_BURST // max_workers)
+    print(f"--- {len(jobs)} jobs in {len(partitions)} partitions on {max_workers} processes "
+          f"({per_worker_rate:.1f}/min per process, {Problem1.RATE_LIMIT_PER_MINUTE}/min total) ---")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(per_worker_rate, per_worker_burst)) as executor:
+        running = {executor.submit(run_scrape_job, job, url): ('scrape', job) for job, url in jobs.items()}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, task = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error in {kind} job {task}: {e}\nTraceback: {traceback.format_exc()}", file=sys.stderr)
+                    result = None
+                elapsed = time.perf_counter() - started
+                if kind == 'merge':
+                    if result is None: print(f"  [{elapsed:.1f}s] Merge failed for {task}")
+                    else:
+                        written[task] = result
+                        print(f"  [{elapsed:.1f}s] Wrote {result[0]} {result[1]}")
+                    continue
+                key = (task.competition, task.season)
+                if result is not None:
+                    collected[key][task.category] = result
+                    print(f"  [{elapsed:.1f}s] {task.competition} {task.season or CURRENT_SEASON} {task.category}: {len(result)} players")
+                else:
+                    print(f"  [{elapsed:.1f}s] Warning: No data for {task}")
+                pending_categories[key].discard(task.category)
+                if not pending_categories[key]:
+                    if collected[key]:
+                        # Keep the category order of Problem1 so columns are resolved the same way
+                        ordered = {c: collected[key][c] for c in Problem1.CATEGORY_PATHS if c in collected[key]}
+                        running[executor.submit(merge_partition, key[0], key[1], ordered, data_dir, csv)] = ('merge', key)
+                    else:
+                        print(f"  Warning: Partition {key} has no data. Nothing written.")
+    print(f"Finished in {time.perf_counter() - started:.1f}s: {len(written)}/{len(partitions)} partitions written.")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape fbref player stats for several leagues and seasons into partitioned results files")
+    parser.add_argument('--leagues', nargs='+', default=[Problem1.DEFAULT_COMPETITION], help=f"Competitions (known: {', '.join(Problem1.COMPETITIONS)})")
+    parser.add_argument('--seasons', nargs='+', default=[CURRENT_SEASON], help=f"Seasons like 2023-2024, or '{CURRENT_SEASON}'")
+    parser.add_argument('--categories', nargs='+', default=list(Problem1.CATEGORY_PATHS), help="Stat categories to scrape")
+    parser.add_argument('--workers', type=int, default=ENGINE_MAX_WORKERS, help="Worker processes")
+    parser.add_argument('--config', help='JSON file with extra competitions: {"competitions": {"Name": fbref_id}}')
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Root directory of the partitioned output")
+    parser.add_argument('--csv', action='store_true', help="Also write results.csv next to each results.feather")
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            Problem1.COMPETITIONS.update(json.load(f).get('competitions', {}))
+    unknown = [name for name in args.leagues if name not in Problem1.COMPETITIONS] + [c for c in args.categories if c not in Problem1.CATEGORY_PATHS]
+    if unknown:
+        print(f"ERROR: Unknown leagues/categories: {unknown}")
+        sys.exit(1)
+    seasons = [None if season == CURRENT_SEASON else season for season in args.seasons]
+
+    jobs = plan_jobs(args.leagues, seasons, args.categories)
+    written = run_engine(jobs, max_workers=args.workers, data_dir=args.data_dir, csv=args.csv)
+    if not written:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# --- Fitted model artifacts for Problem3.py (preprocessor, KMeans models per k, PCA) ---
+# A run is keyed by a hash of the input schema, the feature data and the settings that change the fit.
+# Problem3.py reuses the artifacts of a matching key instead of refitting, and new or updated players
+# are scored with transform/predict only (assign_clusters, or `python model_artifacts.py players.csv`).
+#   artifacts/<key>/models.joblib - the fitted objects and the k sweep scores
+#   artifacts/<key>/meta.json     - key inputs, feature lists and creation time
+#   artifacts/latest.json         - key and chosen k of the last Problem3 run
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+ARTIFACT_DIR = 'artifacts'
+ARTIFACT_FORMAT = 1 # Bump when the layout of models.joblib changes; old artifacts then stop matching
+MAX_ARTIFACT_VERSIONS = 5 # Older keys are removed when a new one is saved
+
+
+# Function to hash the feature table (column names, dtypes, values) together with the fit settings
+def artifact_key(features_df, settings):
+    digest = hashlib.sha256()
+    schema = [(col, str(dtype)) for col, dtype in features_df.dtypes.items()]
+    header = {'format': ARTIFACT_FORMAT, 'sklearn': sklearn.__version__, 'schema': schema, 'settings': settings}
+    digest.update(json.dumps(header, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(features_df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+def artifact_path(key, artifact_dir=ARTIFACT_DIR):
+    return os.path.join(artifact_dir, key)
+
+# Function to load the artifacts saved under `key`; returns None when there are none (or they cannot be read)
+def load_artifacts(key, artifact_dir=ARTIFACT_DIR):
+    path = os.path.join(artifact_path(key, artifact_dir), 'models.joblib')
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except Exception as e:
+        print(f"  Warning: could not load the artifacts in {path} ({e}); refitting.")
+        return None
+
+# Function to write json atomically (temp file + rename)
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+# Function to save the fitted objects under `key` and drop the oldest keys beyond MAX_ARTIFACT_VERSIONS
+def save_artifacts(key, artifacts, settings, artifact_dir=ARTIFACT_DIR):
+    path = artifact_path(key, artifact_dir)
+    os.makedirs(path, exist_ok=True)
+    tmp_path = os.path.join(path, f'models.joblib.{os.getpid()}.tmp')
+    joblib.dump(artifacts, tmp_path)
+    os.replace(tmp_path, os.path.join(path, 'models.joblib'))
+    _write_json(os.path.join(path, 'meta.json'), {
+        'key': key, 'format': ARTIFACT_FORMAT, 'sklearn': sklearn.__version__, 'settings': settings,
+        'numeric_features': artifacts['numeric_features'], 'categorical_features': artifacts['categorical_features'],
+        'created': time.strftime('%Y-%m-%d %H:%M:%S')})
+    keys = [name for name in os.listdir(artifact_dir) if os.path.isdir(os.path.join(artifact_dir, name))]
+    keys.sort(key=lambda name: os.path.getmtime(os.path.join(artifact_dir, name)), reverse=True)
+    for old_key in keys[MAX_ARTIFACT_VERSIONS:]:
+        old_path = os.path.join(artifact_dir, old_key)
+        for name in os.listdir(old_path):
+            os.remove(os.path.join(old_path, name))
+        os.rmdir(old_path)
+
+# Function to record which key and k the last Problem3 run used (read by the scoring command)
+def mark_latest(key, k, artifact_dir=ARTIFACT_DIR):
+    os.makedirs(artifact_dir, exist_ok=True)
+    _write_json(os.path.join(artifact_dir, 'latest.json'), {'key': key, 'k': int(k)})
+
+# Function to load the artifacts and k of the last Problem3 run; returns (artifacts, k) or (None, None)
+def load_latest(artifact_dir=ARTIFACT_DIR):
+    try:
+        with open(os.path.join(artifact_dir, 'latest.json'), encoding='utf-8') as f:
+            latest = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    return load_artifacts(latest['key'], artifact_dir), latest['k']
+
+# Function to score players with the fitted objects only (transform/predict, no refit).
+# Returns Player, Cluster and the two PCA coordinates of every row of `players_df`.
+def assign_clusters(players_df, artifacts, k):
+    features = players_df.reindex(columns=artifacts['numeric_features'] + artifacts['categorical_features'])
+    for col in artifacts['numeric_features']:
+        features[col] = pd.to_numeric(features[col], errors='coerce')
+    X = artifacts['preprocessor'].transform(features)
+    coords = artifacts['pca'].transform(X)
+    result = pd.DataFrame({'Player': players_df['Player'].to_numpy() if 'Player' in players_df.columns else np.arange(len(players_df)),
+                           'Cluster': artifacts['models'][k].predict(X)})
+    result['Principal Component 1'], result['Principal Component 2'] = coords[:, 0], coords[:, 1]
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assign new or updated players to the clusters of the last Problem3 run")
+    parser.add_argument('players', help="CSV (or .feather) file with the same columns as results.csv")
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR)
+    parser.add_argument('--output', default=None, help="Write the assignments to this CSV instead of printing them")
+    args = parser.parse_args()
+
+    artifacts, k = load_latest(args.artifact_dir)
+    if artifacts is None:
+        print(f"Error: no fitted artifacts in '{args.artifact_dir}'. Run Problem3.py first.")
+        exit()
+    players = pd.read_feather(args.players) if args.players.endswith('.feather') else pd.read_csv(args.players)
+    start = time.perf_counter()
+    assignments = assign_clusters(players, artifacts, k)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {len(players)} players with k = {k} in {elapsed * 1000:.1f} ms (no refit).")
+    if args.output:
+        assignments.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"Saved the assignments to '{args.output}'.")
+    else:
+        print(assignments.to_string(index=False))
@@ -0,0 +1,55 @@
+# --- One-time numeric coercion of the stat columns (used by Problem2.py) ---
+# Every stat column is converted exactly once into a column of a shared float64 block (Fortran order,
+# so each column is a contiguous view). The ranking, aggregation and histogram steps read the block
+# directly instead of re-parsing or copying the DataFrame columns.
+import numpy as np
+import pandas as pd
+
+from results_io import to_number
+
+NULL_TEXT = {'', 'n/a', 'nan', 'none'} # Text that means "no value" rather than a parse failure
+MIN_VALID_RATIO = 0.1 # Text columns with fewer parseable cells than this are flagged in the report
+
+
+class NumericBlock:
+    """float64 values (rows x columns), validity mask and per-column conversion report of a set of stat columns."""
+
+    def __init__(self, columns, values, valid, report):
+        self.columns = list(columns)
+        self.values = values
+        self.valid = valid
+        self.report = report
+        self._pos = {col: j for j, col in enumerate(self.columns)}
+
+    def column(self, col):
+        """The converted column as a view into the block (no copy)."""
+        return self.values[:, self._pos[col]]
+
+    def take(self, cols):
+        """Values of `cols` in that order: the block itself when they are all its columns, else a column subset."""
+        cols = list(cols)
+        if cols == self.columns:
+            return self.values
+        return self.values[:, [self._pos[col] for col in cols]]
+
+
+# Function to convert `columns` of `df` into a NumericBlock ('1,234' / '53.8%' text parsed, N/a -> NaN)
+def coerce_numeric_block(df, columns):
+    columns = list(columns)
+    values = np.empty((len(df), len(columns)), dtype='float64', order='F')
+    report = []
+    for j, col in enumerate(columns):
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            values[:, j] = series.to_numpy(dtype='float64', na_value=np.nan)
+            source, failed = str(series.dtype), 0
+        else:
+            values[:, j] = to_number(series).to_numpy()
+            text = series.astype(str).str.strip()
+            failed = int((series.notna() & ~text.str.lower().isin(NULL_TEXT) & np.isnan(values[:, j])).sum())
+            source = 'text'
+        valid_count = int((~np.isnan(values[:, j])).sum())
+        report.append({'column': col, 'source': source, 'valid': valid_count, 'missing': len(df) - valid_count - failed,
+                       'unparseable': failed, 'valid_ratio': valid_count / len(df) if len(df) else 0.0})
+    report = pd.DataFrame(report, columns=['column', 'source', 'valid', 'missing', 'unparseable', 'valid_ratio'])
+    return NumericBlock(columns, values, ~np.isnan(values), report)
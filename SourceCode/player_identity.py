@@ -0,0 +1,171 @@
+# --- Player identity resolution between footballtransfers.com and fbref (used by Problem4/Final Result.py) ---
+# The two sites spell names and teams differently ('Martin Odegaard' / 'Martin Ødegaard', 'Man City' /
+# 'Manchester City'), so rows are matched on normalized keys instead of the raw strings:
+#   1. the persisted alias table (earlier matches)             - dict lookup
+#   2. normalized name within the same (normalized) team        - dict lookup
+#   3. normalized name that is unique in the whole fbref table  - dict lookup (player changed club)
+#   4. TF-IDF character n-gram cosine similarity for the rest, within the team block first
+# Every match of steps 2-4 is added to the alias table, so the next join is lookups only.
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+ALIAS_TABLE = 'player_aliases.csv'
+ALIAS_COLUMNS = ['source_name', 'source_team', 'fbref_player', 'fbref_team', 'method', 'score']
+FUZZY_MIN_SCORE = 0.75       # Min cosine similarity for a fuzzy match inside the player's team
+FUZZY_MIN_SCORE_ANY = 0.9    # Min similarity when the match is searched across all teams
+FUZZY_MIN_MARGIN = 0.05      # The best candidate must beat the second best by this much
+TEAM_MIN_SCORE = 0.5
+# Letters that Unicode decomposition does not turn into ASCII
+EXTRA_LETTERS = str.maketrans({'ø': 'o', 'Ø': 'O', 'æ': 'ae', 'Æ': 'AE', 'ß': 'ss', 'đ': 'd', 'Đ': 'D', 'ł': 'l', 'Ł': 'L',
+                               'ı': 'i', 'þ': 'th', 'Þ': 'Th', 'ð': 'd', 'Ð': 'D', 'œ': 'oe', 'Œ': 'OE'})
+# Normalized team spellings seen on other sites -> normalized fbref team name
+TEAM_ALIASES = {
+    'man city': 'manchester city', 'man utd': 'manchester utd', 'man united': 'manchester utd',
+    'manchester united': 'manchester utd', 'newcastle united': 'newcastle utd', 'newcastle': 'newcastle utd',
+    'nottingham forest': 'nottham forest', 'nottm forest': 'nottham forest', 'spurs': 'tottenham',
+    'tottenham hotspur': 'tottenham', 'wolverhampton wanderers': 'wolves', 'wolverhampton': 'wolves',
+    'brighton hove albion': 'brighton', 'brighton and hove albion': 'brighton', 'afc bournemouth': 'bournemouth',
+    'west ham united': 'west ham', 'leicester': 'leicester city', 'ipswich': 'ipswich town',
+}
+
+
+# Function to normalize a name: casefold, accents stripped, punctuation removed, single spaces
+@lru_cache(maxsize=None)
+def normalize_name(name):
+    if not isinstance(name, str):
+        return ''
+    text = unicodedata.normalize('NFKD', name.translate(EXTRA_LETTERS))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = re.sub(r"['’`.]", '', text) # "Nott'ham" -> "nottham", "N. Name" -> "n name"
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+def normalize_names(series):
+    return series.map(normalize_name)
+
+# Function to fit a character n-gram TF-IDF model on `names` and return it with their (L2-normalized) vectors
+def fit_name_vectors(names):
+    vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 4))
+    return vectorizer, vectorizer.fit_transform(names)
+
+# Function to pick, for every query row, the best candidate column of a cosine similarity matrix.
+# Returns (best column, score) per row; -1 when the score or the margin over the runner-up is too small.
+def best_matches(similarity, min_score, min_margin=FUZZY_MIN_MARGIN):
+    similarity = similarity.toarray() if hasattr(similarity, 'toarray') else np.asarray(similarity)
+    if similarity.shape[1] == 0:
+        return np.full(similarity.shape[0], -1), np.zeros(similarity.shape[0])
+    best = similarity.argmax(axis=1)
+    top = similarity[np.arange(len(best)), best]
+    if similarity.shape[1] > 1:
+        runner_up = np.partition(similarity, -2, axis=1)[:, -2]
+    else:
+        runner_up = np.zeros(len(best))
+    accepted = (top >= min_score) & (top - runner_up >= min_margin)
+    return np.where(accepted, best, -1), top
+
+
+class PlayerResolver:
+    """Normalized-name index over the fbref players, with a persisted alias table for earlier matches."""
+
+    def __init__(self, fbref_df, alias_path=ALIAS_TABLE, player_col='Player', team_col='Team'):
+        self.players = fbref_df[player_col].astype(str).to_numpy(dtype=object)
+        self.teams = fbref_df[team_col].fillna('').astype(str).to_numpy(dtype=object) if team_col in fbref_df.columns \
+            else np.full(len(fbref_df), '', dtype=object)
+        self.name_keys = normalize_names(pd.Series(self.players)).to_numpy(dtype=object)
+        self.team_keys = normalize_names(pd.Series(self.teams)).to_numpy(dtype=object)
+        self.by_team_name, self.by_name, self.by_team = {}, {}, {}
+        for row, (team, name) in enumerate(zip(self.team_keys, self.name_keys)):
+            self.by_team_name.setdefault((team, name), row)
+            self.by_name.setdefault(name, []).append(row)
+            self.by_team.setdefault(team, []).append(row)
+        self.alias_path = alias_path
+        self.aliases = self._load_aliases()
+        self._team_key_cache = {}
+        self._team_vectorizer = None
+        self._name_vectorizer, self._name_vectors = fit_name_vectors(self.name_keys) if len(self.name_keys) else (None, None)
+
+    def _load_aliases(self):
+        if self.alias_path and os.path.exists(self.alias_path):
+            table = pd.read_csv(self.alias_path, dtype={'source_name': str, 'source_team': str}, keep_default_na=False)
+        else:
+            table = pd.DataFrame(columns=ALIAS_COLUMNS)
+        row_of = {(p, t): row for row, (p, t) in enumerate(zip(self.players, self.teams))}
+        aliases = {}
+        for record in table.itertuples(index=False):
+            row = row_of.get((record.fbref_player, record.fbref_team))
+            if row is not None: # Aliases of players no longer in the fbref table are ignored
+                aliases[(record.source_name, record.source_team)] = (row, record.method, float(record.score))
+        return aliases
+
+    def save_aliases(self):
+        """Write the alias table (temp file + rename)."""
+        if not self.alias_path:
+            return
+        records = [(name, team, self.players[row], self.teams[row], method, round(score, 4))
+                   for (name, team), (row, method, score) in sorted(self.aliases.items())]
+        tmp_path = f"{self.alias_path}.{os.getpid()}.tmp"
+        pd.DataFrame(records, columns=ALIAS_COLUMNS).to_csv(tmp_path, index=False, encoding='utf-8-sig')
+        os.replace(tmp_path, self.alias_path)
+
+    def team_key(self, team):
+        """Normalized fbref team for a team spelling of another site ('' when it cannot be placed)."""
+        key = normalize_name(team)
+        if key in self._team_key_cache:
+            return self._team_key_cache[key]
+        resolved = TEAM_ALIASES.get(key, key)
+        fbref_teams = [t for t in self.by_team if t]
+        if resolved not in self.by_team and fbref_teams:
+            if self._team_vectorizer is None:
+                self._team_vectorizer, self._team_vectors = fit_name_vectors(fbref_teams)
+            best, _ = best_matches(self._team_vectorizer.transform([resolved]) @ self._team_vectors.T, TEAM_MIN_SCORE, 0.0)
+            resolved = fbref_teams[best[0]] if best[0] >= 0 else ''
+        self._team_key_cache[key] = resolved
+        return resolved
+
+    def resolve(self, names, teams=None):
+        """
+        fbref row (or -1), method and score for every (name, team) pair.
+        Methods: alias, team+name, name, fuzzy-team, fuzzy, unmatched.
+        """
+        names = pd.Series(names).fillna('').astype(str).reset_index(drop=True)
+        teams = pd.Series(teams if teams is not None else [''] * len(names)).fillna('').astype(str).reset_index(drop=True)
+        rows = np.full(len(names), -1)
+        methods = np.full(len(names), 'unmatched', dtype=object)
+        scores = np.zeros(len(names))
+        name_keys = normalize_names(names).to_numpy(dtype=object)
+        team_keys = np.array([self.team_key(team) for team in teams], dtype=object)
+
+        pending = []
+        for i, (name, team, name_key, team_key) in enumerate(zip(names, teams, name_keys, team_keys)):
+            if (name, team) in self.aliases: # Reported as 'alias'; the table keeps the method of the original match
+                rows[i], methods[i], scores[i] = self.aliases[(name, team)][0], 'alias', self.aliases[(name, team)][2]
+            elif (team_key, name_key) in self.by_team_name:
+                rows[i], methods[i], scores[i] = self.by_team_name[(team_key, name_key)], 'team+name', 1.0
+            elif len(self.by_name.get(name_key, [])) == 1:
+                rows[i], methods[i], scores[i] = self.by_name[name_key][0], 'name', 1.0
+            else:
+                pending.append(i)
+
+        if pending and self._name_vectorizer is not None:
+            query_vectors = self._name_vectorizer.transform(name_keys[pending])
+            similarity = (query_vectors @ self._name_vectors.T).toarray() # leftovers x fbref players
+            in_team = np.zeros_like(similarity, dtype=bool)
+            for q, i in enumerate(pending):
+                in_team[q, self.by_team.get(team_keys[i], [])] = True
+            team_best, team_score = best_matches(np.where(in_team, similarity, 0.0), FUZZY_MIN_SCORE)
+            any_best, any_score = best_matches(similarity, FUZZY_MIN_SCORE_ANY)
+            for q, i in enumerate(pending):
+                if team_best[q] >= 0:
+                    rows[i], methods[i], scores[i] = team_best[q], 'fuzzy-team', team_score[q]
+                elif any_best[q] >= 0:
+                    rows[i], methods[i], scores[i] = any_best[q], 'fuzzy', any_score[q]
+
+        for i in np.flatnonzero(rows >= 0):
+            if methods[i] != 'alias':
+                self.aliases[(names[i], teams[i])] = (int(rows[i]), methods[i], float(scores[i]))
+        return pd.DataFrame({'fbref_row': rows, 'match_method': methods, 'match_score': scores})
@@ -0,0 +1,285 @@
+# --- Query engine over the joined transfers + fbref player table (used by Problem4/Final Result.py) ---
+# The two tables are read and joined once (player_identity.PlayerResolver). Each column is turned into a numpy
+# array the first time a query uses it and then kept, so many queries run against one load.
+# Queries are Python-like predicate expressions over the column names, for example:
+#   minutes > 900
+#   minutes > 900 and 20 <= Age <= 25 and price_eur < 5e7
+#   Position in ['FW', 'MF'] and not Team == 'Arsenal'
+#   contains(Position, 'FW') and Per_90_Minutes_Gls >= 0.4
+# Expressions are parsed with `ast` and only the node types below are allowed (no eval, no attribute access).
+import argparse
+import ast
+import operator
+import os
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from player_identity import ALIAS_TABLE, PlayerResolver
+from results_io import RESULTS_CSV, RESULTS_FEATHER, read_results, to_typed_results
+from transfer_parsing import upgrade_legacy_columns
+
+TRANSFERS_CSV = 'football_transfers_players.csv'
+DEFAULT_FILTER = 'minutes > 900'
+MINUTES_COLUMNS = ['Playing_Time_Min', 'Min', 'minutes'] # First one present in the fbref table is 'minutes'
+# Types of the fbref columns (as Problem1.RESULTS_COLUMN_TYPES; every other column is float64). Applied on load so the
+# results.csv fallback ('N/a', '1,234') gives the same numeric columns as results.feather.
+FBREF_COLUMN_TYPES = {'Player': 'string', 'Team': 'string', 'Nation': 'string', 'Position': 'string', 'Age': 'int16'}
+# Short names that can be used in queries besides the real column names
+COLUMN_ALIASES = {'age': 'Age', 'position': 'Position', 'nation': 'Nation', 'price': 'price_eur'}
+
+
+class QueryError(ValueError):
+    """A query expression that cannot be parsed or uses an unknown column / unsupported syntax."""
+
+
+COMPARISONS = {ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Lt: operator.lt, ast.LtE: operator.le,
+               ast.Eq: operator.eq, ast.NotEq: operator.ne}
+ARITHMETIC = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+              ast.Mod: operator.mod, ast.Pow: operator.pow, ast.BitAnd: np.logical_and, ast.BitOr: np.logical_or}
+
+
+def _text(values):
+    return np.array(['' if pd.isna(v) else str(v) for v in values], dtype=object)
+
+# Functions callable inside a query
+QUERY_FUNCTIONS = {
+    'contains': lambda values, text: np.array([str(text).casefold() in v.casefold() for v in _text(values)]),
+    'startswith': lambda values, text: np.array([v.casefold().startswith(str(text).casefold()) for v in _text(values)]),
+    'isnull': lambda values: pd.isna(values),
+    'notnull': lambda values: ~pd.isna(values),
+    'abs': np.abs,
+}
+
+
+# Function to compile one expression node into a function of the table (returns an array or a constant)
+def _compile_node(node):
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(value) for value in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        def bool_op(table):
+            result = parts[0](table)
+            for part in parts[1:]:
+                result = combine(result, part(table))
+            return result
+        return bool_op
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda table: np.logical_not(operand(table))
+        if isinstance(node.op, ast.USub):
+            return lambda table: -operand(table)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+    if isinstance(node, ast.Compare):
+        return _compile_compare(node)
+    if isinstance(node, ast.BinOp) and type(node.op) in ARITHMETIC:
+        left, right, op = _compile_node(node.left), _compile_node(node.right), ARITHMETIC[type(node.op)]
+        return lambda table: op(left(table), right(table))
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda table: table.column(name)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool)):
+        value = node.value
+        return lambda table: value
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        if not all(isinstance(e, ast.Constant) for e in node.elts):
+            raise QueryError("Lists in a query may only contain constants, e.g. Position in ['FW', 'MF']")
+        values = [e.value for e in node.elts]
+        return lambda table: values
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        if node.func.id not in QUERY_FUNCTIONS:
+            raise QueryError(f"Unknown function '{node.func.id}' (available: {', '.join(QUERY_FUNCTIONS)})")
+        function, args = QUERY_FUNCTIONS[node.func.id], [_compile_node(arg) for arg in node.args]
+        return lambda table: function(*(arg(table) for arg in args))
+    raise QueryError(f"Unsupported syntax in query: '{ast.unparse(node)}'")
+
+# Function to compile a (possibly chained, e.g. 20 <= Age <= 25) comparison
+def _compile_compare(node):
+    operands = [_compile_node(node.left)] + [_compile_node(c) for c in node.comparators]
+    for op in node.ops:
+        if type(op) not in COMPARISONS and not isinstance(op, (ast.In, ast.NotIn)):
+            raise QueryError(f"Unsupported comparison in query: '{ast.unparse(node)}'")
+
+    def compare(table):
+        result, left = True, operands[0](table)
+        for op, right_fn in zip(node.ops, operands[1:]):
+            right = right_fn(table)
+            if isinstance(op, (ast.In, ast.NotIn)):
+                step = np.isin(np.asarray(left, dtype=object), list(np.atleast_1d(right)))
+                step = ~step if isinstance(op, ast.NotIn) else step
+            else:
+                with np.errstate(invalid='ignore'):
+                    step = COMPARISONS[type(op)](left, right)
+            result, left = np.logical_and(result, step), right
+        return result
+    return compare
+
+# Function to compile a query expression into a function(table) -> boolean row mask (cached per expression text)
+@lru_cache(maxsize=256)
+def compile_query(expression):
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise QueryError(f"Cannot parse query '{expression}': {e.msg}") from None
+    predicate = _compile_node(tree.body)
+
+    def mask(table):
+        try:
+            result = np.asarray(predicate(table))
+        except TypeError as e: # e.g. a text column compared with a number
+            raise QueryError(f"Query '{expression}' mixes incompatible types: {e}") from None
+        if result.dtype != bool or result.shape not in ((), (len(table),)):
+            raise QueryError(f"Query '{expression}' does not give one true/false value per player")
+        return np.broadcast_to(result, (len(table),))
+    return mask
+
+
+# Function to find the minutes played column of the fbref table (None if there is none)
+def find_minutes_column(columns):
+    return next((col for col in MINUTES_COLUMNS if col in columns), None)
+
+
+class PlayerTable:
+    """The joined transfers + fbref table held in memory, with one numpy array per column (built on first use)."""
+
+    def __init__(self, df, aliases=None):
+        self.df = df.reset_index(drop=True)
+        self.aliases = {name: col for name, col in (aliases or {}).items() if col in self.df.columns and name not in self.df.columns}
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    @classmethod
+    def load(cls, transfers_path=TRANSFERS_CSV, feather_path=RESULTS_FEATHER, csv_path=RESULTS_CSV, alias_path=ALIAS_TABLE):
+        """
+        Read both tables once and join every transfers row to its fbref row (unmatched rows are dropped).
+        Columns: Player (fbref spelling), the transfers columns, match_method, match_score, then the fbref columns.
+        """
+        df_transfers = upgrade_legacy_columns(pd.read_csv(transfers_path)) # Older files: 'price'/'skill/pot' text
+        df_fbref = to_typed_results(read_results(feather_path, csv_path), FBREF_COLUMN_TYPES)
+        if 'player_name' in df_transfers.columns:
+            df_transfers = df_transfers.rename(columns={'player_name': 'Player'})
+        if 'Player' not in df_transfers.columns or 'Player' not in df_fbref.columns:
+            raise KeyError("Both tables need a player name column ('player_name' or 'Player')")
+        minutes_col = find_minutes_column(df_fbref.columns)
+        if minutes_col is None:
+            raise KeyError(f"No minutes played column ({', '.join(MINUTES_COLUMNS)}) in the fbref table")
+
+        resolver = PlayerResolver(df_fbref, alias_path)
+        df_transfers = df_transfers.reset_index(drop=True)
+        matches = resolver.resolve(df_transfers['Player'], df_transfers['team'] if 'team' in df_transfers.columns else None)
+        resolver.save_aliases()
+        matched = matches['fbref_row'].to_numpy() >= 0
+        fbref_rows = df_fbref.iloc[matches['fbref_row'].to_numpy()[matched]].reset_index(drop=True)
+        joined = df_transfers[matched].reset_index(drop=True)
+        joined['Player'] = fbref_rows['Player'].to_numpy() # fbref spelling
+        joined['match_method'] = matches['match_method'].to_numpy()[matched]
+        joined['match_score'] = matches['match_score'].to_numpy()[matched]
+        fbref_columns = [col for col in fbref_rows.columns if col != 'Player' and col not in joined.columns]
+        joined = pd.concat([joined, fbref_rows[fbref_columns]], axis=1)
+
+        table = cls(joined, dict(COLUMN_ALIASES, minutes=minutes_col))
+        table.minutes_column = minutes_col
+        table.transfer_columns = [col for col in df_transfers.columns if col != 'Player']
+        table.match_counts = matches['match_method'].value_counts()
+        table.transfers_rows = len(df_transfers)
+        return table
+
+    def column(self, name):
+        """Column `name` (or one of its aliases) as a numpy array: float64 with NaN for numbers, object otherwise."""
+        name = self.aliases.get(name, name)
+        if name not in self._columns:
+            if name not in self.df.columns:
+                raise QueryError(f"Unknown column '{name}'. Columns: {', '.join(list(self.aliases) + list(self.df.columns))}")
+            series = self.df[name]
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                self._columns[name] = series.to_numpy(dtype='float64', na_value=np.nan)
+            else:
+                self._columns[name] = series.to_numpy(dtype=object, na_value=None)
+        return self._columns[name]
+
+    def mask(self, expression):
+        """Boolean mask of the rows matching `expression`."""
+        return compile_query(expression)(self)
+
+    def query(self, expression, columns=None, sort_by=None, ascending=False, limit=None):
+        """Rows matching `expression`, optionally with selected columns, sorted and cut to `limit` rows."""
+        rows = np.flatnonzero(self.mask(expression))
+        if sort_by: # Missing values last in both directions
+            keys = pd.Series(self.column(sort_by)[rows])
+            rows = rows[keys.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()]
+        if limit is not None:
+            rows = rows[:limit]
+        result = self.df.iloc[rows]
+        if columns:
+            result = result[[self.aliases.get(col, col) for col in columns]]
+        return result.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run filter queries over the joined transfers + fbref player table (loaded once)")
+    parser.add_argument('queries', nargs='*', help=f"Predicate expressions, e.g. \"{DEFAULT_FILTER} and Age < 23\"")
+    parser.add_argument('--file', default=None, help="Text file with one query per line ('#' lines are skipped)")
+    parser.add_argument('-i', '--interactive', action='store_true', help="Read queries from the prompt until an empty line")
+    parser.add_argument('--columns', default=None, help="Comma-separated columns to show (default: all)")
+    parser.add_argument('--sort', default=None, help="Column to sort by (descending)")
+    parser.add_argument('--ascending', action='store_true')
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--output', default=None, help="Save the results to CSV; with several queries '_<n>' is added to the name")
+    parser.add_argument('--transfers', default=TRANSFERS_CSV)
+    parser.add_argument('--results', default=RESULTS_FEATHER, help="fbref results (.feather; the .csv is the fallback)")
+    args = parser.parse_args()
+
+    queries = list(args.queries)
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            queries += [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    if not queries and not args.interactive:
+        queries = [DEFAULT_FILTER]
+
+    start = time.perf_counter()
+    try:
+        table = PlayerTable.load(args.transfers, args.results, os.path.splitext(args.results)[0] + '.csv')
+    except (FileNotFoundError, KeyError, pd.errors.EmptyDataError) as e:
+        print(f"Error loading the player tables: {e}")
+        sys.exit(1)
+    print(f"Loaded {len(table)} matched players ({table.transfers_rows} in '{args.transfers}') in {time.perf_counter() - start:.2f} s; "
+          f"'minutes' is '{table.minutes_column}'.")
+
+    columns = [col.strip() for col in args.columns.split(',')] if args.columns else None
+    # Function to run one query and print or save its result
+    def run_query(n, expression):
+        try:
+            start = time.perf_counter()
+            result = table.query(expression, columns, args.sort, args.ascending, args.limit)
+            elapsed = time.perf_counter() - start
+        except QueryError as e:
+            print(f"Error: {e}")
+            return
+        print(f"\n[{n}] {expression}: {len(result)} players ({elapsed * 1000:.2f} ms)")
+        if args.output:
+            root, ext = os.path.splitext(args.output)
+            path = args.output if len(queries) == 1 and not args.interactive else f"{root}_{n}{ext or '.csv'}"
+            result.to_csv(path, index=False, encoding='utf-8-sig')
+            print(f"Saved to '{path}'")
+        else:
+            print(result.to_string(index=False))
+
+    for n, expression in enumerate(queries, start=1):
+        run_query(n, expression)
+    if args.interactive:
+        n = len(queries)
+        while True:
+            try:
+                line = input('query> ').strip()
+            except EOFError:
+                break
+            if not line:
+                break
+            n += 1
+            run_query(n, line)
@@ -0,0 +1,72 @@
+# --- Vectorized top/bottom-k ranking of every stat column at once (used by Problem2.py) ---
+import numpy as np
+import pandas as pd
+
+RANKING_COLUMNS = ['Statistic', 'Group', 'Direction', 'Rank', 'Player', 'Value']
+
+
+# Function to pick the k best rows of every column of `values` (n_rows x n_cols, NaN = missing).
+# One np.partition (the value form of np.argpartition) over the whole matrix finds each column's k-th value (the threshold);
+# rows strictly above it are always kept, rows equal to it are resolved by `ties`:
+#   'first' - keep the earliest tied rows (row order), so exactly k rows per column
+#   'all'   - keep every row tied with the k-th value, so a column can return more than k rows
+# Returns (col_idx, row_idx) arrays ordered by column, then value (best first), then row.
+def select_top_k(values, k, ties='first'):
+    if ties not in ('first', 'all'):
+        raise ValueError(f"ties must be 'first' or 'all', not {ties!r}")
+    n_rows = values.shape[0]
+    if n_rows == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    missing = np.isnan(values)
+    filled = np.where(missing, -np.inf, values)
+    kth = min(k, n_rows) - 1
+    partitioned = np.partition(filled, n_rows - 1 - kth, axis=0) # k-th largest sits at n_rows - 1 - kth
+    threshold = partitioned[n_rows - 1 - kth]
+    above = (filled > threshold) & ~missing
+    tied = (filled == threshold) & ~missing
+    if ties == 'first':
+        still_needed = min(k, n_rows) - above.sum(axis=0)
+        tied &= np.cumsum(tied, axis=0) <= still_needed
+    col_idx, row_idx = np.nonzero((above | tied).T)
+    order = np.lexsort((row_idx, -filled[row_idx, col_idx], col_idx))
+    return col_idx[order], row_idx[order]
+
+# Function to rank a block of rows for both directions; returns the rows of the result table
+def _rank_block(values, players, columns, group, k, ties):
+    records = []
+    for direction, block in (('top', values), ('bottom', -values)):
+        col_idx, row_idx = select_top_k(block, k, ties)
+        if not col_idx.size:
+            continue
+        starts = np.r_[0, np.flatnonzero(np.diff(col_idx)) + 1]
+        ranks = np.arange(col_idx.size) - np.repeat(starts, np.diff(np.r_[starts, col_idx.size])) + 1
+        records.append(pd.DataFrame({
+            'Statistic': np.asarray(columns, dtype=object)[col_idx], 'Group': group, 'Direction': direction,
+            'Rank': ranks, 'Player': players[row_idx], 'Value': values[row_idx, col_idx],
+        }))
+    return records
+
+# Function to compute the top-k and bottom-k players of every stat column in one pass.
+# group_col (e.g. 'Team') also ranks inside every group; the overall ranking has Group 'all'.
+# `values` is an already converted (rows x stat_cols) float64 block; without it the columns are converted here.
+# Returns a long DataFrame with RANKING_COLUMNS, ordered by Statistic (as given), Group, Direction, Rank.
+def rank_top_bottom(df, stat_cols, k=3, player_col='Player', group_col=None, ties='first', values=None):
+    if values is None:
+        values = df[stat_cols].to_numpy(dtype='float64', na_value=np.nan)
+    players = df[player_col].astype(str).to_numpy(dtype=object)
+    records = _rank_block(values, players, stat_cols, 'all', k, ties)
+    if group_col is not None and group_col in df.columns:
+        codes, groups = pd.factorize(df[group_col].astype(str), sort=True)
+        row_order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[row_order], np.arange(len(groups) + 1))
+        for code, group in enumerate(groups):
+            rows = row_order[bounds[code]:bounds[code + 1]]
+            records.extend(_rank_block(values[rows], players[rows], stat_cols, group, k, ties))
+    if not records:
+        return pd.DataFrame(columns=RANKING_COLUMNS)
+    result = pd.concat(records, ignore_index=True)
+    stat_order = {stat: i for i, stat in enumerate(stat_cols)}
+    result['_stat'] = result['Statistic'].map(stat_order)
+    result['_group'] = result['Group'] != 'all'
+    result = result.sort_values(['_stat', '_group', 'Group', 'Direction', 'Rank'], ascending=[True, True, True, False, True], kind='stable')
+    return result.drop(columns=['_stat', '_group']).reset_index(drop=True)
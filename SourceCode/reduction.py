@@ -0,0 +1,75 @@
+# --- Dimensionality reduction stage for Problem3.py (PCA for the 2D cluster plot) ---
+#   full        - sklearn PCA with a full SVD of the dense matrix (the original behaviour)
+#   randomized  - randomized SVD (Halko et al. 2011) of the implicitly centered matrix: a sparse matrix stays sparse,
+#                 only (rows x (n_components + oversampling)) dense blocks are created
+#   incremental - sklearn IncrementalPCA over row batches; a sparse batch is densified one batch at a time,
+#                 so peak memory depends on the batch size, not on the number of players
+# All three expose explained_variance_ratio_, components_, mean_ and transform(), like PCA.
+import numpy as np
+import scipy.sparse as sp
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.utils.extmath import svd_flip
+
+PCA_SOLVERS = ('full', 'randomized', 'incremental')
+PCA_BATCH_SIZE = 1024
+RANDOMIZED_OVERSAMPLES = 10
+RANDOMIZED_POWER_ITERATIONS = 4
+
+
+class CenteredRandomizedPCA:
+    """PCA by randomized SVD of X - mean, where the centering is never materialized (works on CSR input)."""
+
+    def __init__(self, n_components=2, n_oversamples=RANDOMIZED_OVERSAMPLES, n_iter=RANDOMIZED_POWER_ITERATIONS, random_state=42):
+        self.n_components = n_components
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.random_state = random_state
+
+    def _centered_dot(self, X, Q): # (X - mean) @ Q
+        return np.asarray(X @ Q) - self.mean_ @ Q
+
+    def _centered_tdot(self, X, Q): # (X - mean).T @ Q
+        return np.asarray(X.T @ Q) - np.outer(self.mean_, Q.sum(axis=0))
+
+    def fit(self, X):
+        n_rows, n_cols = X.shape
+        self.mean_ = np.asarray(X.mean(axis=0), dtype='float64').ravel()
+        squares = X.multiply(X) if sp.issparse(X) else X ** 2
+        total_variance = (np.asarray(squares.sum(axis=0)).ravel() - n_rows * self.mean_ ** 2).sum() / (n_rows - 1)
+        rng = np.random.default_rng(self.random_state)
+        size = min(self.n_components + self.n_oversamples, n_cols)
+        Q = np.linalg.qr(self._centered_dot(X, rng.standard_normal((n_cols, size))))[0]
+        for _ in range(self.n_iter): # Power iterations sharpen the range estimate when the spectrum decays slowly
+            Q = np.linalg.qr(self._centered_tdot(X, Q))[0]
+            Q = np.linalg.qr(self._centered_dot(X, Q))[0]
+        U, S, Vt = np.linalg.svd(self._centered_tdot(X, Q).T, full_matrices=False)
+        U, Vt = svd_flip(Q @ U, Vt)
+        self.components_ = Vt[:self.n_components]
+        self.singular_values_ = S[:self.n_components]
+        self.explained_variance_ = S[:self.n_components] ** 2 / (n_rows - 1)
+        self.explained_variance_ratio_ = self.explained_variance_ / total_variance
+        return self
+
+    def transform(self, X):
+        return self._centered_dot(X, self.components_.T)
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+
+# Function to build the reduction model for `solver`
+def make_reducer(solver='full', n_components=2, batch_size=PCA_BATCH_SIZE, random_state=42):
+    if solver == 'randomized':
+        return CenteredRandomizedPCA(n_components, random_state=random_state)
+    if solver == 'incremental':
+        return IncrementalPCA(n_components=n_components, batch_size=batch_size)
+    if solver == 'full':
+        return PCA(n_components=n_components, random_state=random_state)
+    raise ValueError(f"Unknown PCA solver '{solver}' (expected one of {', '.join(PCA_SOLVERS)})")
+
+# Function to fit the reduction and project X; returns (model, projected rows)
+def fit_reduction(X, solver='full', n_components=2, batch_size=PCA_BATCH_SIZE, random_state=42):
+    reducer = make_reducer(solver, n_components, batch_size, random_state)
+    if solver == 'full' and sp.issparse(X):
+        X = X.toarray() # Full SVD needs the dense matrix
+    return reducer, reducer.fit_transform(X)
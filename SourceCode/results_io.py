@@ -0,0 +1,85 @@
+# --- Typed storage for the scraped results table (written by Problem1.py, read by Problem2/3/4) ---
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+RESULTS_FEATHER = 'results.feather'
+RESULTS_CSV = 'results.csv'
+
+ARROW_TYPES = {'string': pa.string(), 'int16': pa.int16(), 'float64': pa.float64()}
+
+
+# Function to turn scraped text ('1,234', '53.8%', 'N/a') into float64 with real nulls
+def to_number(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+    cleaned = series.astype(str).str.replace('%', '', regex=False).str.replace(',', '', regex=False).str.strip()
+    return pd.to_numeric(cleaned, errors='coerce').astype('float64')
+
+# Function to convert a results table to the declared column types (unknown columns become float64)
+def to_typed_results(df, column_types):
+    typed = {}
+    for col in df.columns:
+        col_type = column_types.get(col, 'float64')
+        if col_type == 'string':
+            typed[col] = df[col].astype(object).where(df[col].notna() & (df[col].astype(str) != 'N/a'), None)
+        else:
+            values = to_number(df[col])
+            typed[col] = values.round().astype('Int16') if col_type == 'int16' else values
+    return pd.DataFrame(typed, index=df.index)
+
+# Function to build the Arrow schema; `column_info` (e.g. the fbref key behind each column) goes in the metadata
+def build_results_schema(columns, column_types, column_info=None):
+    fields = [pa.field(col, ARROW_TYPES[column_types.get(col, 'float64')], nullable=True) for col in columns]
+    metadata = {'column_info': json.dumps(column_info or {})}
+    return pa.schema(fields, metadata=metadata)
+
+# Function to write the typed table as uncompressed Feather (Arrow IPC), so readers can memory-map it
+def write_results(df, column_types, path=RESULTS_FEATHER, column_info=None):
+    schema = build_results_schema(df.columns, column_types, column_info)
+    table = pa.Table.from_pandas(to_typed_results(df, column_types), schema=schema, preserve_index=False)
+    tmp_path = path + '.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return table.schema
+
+# Function to export the typed table as the legacy CSV (nulls as 'N/a', whole numbers without '.0')
+def export_results_csv(df, path=RESULTS_CSV):
+    export = df.copy()
+    for col in export.columns:
+        values = export[col]
+        if pd.api.types.is_float_dtype(values) and values.notna().any() and (values.dropna() % 1 == 0).all():
+            export[col] = values.astype('Int64')
+    export.to_csv(path, index=False, encoding='utf-8-sig', na_rep='N/a')
+
+# Function to load the results table: memory-mapped typed Feather if present, else the CSV
+def read_results(feather_path=RESULTS_FEATHER, csv_path=RESULTS_CSV):
+    if os.path.exists(feather_path):
+        df = feather.read_table(feather_path, memory_map=True).to_pandas()
+        print(f"Loaded typed results from {feather_path} (no parsing needed).")
+        return df
+    df = pd.read_csv(csv_path)
+    print(f"Loaded results from {csv_path} ({feather_path} not found).")
+    return df
+
+# Function to iterate over the results table in DataFrames of at most `chunksize` rows.
+# The Feather file is memory-mapped, so only the current chunk is materialized; the CSV is read with chunksize.
+def iter_results_chunks(feather_path=RESULTS_FEATHER, csv_path=RESULTS_CSV, chunksize=50_000):
+    if os.path.exists(feather_path):
+        with pa.memory_map(feather_path) as source:
+            table = pa.ipc.open_file(source).read_all()
+            print(f"Streaming typed results from {feather_path} ({table.num_rows} rows, {chunksize} per chunk).")
+            for offset in range(0, table.num_rows, chunksize):
+                yield table.slice(offset, chunksize).to_pandas()
+        return
+    print(f"Streaming results from {csv_path} ({chunksize} rows per chunk, {feather_path} not found).")
+    yield from pd.read_csv(csv_path, chunksize=chunksize)
+
+# Function to read the declared schema metadata of a results file ({column: info})
+def read_results_column_info(feather_path=RESULTS_FEATHER):
+    with pa.memory_map(feather_path) as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    return json.loads(metadata.get(b'column_info', b'{}'))
@@ -0,0 +1,351 @@
+# --- Shared fetch helpers for the scraping scripts (Problem1.py, Problem4/Transfer_Player.py) ---
+import gzip
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+
+# --- Politeness budget ---
+class TokenBucket:
+    """Thread-safe token bucket: refills `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("TokenBucket needs rate > 0 and capacity >= 1")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then consume them. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HostRateLimiter:
+    """One TokenBucket per host, so different sites never throttle each other."""
+
+    def __init__(self, requests_per_minute, burst=1):
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return bucket.acquire()
+
+
+# --- On-disk page cache ---
+class PageCache:
+    """
+    Content-addressed on-disk cache of raw page HTML, keyed by URL.
+    Bodies are stored gzipped under objects/<sha256 of body>; each URL has its own small
+    meta/<sha256 of url>.json with the body hash, ETag/Last-Modified validators and timestamps,
+    so several scraper processes can share one cache directory (every write is an atomic replace).
+    Entries younger than `ttl_seconds` are served without any request; older ones are revalidated
+    with a conditional GET. The least recently used entries are evicted once the stored bodies
+    exceed `max_bytes`. With offline=True every cached entry counts as fresh, so no request is made for it.
+    """
+
+    def __init__(self, cache_dir, ttl_seconds=12 * 3600, max_bytes=512 * 1024 * 1024, offline=False):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._objects_dir = os.path.join(cache_dir, 'objects')
+        self._meta_dir = os.path.join(cache_dir, 'meta')
+        self._lock = threading.RLock()
+        self._stored_bytes = None # Running total of the stored bodies; None until the first scan of meta/
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._meta_dir, exist_ok=True)
+        self._migrate_index(os.path.join(cache_dir, 'index.json'))
+
+    def _migrate_index(self, index_path):
+        # Older caches kept every entry in a single index.json
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for url, entry in index.items():
+            if self.lookup(url) is None: self._write_entry(url, entry)
+        try: os.remove(index_path)
+        except OSError: pass
+
+    def _object_path(self, digest):
+        return os.path.join(self._objects_dir, digest[:2], digest + '.html.gz')
+
+    def _meta_path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self._meta_dir, key[:2], key + '.json')
+
+    def _write_entry(self, url, entry):
+        path = self._meta_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(entry, url=url), f)
+        os.replace(tmp_path, path)
+
+    def _remove_entry(self, url):
+        try: os.remove(self._meta_path(url))
+        except OSError: pass
+
+    def _entries(self):
+        for root, _, files in os.walk(self._meta_dir):
+            for name in files:
+                if not name.endswith('.json'): continue
+                try:
+                    with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                        yield json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    continue
+
+    def lookup(self, url):
+        """Return the cache entry for `url` (or None) without reading the body."""
+        try:
+            with open(self._meta_path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def is_fresh(self, url):
+        entry = self.lookup(url)
+        return entry is not None and (self.offline or time.time() - entry['fetched_at'] < self.ttl_seconds)
+
+    def read(self, url):
+        """Return the cached HTML for `url`, or None if missing/corrupt."""
+        with self._lock:
+            entry = self.lookup(url)
+            if not entry: return None
+            try:
+                with gzip.open(self._object_path(entry['sha256']), 'rt', encoding='utf-8') as f:
+                    html = f.read()
+            except (OSError, EOFError):
+                self._remove_entry(url)
+                return None
+            entry['last_access'] = time.time()
+            self._write_entry(url, entry)
+            return html
+
+    def put(self, url, html, etag=None, last_modified=None):
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                if self._stored_bytes is not None: self._stored_bytes += os.path.getsize(path)
+            now = time.time()
+            self._write_entry(url, {'sha256': digest, 'size': os.path.getsize(path), 'etag': etag,
+                                    'last_modified': last_modified, 'fetched_at': now, 'last_access': now})
+            self._evict()
+
+    def mark_revalidated(self, url):
+        """Server answered 304 Not Modified: restart the TTL of the cached entry."""
+        with self._lock:
+            entry = self.lookup(url)
+            if entry:
+                entry['fetched_at'] = entry['last_access'] = time.time()
+                self._write_entry(url, entry)
+
+    def _evict(self):
+        # Only the running total is checked on every put; meta/ is scanned on the first put and when the total
+        # goes over max_bytes (the scan also picks up what other processes sharing the directory have stored)
+        if self._stored_bytes is not None and self._stored_bytes <= self.max_bytes: return
+        entries = list(self._entries())
+        sizes = {e['sha256']: e['size'] for e in entries} # Shared bodies are counted once
+        references = Counter(e['sha256'] for e in entries)
+        total = sum(sizes.values())
+        if total > self.max_bytes:
+            entries.sort(key=lambda e: e['last_access'])
+            for entry in entries:
+                if total <= self.max_bytes: break
+                self._remove_entry(entry['url'])
+                digest = entry['sha256']
+                references[digest] -= 1
+                if references[digest] == 0: # No other URL uses this body
+                    total -= sizes[digest]
+                    try: os.remove(self._object_path(digest))
+                    except OSError: pass
+        self._stored_bytes = total
+
+def default_page_cache():
+    """Build the PageCache shared by all scrapers, configured through environment variables."""
+    return PageCache(os.environ.get('PAGE_CACHE_DIR', '.page_cache'),
+                     ttl_seconds=float(os.environ.get('PAGE_CACHE_TTL_HOURS', '12')) * 3600,
+                     max_bytes=int(float(os.environ.get('PAGE_CACHE_MAX_MB', '512')) * 1024 * 1024),
+                     offline=os.environ.get('SCRAPE_OFFLINE', '') not in ('', '0'))
+
+
+# --- Plain HTTP backend ---
+def create_http_session(pool_size=8, retries=2):
+    """Return a requests.Session with pooled keep-alive connections, gzip and retry on 429/5xx."""
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=2, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+def fetch_html(session, url, rate_limiter=None, timeout=30, cache=None):
+    """
+    GET `url` on the shared session (respecting the rate limiter) and return the decoded HTML.
+    With a PageCache, fresh entries are returned without a request, stale ones are revalidated
+    with If-None-Match/If-Modified-Since, and a stale copy is used if the request fails.
+    """
+    entry = cache.lookup(url) if cache is not None else None
+    if entry and cache.is_fresh(url):
+        html = cache.read(url)
+        if html is not None:
+            print(f"  Cache hit for {url}")
+            return html
+        entry = None
+    if cache is not None and cache.offline:
+        raise requests.RequestException(f"Offline mode: {url} is not in the page cache")
+
+    headers = {}
+    if entry:
+        if entry.get('etag'): headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'): headers['If-Modified-Since'] = entry['last_modified']
+    if rate_limiter is not None:
+        waited = rate_limiter.acquire(url)
+        if waited: print(f"  Rate limiter delayed {url} by {waited:.1f}s")
+    try:
+        response = session.get(url, timeout=timeout, headers=headers or None)
+        if response.status_code == 304 and entry:
+            html = cache.read(url)
+            if html is not None:
+                cache.mark_revalidated(url)
+                print(f"  Not modified since last fetch: {url}")
+                return html
+            if rate_limiter is not None: # Body vanished from disk: the refetch is a second request to the host
+                waited = rate_limiter.acquire(url)
+                if waited: print(f"  Rate limiter delayed {url} by {waited:.1f}s")
+            response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        stale_html = cache.read(url) if entry else None
+        if stale_html is None: raise
+        print(f"  Warning: Request for {url} failed ({e}). Using stale cached copy.")
+        return stale_html
+    html = response.text
+    if cache is not None:
+        cache.put(url, html, etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+    return html
+
+
+# --- Selenium driver pool ---
+class DriverPool:
+    """Lazily creates up to `size` drivers with `factory()` and hands them out one thread at a time."""
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = max(1, int(size))
+        self._idle = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create_new = len(self._all) < self.size
+            if create_new:
+                self._all.append(None) # Reserve the slot before the (slow) driver start
+        if not create_new:
+            return self._idle.get()
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._lock:
+                self._all.remove(None)
+            raise
+        with self._lock:
+            self._all[self._all.index(None)] = driver
+        return driver
+
+    def release(self, driver):
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close_all(self):
+        with self._lock:
+            drivers, self._all = [d for d in self._all if d is not None], []
+        for driver in drivers:
+            try: driver.quit()
+            except Exception as e: print(f"Warning: Error closing WebDriver: {e}")
+
+
+# --- Concurrent fetch scheduler ---
+def fetch_concurrently(jobs, worker, max_workers=4):
+    """
+    Run worker(key, value) for every item of the `jobs` dict on a thread pool.
+    Returns {key: result}; a job that raises is reported and maps to None.
+    """
+    results = {}
+    if not jobs:
+        return results
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+        futures = {executor.submit(worker, key, value): key for key, value in jobs.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                print(f"Error in fetch job '{key}': {e}\nTraceback: {traceback.format_exc()}", file=sys.stderr)
+                results[key] = None
+            print(f"  [{time.perf_counter() - started:.1f}s] Job '{key}' finished.")
+    return results
@@ -0,0 +1,200 @@
+# --- "Similar players" index over Problem3's standardized feature matrix ---
+# A BallTree is built once per artifact key and metric, and saved next to the other artifacts
+# (artifacts/<key>/similarity_<metric>_v<format>.joblib), so a query never rescans all players.
+# Cosine distance uses the same tree on L2-normalized rows: on unit vectors the Euclidean distance
+# is sqrt(2 - 2 * cosine similarity), so the neighbour order is the cosine order.
+# Filters (position, team, age) are masks over codes precomputed when the index is built. When a filter keeps
+# a large share of the players, the tree's candidates are filtered (the candidate count is widened until enough
+# pass); a selective filter is answered by brute force over only the rows that pass it.
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.neighbors import BallTree
+
+from model_artifacts import ARTIFACT_DIR, artifact_path
+
+SIMILARITY_METRICS = ('euclidean', 'cosine')
+DEFAULT_NEIGHBOURS = 20
+LEAF_SIZE = 30
+INDEX_FORMAT = 2 # Part of the file name; bump when the pickled SimilarityIndex changes so old files are rebuilt
+BRUTE_FORCE_SHARE = 0.5 # Filters keeping at most this share of the players skip the tree
+
+
+# Function to scale every row to unit length (rows of zeros stay zero)
+def normalize_rows(X):
+    X = np.asarray(X, dtype='float64')
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.where(norms == 0, 1.0, norms)
+
+
+class SimilarityIndex:
+    """BallTree over the player rows of a feature matrix, with the Player/Team/Position/Age of every row."""
+
+    def __init__(self, X, player_info, metric='euclidean', leaf_size=LEAF_SIZE):
+        if metric not in SIMILARITY_METRICS:
+            raise ValueError(f"Unknown metric '{metric}' (expected one of {', '.join(SIMILARITY_METRICS)})")
+        self.metric = metric
+        X = X.toarray() if sp.issparse(X) else np.asarray(X, dtype='float64') # The tree stores dense rows
+        self.tree = BallTree(normalize_rows(X) if metric == 'cosine' else X, leaf_size=leaf_size)
+        self.players = player_info['Player'].fillna('').astype(str).to_numpy(dtype=object)
+        self.teams = player_info['Team'].fillna('').astype(str).to_numpy(dtype=object)
+        self.positions = player_info['Position'].fillna('').astype(str).to_numpy(dtype=object)
+        self.ages = pd.to_numeric(player_info['Age'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        # Filter codes: one row x position-code flag matrix ('MF,FW' sets two flags) and a team code per row
+        codes = [[c.strip().upper() for c in p.split(',') if c.strip()] for p in self.positions]
+        self.position_codes = {code: i for i, code in enumerate(sorted({c for row in codes for c in row}))}
+        self.position_flags = np.zeros((len(self.players), len(self.position_codes)), dtype=bool)
+        for row, row_codes in enumerate(codes):
+            self.position_flags[row, [self.position_codes[c] for c in row_codes]] = True
+        team_codes, team_names = pd.factorize(pd.Series(self.teams).str.casefold())
+        self.team_codes = team_codes
+        self.team_code_of = {name: code for code, name in enumerate(team_names)}
+        self._rows_by_name = {}
+        for row, name in enumerate(self.players):
+            self._rows_by_name.setdefault(name.casefold(), []).append(row)
+
+    def __len__(self):
+        return len(self.players)
+
+    def rows_of(self, name):
+        """Rows of a player name (case-insensitive; a name can have several rows, e.g. after a transfer)."""
+        return list(self._rows_by_name.get(str(name).casefold(), []))
+
+    def filter_mask(self, position=None, team=None, min_age=None, max_age=None):
+        """Boolean mask of the rows passing the filters (position matches any of its comma-separated codes)."""
+        mask = np.ones(len(self), dtype=bool)
+        if position:
+            wanted = [self.position_codes[p] for p in {p.strip().upper() for p in str(position).split(',')} if p in self.position_codes]
+            mask &= self.position_flags[:, wanted].any(axis=1)
+        if team:
+            mask &= self.team_codes == self.team_code_of.get(str(team).casefold(), -2) # -2: unknown team, no row
+        if min_age is not None:
+            mask &= self.ages >= min_age
+        if max_age is not None:
+            mask &= self.ages <= max_age
+        return mask
+
+    def query_vectors(self, X_query, k=DEFAULT_NEIGHBOURS, mask=None, exclude_rows=None):
+        """
+        Batch query: for every row of X_query, the (row, distance) pairs of its k nearest players that pass `mask`,
+        skipping `exclude_rows[i]` (e.g. the query player itself). Cosine distances are returned as 1 - similarity.
+        """
+        X_query = np.atleast_2d(np.asarray(X_query, dtype='float64'))
+        if self.metric == 'cosine':
+            X_query = normalize_rows(X_query)
+        allowed = int(mask.sum()) if mask is not None else len(self)
+        exclude_rows = exclude_rows or [()] * len(X_query)
+        if mask is not None and allowed <= BRUTE_FORCE_SHARE * len(self):
+            return self._query_subset(X_query, k, np.flatnonzero(mask), exclude_rows)
+        results = [None] * len(X_query)
+        pending = list(range(len(X_query)))
+        fetch = min(len(self), (k + 1) * max(1, int(np.ceil(len(self) / max(allowed, 1)))))
+        while pending:
+            distances, rows = self.tree.query(X_query[pending], k=fetch)
+            still_pending = []
+            for i, dist_row, row_ids in zip(pending, distances, rows):
+                keep = [(row, dist) for row, dist in zip(row_ids, dist_row)
+                        if (mask is None or mask[row]) and row not in exclude_rows[i]]
+                if len(keep) >= k or fetch == len(self):
+                    results[i] = [(row, self._distance(dist)) for row, dist in keep[:k]]
+                else:
+                    still_pending.append(i)
+            pending, fetch = still_pending, min(len(self), fetch * 2)
+        return results
+
+    def _distance(self, dist):
+        return dist ** 2 / 2 if self.metric == 'cosine' else dist
+
+    def _query_subset(self, X_query, k, rows, exclude_rows):
+        # Brute force over the rows passing a selective filter (the tree's rows, already unit length for cosine)
+        subset = np.asarray(self.tree.data)[rows]
+        distances = np.sqrt(np.maximum((X_query ** 2).sum(axis=1)[:, None] - 2 * X_query @ subset.T + (subset ** 2).sum(axis=1)[None, :], 0))
+        results = []
+        for i, dist_row in enumerate(distances):
+            order = np.argsort(dist_row, kind='stable')[:k + len(exclude_rows[i])]
+            results.append([(rows[j], self._distance(dist_row[j])) for j in order if rows[j] not in exclude_rows[i]][:k])
+        return results
+
+    def similar_to(self, names, k=DEFAULT_NEIGHBOURS, **filters):
+        """Long DataFrame of the k most similar players to every row of every name."""
+        mask = self.filter_mask(**filters) if any(v is not None for v in filters.values()) else None
+        query_rows = [row for name in names for row in self.rows_of(name)]
+        if not query_rows:
+            return pd.DataFrame(columns=['Query', 'Query Team', 'Rank', 'Player', 'Team', 'Position', 'Age', 'Distance'])
+        # The tree's own rows are the query vectors (already unit length for cosine, normalizing again is a no-op)
+        neighbours = self.query_vectors(np.asarray(self.tree.data)[query_rows], k, mask, exclude_rows=[{row} for row in query_rows])
+        records = []
+        for query_row, pairs in zip(query_rows, neighbours):
+            for rank, (row, dist) in enumerate(pairs, start=1):
+                records.append((self.players[query_row], self.teams[query_row], rank, self.players[row],
+                                self.teams[row], self.positions[row], self.ages[row], dist))
+        return pd.DataFrame(records, columns=['Query', 'Query Team', 'Rank', 'Player', 'Team', 'Position', 'Age', 'Distance'])
+
+
+def index_path(key, metric, artifact_dir=ARTIFACT_DIR):
+    return os.path.join(artifact_path(key, artifact_dir), f'similarity_{metric}_v{INDEX_FORMAT}.joblib')
+
+# Function to build and save the index of every metric that is not saved yet for `key`
+def ensure_similarity_indexes(key, X, player_info, artifact_dir=ARTIFACT_DIR):
+    for metric in SIMILARITY_METRICS:
+        path = index_path(key, metric, artifact_dir)
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(SimilarityIndex(X, player_info, metric), tmp_path)
+        os.replace(tmp_path, path)
+        print(f"Saved the {metric} similarity index to '{path}'.")
+
+# Function to load a saved index; returns None when there is none for this key and metric
+def load_similarity_index(key, metric, artifact_dir=ARTIFACT_DIR):
+    path = index_path(key, metric, artifact_dir)
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the players most similar to one or more players (index built by Problem3.py)")
+    parser.add_argument('players', nargs='+', help="Player names (several names are answered as one batch query)")
+    parser.add_argument('-k', type=int, default=DEFAULT_NEIGHBOURS, help="Number of similar players per query")
+    parser.add_argument('--metric', choices=SIMILARITY_METRICS, default='cosine')
+    parser.add_argument('--position', default=None, help="Only players with one of these positions, e.g. 'FW' or 'MF,FW'")
+    parser.add_argument('--team', default=None)
+    parser.add_argument('--min-age', type=float, default=None)
+    parser.add_argument('--max-age', type=float, default=None)
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR)
+    parser.add_argument('--output', default=None, help="Write the results to this CSV instead of printing them")
+    args = parser.parse_args()
+
+    try:
+        with open(os.path.join(args.artifact_dir, 'latest.json'), encoding='utf-8') as f:
+            key = json.load(f)['key']
+    except (OSError, ValueError, KeyError):
+        print(f"Error: no fitted artifacts in '{args.artifact_dir}'. Run Problem3.py first.")
+        exit()
+    index = load_similarity_index(key, args.metric, args.artifact_dir)
+    if index is None:
+        print(f"Error: no {args.metric} similarity index for artifact key {key}. Run Problem3.py first.")
+        exit()
+
+    missing = [name for name in args.players if not index.rows_of(name)]
+    if missing:
+        print(f"Warning: not in the index: {', '.join(missing)}")
+    start = time.perf_counter()
+    result = index.similar_to(args.players, args.k, position=args.position, team=args.team,
+                              min_age=args.min_age, max_age=args.max_age)
+    elapsed = time.perf_counter() - start
+    queries = result[['Query', 'Query Team']].drop_duplicates().shape[0]
+    print(f"{queries} queries answered in {elapsed * 1000:.2f} ms ({args.metric} distance).")
+    if args.output:
+        result.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"Saved the results to '{args.output}'.")
+    else:
+        print(result.to_string(index=False))
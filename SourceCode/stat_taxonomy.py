@@ -0,0 +1,61 @@
+# --- Stat taxonomy: which columns are offensive, defensive, lower-is-better, ... (used by Problem2.py) ---
+# Each category is a list of lowercase substrings; a column belongs to a category when its lowercase
+# name contains any of them. The patterns of a category are compiled into one regex alternation, and
+# every column is classified once into a column -> categories map that all tasks share.
+import re
+from functools import lru_cache
+
+# Patterns for selecting specific stats for histograms
+HISTOGRAM_OFFENSIVE_PATTERNS = [
+    'gls', 'goal', 'sh', 'shot', 'sot', 'xg', 'npxg', 'xa', 'assist', 'keypass', 'kp',
+    'sca', 'gca', 'att_pen', 'crspa', 'succ_dribbles', 'prog_passes_rec', 'touches_att_pen',
+    'progcarry', 'progpass' # Added for progressive carries/passes if named as such
+]
+HISTOGRAM_DEFENSIVE_PATTERNS = [
+    'tkl', 'tackle', 'tklw', 'int', 'interception', 'block', 'clr', 'clearance',
+    'sav', 'save', 'cs', 'clean_sheet', 'ga', 'goals_against', 'err', # 'ga' and 'goals_against' for goals against
+    'crdy', 'crdr', 'card', 'foul', 'aerialswon', 'pkcon', 'pressure', 'recover'
+]
+# Patterns for interpreting stats in the team analysis text
+LOWER_IS_BETTER_PATTERNS = ['ga', 'goals_against', 'offside', 'fls', 'foul', 'lost', 'crd', 'card', 'pkcon', 'err_leading_to_shot'] # Added more specific
+KEY_OFFENSIVE_PATTERNS_TEXT = ['gls', 'goal', 'xg', 'sot', 'sca', 'gca', 'att_pen', 'shot', 'assist', 'key_pass', 'prog_pass_rec']
+KEY_DEFENSIVE_PATTERNS_TEXT = ['tklw', 'tackles_won', 'int', 'interception', 'block', 'clr', 'clearance', 'sav', 'save', 'cs', 'clean_sheet', 'aerial_won']
+KEY_POSSESSION_PATTERNS_TEXT = ['cmp_pct', 'pass_accuracy', 'prgp', 'progressive_pass', 'prgc', 'progressive_carr', 'touch', 'progression', 'prog']
+GOALKEEPING_PATTERNS = ['gk', 'goal', 'sav', 'pk', 'ga', 'cs']
+
+STAT_CATEGORIES = {
+    'histogram_offensive': HISTOGRAM_OFFENSIVE_PATTERNS,
+    'histogram_defensive': HISTOGRAM_DEFENSIVE_PATTERNS,
+    'lower_is_better': LOWER_IS_BETTER_PATTERNS,
+    'key_offensive': KEY_OFFENSIVE_PATTERNS_TEXT,
+    'key_defensive': KEY_DEFENSIVE_PATTERNS_TEXT,
+    'key_possession': KEY_POSSESSION_PATTERNS_TEXT,
+    'goalkeeping': GOALKEEPING_PATTERNS,
+}
+CATEGORY_REGEXES = {category: re.compile('|'.join(map(re.escape, patterns))) for category, patterns in STAT_CATEGORIES.items()}
+
+
+# Function to classify one column name into the set of categories whose patterns it contains
+@lru_cache(maxsize=None)
+def classify_column(col):
+    col_lower = col.lower()
+    return frozenset(category for category, regex in CATEGORY_REGEXES.items() if regex.search(col_lower))
+
+
+class StatTaxonomy:
+    """Column -> categories map for a set of columns, built once, with category -> columns lookups."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.categories = {col: classify_column(col) for col in self.columns}
+        self._members = {category: [col for col in self.columns if category in self.categories[col]] for category in STAT_CATEGORIES}
+
+    def is_in(self, col, *categories):
+        """True if `col` belongs to any of the given categories."""
+        return not self.categories.get(col, frozenset()).isdisjoint(categories)
+
+    def columns_in(self, *categories):
+        """Columns (in the original order) that belong to any of the given categories."""
+        if len(categories) == 1:
+            return list(self._members[categories[0]])
+        return [col for col in self.columns if self.is_in(col, *categories)]
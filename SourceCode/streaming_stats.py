@@ -0,0 +1,260 @@
+# --- Streaming (chunked) statistics for Problem2.py ---
+# Everything here is a mergeable accumulator: a chunk updates it, and two accumulators built on
+# different parts of the table can be merged, so memory depends on the number of teams/stats,
+# never on the number of rows.
+#   MomentAccumulator - count/mean/M2/min/max per stat (Chan et al. parallel-variance merge)
+#   KLLSketch         - quantile sketch for the medians (exact until it first compacts)
+#   TopKTracker       - bounded heaps of the k highest/lowest values per stat
+#   StreamingStats    - runs the above over chunks and returns the same objects as the in-memory path
+import heapq
+import random
+
+import numpy as np
+import pandas as pd
+
+from aggregation import TeamAggregates, column_sums
+from histogram_render import BINS_ALL, BINS_TEAM, HistogramJob, histogram_filename
+from ranking import RANKING_COLUMNS, select_top_k
+
+KLL_DEFAULT_K = 200
+
+
+class MomentAccumulator:
+    """NaN-skipping count, mean, M2 (sum of squared deviations), min and max of every column."""
+
+    def __init__(self, n_cols):
+        self.count = np.zeros(n_cols, dtype=np.int64)
+        self.mean = np.full(n_cols, np.nan)
+        self.m2 = np.zeros(n_cols)
+        self.min = np.full(n_cols, np.inf)
+        self.max = np.full(n_cols, -np.inf)
+
+    def update(self, block):
+        """Fold a (rows x cols) block in: its exact moments are merged like another accumulator."""
+        chunk = MomentAccumulator(block.shape[1])
+        missing = np.isnan(block)
+        chunk.count = (~missing).sum(axis=0)
+        filled = np.where(missing, 0.0, block)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            chunk.mean = np.where(chunk.count > 0, column_sums(filled) / chunk.count, np.nan)
+            chunk.m2 = (np.where(missing, 0.0, block - chunk.mean) ** 2).sum(axis=0)
+        chunk.min = np.where(missing, np.inf, block).min(axis=0, initial=np.inf)
+        chunk.max = np.where(missing, -np.inf, block).max(axis=0, initial=-np.inf)
+        self.merge(chunk)
+
+    def merge(self, other):
+        """Chan et al. pairwise merge: exact for count/mean/M2, so the merge order does not matter."""
+        total = self.count + other.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            mean = np.where(self.count == 0, other.mean, np.where(other.count == 0, self.mean, self.mean + delta * other.count / total))
+            m2 = np.where(self.count == 0, other.m2, np.where(other.count == 0, self.m2,
+                          self.m2 + other.m2 + delta ** 2 * self.count * other.count / total))
+        self.count, self.mean, self.m2 = total, mean, m2
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+
+    @property
+    def std(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016) over one stream of floats.
+    Level h holds items of weight 2**h; a full level is sorted and every other item (random offset)
+    is promoted to the next level. Level capacities shrink geometrically (factor 2/3) below the top
+    level of size k, so the sketch keeps O(k) items whatever the stream length.
+    Error bound: the returned quantile's rank is off by at most eps * n with 99% probability, eps ~= 1.7%
+    for k=200 (eps shrinks roughly as 1/k); on 200,000-value test streams the median stayed within 0.5%.
+    Up to k values nothing is compacted, so the sketch is exact and the median matches np.median.
+    """
+
+    def __init__(self, k=KLL_DEFAULT_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        return max(2, int(self.k * (2 / 3) ** (len(self.levels) - 1 - level)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not values.size: return
+        self.n += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+
+    def _compress(self):
+        while sum(level.size for level in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            for h, items in enumerate(self.levels):
+                if items.size >= self._capacity(h):
+                    if h + 1 == len(self.levels):
+                        self.levels.append(np.empty(0))
+                    items = np.sort(items)
+                    keep = items[-1:] if items.size % 2 else items[:0] # An odd item out stays on this level
+                    pairs = items[:items.size - keep.size]
+                    self.levels[h + 1] = np.concatenate([self.levels[h + 1], pairs[self._rng.randint(0, 1)::2]])
+                    self.levels[h] = keep
+                    break
+
+    @property
+    def is_exact(self):
+        return len(self.levels) == 1
+
+    def quantile(self, q):
+        if self.n == 0:
+            return np.nan
+        if self.is_exact:
+            return float(np.quantile(self.levels[0], q))
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        return float(items[order][np.searchsorted(cumulative, q * cumulative[-1])])
+
+
+class TopKTracker:
+    """The k highest and k lowest (value, row) per stat, ties broken by earliest row like ranking.select_top_k."""
+
+    def __init__(self, stats, k):
+        self.stats = list(stats)
+        self.k = k
+        self._heaps = {'top': [[] for _ in self.stats], 'bottom': [[] for _ in self.stats]}
+
+    def update(self, values, players, first_row):
+        for direction, block in (('top', values), ('bottom', -values)):
+            col_idx, row_idx = select_top_k(block, self.k) # The chunk's own top-k already holds every global candidate
+            heaps = self._heaps[direction]
+            for col, row in zip(col_idx, row_idx):
+                item = (block[row, col], -(first_row + row), players[row]) # Min-heap: worst kept item on top
+                if len(heaps[col]) < self.k: heapq.heappush(heaps[col], item)
+                elif item[:2] > heaps[col][0][:2]: heapq.heapreplace(heaps[col], item)
+
+    def to_frame(self):
+        """Rankings in the same long format as ranking.rank_top_bottom (Group 'all' only)."""
+        records = []
+        for direction, sign in (('top', 1), ('bottom', -1)):
+            for stat, heap in zip(self.stats, self._heaps[direction]):
+                for rank, (value, _, player) in enumerate(sorted(heap, reverse=True), start=1):
+                    records.append((stat, 'all', direction, rank, player, sign * value))
+        result = pd.DataFrame(records, columns=RANKING_COLUMNS)
+        stat_order = {stat: i for i, stat in enumerate(self.stats)}
+        result['_stat'] = result['Statistic'].map(stat_order)
+        result = result.sort_values(['_stat', 'Direction', 'Rank'], ascending=[True, False, True], kind='stable')
+        return result.drop(columns='_stat').reset_index(drop=True)
+
+
+class StreamingStats:
+    """
+    Per-team and overall moments + median sketches and the top/bottom-k trackers, fed one chunk at a time.
+    Rows whose team is 'all' count for the overall statistics only, like TeamAggregates.
+    """
+
+    def __init__(self, stat_cols, k=3, sketch_k=KLL_DEFAULT_K, team_col='Team', player_col='Player'):
+        self.stats = list(stat_cols)
+        self.team_col, self.player_col = team_col, player_col
+        self.sketch_k = sketch_k
+        self.global_moments = MomentAccumulator(len(self.stats))
+        self.global_sketches = [KLLSketch(sketch_k) for _ in self.stats]
+        self.team_moments, self.team_sketches = {}, {}
+        self.top_k = TopKTracker(self.stats, k)
+        self.rows = 0
+
+    def _team_blocks(self, chunk, values):
+        if self.team_col not in chunk.columns:
+            return
+        teams = chunk[self.team_col].astype(str)
+        keep = (teams.str.lower() != 'all').to_numpy()
+        codes, names = pd.factorize(teams.to_numpy(dtype=object)[keep])
+        kept_values = values[keep]
+        for code, team in enumerate(names):
+            yield team, kept_values[codes == code]
+
+    def update(self, chunk, values=None):
+        if values is None: # Else the chunk's already converted (rows x stats) float64 block
+            values = chunk[self.stats].to_numpy(dtype='float64', na_value=np.nan)
+        self.global_moments.update(values)
+        for j, sketch in enumerate(self.global_sketches):
+            sketch.update(values[:, j])
+        for team, block in self._team_blocks(chunk, values):
+            if team not in self.team_moments:
+                self.team_moments[team] = MomentAccumulator(len(self.stats))
+                self.team_sketches[team] = [KLLSketch(self.sketch_k) for _ in self.stats]
+            self.team_moments[team].update(block)
+            for j, sketch in enumerate(self.team_sketches[team]):
+                sketch.update(block[:, j])
+        if self.player_col in chunk.columns:
+            self.top_k.update(values, chunk[self.player_col].astype(str).to_numpy(dtype=object), self.rows)
+        self.rows += len(chunk)
+
+    def team_aggregates(self):
+        """The merged statistics as a TeamAggregates (teams in name order), like the in-memory kernel builds."""
+        teams = sorted(self.team_moments)
+        n_stats = len(self.stats)
+        median = np.array([[s.quantile(0.5) for s in self.team_sketches[t]] for t in teams]).reshape(len(teams), n_stats)
+        mean = np.array([self.team_moments[t].mean for t in teams]).reshape(len(teams), n_stats)
+        std = np.array([self.team_moments[t].std for t in teams]).reshape(len(teams), n_stats)
+        count = np.array([self.team_moments[t].count for t in teams], dtype=np.int64).reshape(len(teams), n_stats)
+        global_stats = (np.array([s.quantile(0.5) for s in self.global_sketches]), self.global_moments.mean, self.global_moments.std)
+        return TeamAggregates.from_arrays(self.stats, teams, global_stats, (median, mean, std), count)
+
+    def exact_medians(self):
+        """True if no median sketch has compacted yet (all medians are exact)."""
+        sketches = self.global_sketches + [s for team_sketches in self.team_sketches.values() for s in team_sketches]
+        return all(s.is_exact for s in sketches)
+
+
+class StreamingHistograms:
+    """
+    Second pass for the histograms: with the min/max of every (stat, team) known from the first pass,
+    np.histogram(range=(min, max)) gives the same bins as binning all values at once, so counts add up over chunks.
+    """
+
+    def __init__(self, stats, streaming_stats):
+        self.stats = list(stats)
+        positions = [streaming_stats.stats.index(stat) for stat in self.stats]
+        self.team_col = streaming_stats.team_col
+        self._ranges = {None: self._ranges_of(streaming_stats.global_moments, positions)}
+        for team, moments in streaming_stats.team_moments.items():
+            self._ranges[team] = self._ranges_of(moments, positions)
+        self._counts = {}
+
+    @staticmethod
+    def _ranges_of(moments, positions):
+        return [(moments.min[p], moments.max[p]) if moments.count[p] else None for p in positions]
+
+    def _add(self, team, block, bins):
+        for j, stat in enumerate(self.stats):
+            value_range = self._ranges[team][j]
+            column = block[:, j]
+            column = column[~np.isnan(column)]
+            if value_range is None or not column.size: continue
+            counts, edges = np.histogram(column, bins=bins, range=value_range)
+            if (stat, team) in self._counts: self._counts[stat, team][0] += counts
+            else: self._counts[stat, team] = [counts, edges]
+
+    def update(self, chunk, values=None):
+        if values is None:
+            values = chunk[self.stats].to_numpy(dtype='float64', na_value=np.nan)
+        self._add(None, values, BINS_ALL)
+        if self.team_col in chunk.columns:
+            teams = chunk[self.team_col].astype(str).to_numpy(dtype=object)
+            for team in pd.unique(teams):
+                if str(team).lower() != 'all':
+                    self._add(team, values[teams == team], BINS_TEAM)
+
+    def jobs(self, hist_path_all, hist_path_teams):
+        return [HistogramJob(stat, team, counts, edges, histogram_filename(stat, team, hist_path_all, hist_path_teams))
+                for (stat, team), (counts, edges) in self._counts.items()]
@@ -0,0 +1,59 @@
+import pandas as pd
+
+from Problem1 import RESULTS_COLUMN_TYPES, apply_incremental_update, build_results_table, diff_category_frame, plan_results_join
+from results_io import to_typed_results
+
+
+def typed(rows):
+    return to_typed_results(pd.DataFrame(rows, columns=['Player', 'Team', 'Age', 'Performance_Gls']), RESULTS_COLUMN_TYPES)
+
+
+# Age is nullable Int16: a value going from missing (pd.NA) to present must be logged, not raise
+def test_value_from_missing_to_present():
+    previous = typed([['Adam Wharton', 'Crystal Palace', None, 1], ['Bukayo Saka', 'Arsenal', 23, 6]])
+    changed = typed([['Adam Wharton', 'Crystal Palace', 21, 1]])
+
+    patched, log = apply_incremental_update(previous, changed, {('Adam Wharton', 'Crystal Palace')})
+
+    assert patched.set_index('Player').at['Adam Wharton', 'Age'] == 21
+    assert log[['Player', 'change', 'changed_columns']].values.tolist() == [['Adam Wharton', 'updated', 'Age']]
+
+
+def test_missing_on_both_sides_is_unchanged():
+    previous = typed([['Adam Wharton', 'Crystal Palace', None, None]])
+    changed = typed([['Adam Wharton', 'Crystal Palace', None, None]])
+
+    _, log = apply_incremental_update(previous, changed, {('Adam Wharton', 'Crystal Palace')})
+
+    assert log.empty
+
+
+def category_frame(rows, columns):
+    return pd.DataFrame(rows, columns=['Player', 'Team'] + columns).set_index(['Player', 'Team'])
+
+
+# A changed player present only in 'shooting' must not take Nation/Position/Age from 'shooting'
+# just because no changed player is in 'standard': the patched table must equal a full rebuild
+def test_incremental_matches_full_rebuild_when_standard_has_no_changed_player():
+    previous_dfs = {
+        'standard': category_frame([['Bukayo Saka', 'Arsenal', 'ENG', 'FW', 23, 6]], ['nationality', 'Position', 'Age', 'goals']),
+        'shooting': category_frame([['Bukayo Saka', 'Arsenal', 'ENG', 'FW', 23, 40.0]], ['nationality', 'Position', 'Age', 'shots_on_target_pct']),
+    }
+    all_dfs = {
+        'standard': previous_dfs['standard'],
+        'shooting': category_frame([['Bukayo Saka', 'Arsenal', 'ENG', 'FW', 23, 40.0], ['Ethan Nwaneri', 'Arsenal', 'ENG', 'MF', 30, 50.0]],
+                                   ['nationality', 'Position', 'Age', 'shots_on_target_pct']),
+    }
+    previous_results = to_typed_results(build_results_table(previous_dfs), RESULTS_COLUMN_TYPES)
+    changed_keys = set()
+    for category, df_cat in all_dfs.items():
+        changed_keys |= diff_category_frame(previous_dfs[category], df_cat)
+    changed_dfs = {category: df_cat[df_cat.index.isin(list(changed_keys))] for category, df_cat in all_dfs.items()}
+
+    changed_results = to_typed_results(build_results_table(changed_dfs, join_plan=plan_results_join(all_dfs)), RESULTS_COLUMN_TYPES)
+    patched, _ = apply_incremental_update(previous_results, changed_results, changed_keys)
+    rebuilt = to_typed_results(build_results_table(all_dfs), RESULTS_COLUMN_TYPES)
+
+    assert changed_keys == {('Ethan Nwaneri', 'Arsenal')}
+    assert rebuilt.set_index('Player').loc['Ethan Nwaneri', ['Nation', 'Position', 'Age']].isna().all()
+    pd.testing.assert_frame_equal(to_typed_results(patched, RESULTS_COLUMN_TYPES), rebuilt)
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from player_query import PlayerTable
+
+
+# Only results.csv exists, written as Problem1 exports it (nulls as 'N/a', thousands with ',')
+def test_load_from_results_csv_only(tmp_path):
+    pd.DataFrame({
+        'Player': ['Aaron Ramsdale', 'Adam Wharton', 'Bukayo Saka'],
+        'Team': ['Southampton', 'Crystal Palace', 'Arsenal'],
+        'Position': ['GK', 'MF', 'FW'],
+        'Age': ['27', 'N/a', '23'],
+        'Playing_Time_Min': ['2,430', '850', 'N/a'],
+    }).to_csv(tmp_path / 'results.csv', index=False, encoding='utf-8-sig')
+    pd.DataFrame({
+        'player_name': ['Aaron Ramsdale', 'Adam Wharton', 'Bukayo Saka'],
+        'team': ['Southampton', 'Crystal Palace', 'Arsenal'],
+        'price_eur': [1e7, 4e7, 1.5e8], 'skill': [70.0, 75.0, 90.0], 'pot': [75.0, 85.0, 95.0],
+    }).to_csv(tmp_path / 'transfers.csv', index=False)
+
+    table = PlayerTable.load(tmp_path / 'transfers.csv', str(tmp_path / 'results.feather'), tmp_path / 'results.csv',
+                             tmp_path / 'player_aliases.csv')
+
+    assert table.column('minutes').dtype == np.float64
+    assert table.query('minutes > 900')['Player'].tolist() == ['Aaron Ramsdale']
+    assert table.query('isnull(Age)')['Player'].tolist() == ['Adam Wharton']
@@ -0,0 +1,67 @@
+import os
+
+from scraping_utils import PageCache, fetch_html
+
+
+class FakeResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code, self.text, self.headers = status_code, text, headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses, self.calls = list(responses), 0
+
+    def get(self, url, timeout=None, headers=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self, url):
+        self.acquired += 1
+        return 0.0
+
+
+# A 304 for an entry whose body vanished triggers a second GET, which must take its own rate-limit token
+def test_refetch_after_304_acquires_a_token(tmp_path):
+    cache = PageCache(str(tmp_path), ttl_seconds=0)
+    url = 'https://fbref.com/en/comps/9/stats'
+    cache.put(url, '<html>old</html>', etag='"v1"')
+    os.remove(cache._object_path(cache.lookup(url)['sha256']))
+    session, limiter = FakeSession([FakeResponse(304), FakeResponse(200, '<html>new</html>')]), CountingLimiter()
+
+    assert fetch_html(session, url, limiter, cache=cache) == '<html>new</html>'
+    assert session.calls == 2 and limiter.acquired == 2
+
+
+def test_evict_scans_meta_only_when_over_budget(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path), max_bytes=10_000_000)
+    scans = []
+    entries = PageCache._entries
+    monkeypatch.setattr(PageCache, '_entries', lambda self: scans.append(1) or entries(self))
+    for i in range(20):
+        cache.put(f'https://example.com/{i}', f'<html>page {i}</html>')
+    assert len(scans) == 1 # Only the first put scans meta/ to start the running total
+
+
+def test_evict_removes_a_shared_body_with_its_last_url(tmp_path):
+    cache = PageCache(str(tmp_path))
+    shared = '<html>' + 'shared ' * 200 + '</html>'
+    for i, url in enumerate(['https://example.com/a', 'https://example.com/b']):
+        cache.put(url, shared)
+        cache._write_entry(url, dict(cache.lookup(url), last_access=i)) # a, then b are the least recently used
+    shared_path = cache._object_path(cache.lookup('https://example.com/a')['sha256'])
+    cache.max_bytes = os.path.getsize(shared_path) + 10 # Room for one body only
+
+    cache.put('https://example.com/c', '<html>' + 'other ' * 200 + '</html>')
+
+    assert cache.lookup('https://example.com/a') is None and cache.lookup('https://example.com/b') is None
+    assert not os.path.exists(shared_path)
+    assert cache.read('https://example.com/c') is not None
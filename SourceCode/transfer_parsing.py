@@ -0,0 +1,104 @@
+# --- Parser for the footballtransfers.com player list pages (used by Problem4/Transfer_Player.py) ---
+# The XPath selectors are compiled once per thread. A page is parsed with lxml, and every column is
+# read across all rows of the table with one XPath evaluation, then converted to typed columns with vectorized pandas:
+#   player_name, team (text), price_eur (float, '€198.8M' -> 198800000.0), skill, pot (floats)
+import re
+import threading
+from urllib.parse import urlparse
+
+import lxml.html
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+PLAYER_COLUMNS = ['player_name', 'team', 'price_eur', 'skill', 'pot']
+PRICE_MULTIPLIERS = {'': 1.0, 'K': 1e3, 'M': 1e6, 'B': 1e9}
+PRICE_PATTERN = r'€\s*([\d.,]+)\s*([KMB]?)'
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# XPath expressions, compiled once per thread by _selectors() (compiled lxml XPath objects are not thread-safe,
+# and parse_player_table runs in the crawl threads of Transfer_Player.py)
+PLAYER_TABLE_XPATH = f"//table[{_has_class('similar-players-table')}]"
+TABLE_ROWS_XPATH = "./tbody/tr"
+PAGE_LINKS_XPATH = "//a/@href"
+# Per-column cell selectors, evaluated once over the whole table; a row takes its first cell in document order
+CELL_XPATHS = {
+    'skill': f"./tbody/tr//div[{_has_class('table-skill__skill')}]",
+    'pot': f"./tbody/tr//div[{_has_class('table-skill__pot')}]",
+    'player_name': f"./tbody/tr//td[{_has_class('td-player')}]//div[{_has_class('text')}]//a",
+    'team': f"./tbody/tr//span[{_has_class('td-team__teamname')}]",
+    'price': f"./tbody/tr//span[{_has_class('player-tag')}]",
+}
+
+_thread_selectors = threading.local()
+
+
+# Function to get this thread's compiled selectors (compiled on its first call)
+def _selectors():
+    if not hasattr(_thread_selectors, 'table'):
+        _thread_selectors.table = etree.XPath(PLAYER_TABLE_XPATH)
+        _thread_selectors.rows = etree.XPath(TABLE_ROWS_XPATH)
+        _thread_selectors.links = etree.XPath(PAGE_LINKS_XPATH)
+        _thread_selectors.cells = {column: etree.XPath(xpath) for column, xpath in CELL_XPATHS.items()}
+    return _thread_selectors
+
+# Function to read one column of the table: the text of the first matching cell of every row ('' when none)
+def extract_column(table, rows, cell_xpath):
+    row_index = {row: i for i, row in enumerate(rows)}
+    values = [None] * len(rows)
+    for cell in cell_xpath(table):
+        i = row_index.get(next(cell.iterancestors('tr'), None))
+        if i is not None and values[i] is None:
+            values[i] = cell.text_content()
+    return ['' if value is None else value.strip() for value in values]
+
+
+# Function to convert price text ('€198.8M', '€500K', '€1,200K') to euros as float64 (NaN if unparseable)
+def parse_price_eur(series):
+    parts = series.astype(str).str.extract(PRICE_PATTERN)
+    amount = pd.to_numeric(parts[0].str.replace(',', '', regex=False), errors='coerce')
+    return (amount * parts[1].map(PRICE_MULTIPLIERS)).round().astype('float64') # Whole euros: 4.1 * 1e6 is 4099999.9999999995
+
+# Function to split the legacy 'skill/pot' text ('92.8/100.0') into two float columns
+def split_skill_pot(series):
+    parts = series.astype(str).str.split('/', n=1, expand=True).reindex(columns=[0, 1])
+    return pd.to_numeric(parts[0], errors='coerce'), pd.to_numeric(parts[1], errors='coerce')
+
+# Function to bring a transfers table written before the typed columns ('price', 'skill/pot') to PLAYER_COLUMNS
+def upgrade_legacy_columns(df):
+    df = df.copy()
+    if 'price_eur' not in df.columns and 'price' in df.columns:
+        df['price_eur'] = parse_price_eur(df.pop('price'))
+    if 'skill/pot' in df.columns and not {'skill', 'pot'} <= set(df.columns):
+        df['skill'], df['pot'] = split_skill_pot(df.pop('skill/pot'))
+    return df
+
+# Function to parse a list page; returns (typed DataFrame of the complete rows, number of table rows)
+# or (None, 0) when the page has no player table
+def parse_player_table(html):
+    selectors = _selectors()
+    tables = selectors.table(lxml.html.fromstring(html))
+    if not tables:
+        return None, 0
+    rows = selectors.rows(tables[0])
+    raw = pd.DataFrame({column: extract_column(tables[0], rows, xpath) for column, xpath in selectors.cells.items()})
+    players = pd.DataFrame({
+        'player_name': raw['player_name'].replace('', np.nan),
+        'team': raw['team'].replace('', np.nan),
+        'price_eur': parse_price_eur(raw['price']),
+        'skill': pd.to_numeric(raw['skill'], errors='coerce'),
+        'pot': pd.to_numeric(raw['pot'], errors='coerce'),
+    }, columns=PLAYER_COLUMNS)
+    # Rows missing any field are skipped, as before; a price that is present but not a euro amount stays NaN
+    complete = players.drop(columns='price_eur').notna().all(axis=1) & (raw['price'] != '')
+    return players[complete].reset_index(drop=True), len(rows)
+
+# Function to find the number of list pages from the pagination links (largest '<base path>/<n>' link)
+def discover_page_count(html, base_url):
+    page_link = re.compile(re.escape(urlparse(base_url).path.rstrip('/')) + r'/(\d+)/?$') # e.g. /en/players/uk-premier-league/22
+    pages = [int(match.group(1)) for href in _selectors().links(lxml.html.fromstring(html))
+             if (match := page_link.search(urlparse(str(href)).path))]
+    return max(pages) if pages else None
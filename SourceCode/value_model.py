@@ -0,0 +1,254 @@
+# --- Transfer value estimation on the joined transfers + fbref table (player_query.PlayerTable) ---
+# A regression model predicts log(1 + price_eur) from the numeric fbref stats, the footballtransfers skill/pot
+# ratings and position flags:
+#   ridge - median imputation + standardization + Ridge
+#   hgb   - HistGradientBoostingRegressor (missing values are handled by the trees)
+# The hyperparameters are chosen by a k-fold grid search run on a process pool (GridSearchCV, n_jobs).
+# Only the fitted pipeline (plus feature list and CV table) is saved to artifacts/value_model.joblib.
+# load_value_model rebuilds a FastValueScorer from it: the same model reduced to plain numbers (one weight vector
+# for ridge, node lists for hgb), so one player is scored without going through sklearn's input validation.
+# Whole pools are scored in vectorized row batches.
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GridSearchCV, KFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from model_artifacts import ARTIFACT_DIR
+from player_query import TRANSFERS_CSV, PlayerTable, QueryError
+from results_io import RESULTS_FEATHER
+
+VALUE_MODEL_PATH = os.path.join(ARTIFACT_DIR, 'value_model.joblib')
+VALUE_MODELS = ('ridge', 'hgb')
+TARGET_COLUMN = 'price_eur'
+EXCLUDED_COLUMNS = {TARGET_COLUMN, 'match_score'} # Numeric columns of the joined table that are not features
+POSITIONS = ['GK', 'DF', 'MF', 'FW']
+# Fields of the fitted HistGradientBoostingRegressor's tree nodes read by the fast path (private sklearn layout,
+# checked with sklearn 1.9); when they are missing the scorer falls back to pipeline.predict
+TREE_NODE_FIELDS = ('feature_idx', 'num_threshold', 'missing_go_to_left', 'left', 'right', 'is_leaf', 'value')
+CV_FOLDS = 5
+SCORE_BATCH_SIZE = 4096
+PARAM_GRIDS = {
+    'ridge': {'model__alpha': [0.1, 1.0, 10.0, 100.0, 1000.0]},
+    'hgb': {'model__learning_rate': [0.05, 0.1], 'model__max_leaf_nodes': [15, 31]},
+}
+
+
+# Function to build the feature table: every numeric column (float64, NaN for missing) plus one 0/1 flag per position
+def build_features(df, feature_columns=None):
+    numeric = [col for col in df.columns if col not in EXCLUDED_COLUMNS
+               and pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+    features = pd.DataFrame({col: df[col].to_numpy(dtype='float64', na_value=np.nan) for col in numeric}, index=df.index)
+    codes = df['Position'].fillna('').astype(str).str.split(',') if 'Position' in df.columns else pd.Series([[]] * len(df), index=df.index)
+    for position in POSITIONS:
+        features[f'position_{position}'] = codes.map(lambda player_codes: float(position in player_codes))
+    return features.reindex(columns=feature_columns) if feature_columns is not None else features
+
+# Function to build the untrained pipeline of a model kind
+def make_value_pipeline(kind, random_state=42):
+    if kind == 'ridge':
+        return Pipeline([('impute', SimpleImputer(strategy='median', keep_empty_features=True)),
+                         ('scale', StandardScaler()), ('model', Ridge())])
+    if kind == 'hgb':
+        return Pipeline([('model', HistGradientBoostingRegressor(max_iter=200, random_state=random_state))])
+    raise ValueError(f"Unknown value model '{kind}' (expected one of {', '.join(VALUE_MODELS)})")
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# Function to get the node arrays of every tree of a fitted HistGradientBoostingRegressor,
+# or None when the private attributes are not laid out as expected
+def _tree_nodes(model):
+    predictors = getattr(model, '_predictors', None)
+    if predictors is None or getattr(model, '_baseline_prediction', None) is None:
+        return None
+    tree_nodes = [getattr(trees[0], 'nodes', None) if len(trees) == 1 else None for trees in predictors]
+    if any(nodes is None or not set(TREE_NODE_FIELDS) <= set(getattr(nodes.dtype, 'names', None) or ()) for nodes in tree_nodes):
+        return None
+    return tree_nodes
+
+
+class FastValueScorer:
+    """A fitted value pipeline as plain arrays/lists, for scoring single players quickly and batches without sklearn overhead."""
+
+    def __init__(self, pipeline, kind, feature_columns):
+        self.kind = kind
+        self.pipeline = pipeline
+        self.trees = None
+        self.feature_columns = list(feature_columns)
+        self.position_columns = {col: col[len('position_'):] for col in self.feature_columns if col.startswith('position_')}
+        if kind == 'ridge':
+            # impute -> (x - mean) / scale -> x.coef + intercept, folded into one weight vector and bias
+            scaler, ridge = pipeline.named_steps['scale'], pipeline.named_steps['model']
+            self.fill = pipeline.named_steps['impute'].statistics_.astype('float64')
+            self.weights = ridge.coef_ / scaler.scale_
+            self.bias = float(ridge.intercept_ - (ridge.coef_ * scaler.mean_ / scaler.scale_).sum())
+        else:
+            model = pipeline.named_steps['model']
+            tree_nodes = _tree_nodes(model)
+            if tree_nodes is not None:
+                self.baseline = float(np.ravel(model._baseline_prediction)[0])
+                # One tuple of node lists per tree (the leaf values already include the learning rate)
+                self.trees = [tuple(nodes[field].tolist() for field in TREE_NODE_FIELDS) for nodes in tree_nodes]
+            else:
+                print("Warning: unknown HistGradientBoosting layout in this sklearn version; single players are scored with predict().")
+
+    def feature_vector(self, record):
+        """Feature values of one player given as a dict / Series of the joined table's columns."""
+        positions = str(record.get('Position') or '').split(',')
+        return np.array([float(self.position_columns[col] in positions) if col in self.position_columns
+                         else _as_float(record.get(col, np.nan)) for col in self.feature_columns])
+
+    def _tree_log_value(self, x):
+        total = self.baseline
+        for feature, threshold, missing_left, left, right, is_leaf, value in self.trees:
+            node = 0
+            while not is_leaf[node]:
+                v = x[feature[node]]
+                node = left[node] if (missing_left[node] if v != v else v <= threshold[node]) else right[node]
+            total += value[node]
+        return total
+
+    def log_values(self, X):
+        """Predicted log(1 + value) for the rows of a 2D float array in feature_columns order."""
+        X = np.asarray(X, dtype='float64')
+        if self.kind == 'ridge':
+            return np.where(np.isnan(X), self.fill, X) @ self.weights + self.bias
+        if self.trees is None:
+            return self.pipeline.predict(pd.DataFrame(X, columns=self.feature_columns))
+        return np.array([self._tree_log_value(row.tolist()) for row in X])
+
+    def score_player(self, record):
+        """Estimated value in euros of one player (dict / Series of the joined table's columns)."""
+        x = self.feature_vector(record)
+        if self.kind == 'ridge':
+            return float(np.expm1(np.where(np.isnan(x), self.fill, x) @ self.weights + self.bias))
+        if self.trees is None:
+            return float(np.expm1(self.log_values(x[None, :])[0]))
+        return float(np.expm1(self._tree_log_value(x.tolist())))
+
+
+# Function to run the parallel grid search + CV and refit the best pipeline on all rows.
+# Returns the bundle to save (pipeline, feature list, CV table, ...); the scorer is built by load_value_model.
+def train_value_model(df, kind='ridge', folds=CV_FOLDS, workers=None, random_state=42):
+    df = df[df[TARGET_COLUMN].notna() & (df[TARGET_COLUMN] > 0)]
+    features = build_features(df)
+    target = np.log1p(df[TARGET_COLUMN].to_numpy(dtype='float64'))
+    search = GridSearchCV(make_value_pipeline(kind, random_state), PARAM_GRIDS[kind],
+                          cv=KFold(n_splits=min(folds, len(df)), shuffle=True, random_state=random_state),
+                          scoring={'mae_log': 'neg_mean_absolute_error', 'r2': 'r2'}, refit='mae_log',
+                          n_jobs=workers or -1) # Every (parameters, fold) fit is a separate job
+    search.fit(features, target)
+    cv_table = pd.DataFrame(search.cv_results_)[['params', 'mean_test_mae_log', 'std_test_mae_log', 'mean_test_r2', 'mean_fit_time']]
+    cv_table['mean_test_mae_log'] *= -1
+    return {'kind': kind, 'feature_columns': list(features.columns), 'pipeline': search.best_estimator_, 'best_params': search.best_params_,
+            'cv_results': cv_table, 'trained_rows': len(df), 'sklearn': sklearn.__version__,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+# Function to save the bundle (temp file + rename). Only sklearn objects and plain data are pickled,
+# never classes of this module, so the file loads the same whether training ran as a script or an import.
+def save_value_model(bundle, path=VALUE_MODEL_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump({key: value for key, value in bundle.items() if key != 'scorer'}, tmp_path)
+    os.replace(tmp_path, path)
+
+# Function to load the saved bundle and rebuild its FastValueScorer; returns None when there is none
+def load_value_model(path=VALUE_MODEL_PATH):
+    if not os.path.exists(path):
+        return None
+    bundle = joblib.load(path)
+    if bundle.get('sklearn') != sklearn.__version__:
+        print(f"Warning: the value model was trained with sklearn {bundle.get('sklearn')}, running {sklearn.__version__}.")
+    bundle['scorer'] = FastValueScorer(bundle['pipeline'], bundle['kind'], bundle['feature_columns'])
+    return bundle
+
+# Function to estimate the value of every row of `df` in vectorized batches of SCORE_BATCH_SIZE rows
+def score_pool(df, bundle, batch_size=SCORE_BATCH_SIZE):
+    scorer = bundle['scorer']
+    estimates = np.empty(len(df))
+    for start in range(0, len(df), batch_size):
+        block = df.iloc[start:start + batch_size]
+        X = build_features(block, scorer.feature_columns)
+        if scorer.kind == 'ridge':
+            estimates[start:start + batch_size] = np.expm1(scorer.log_values(X.to_numpy()))
+        else: # sklearn's tree predictor is compiled code, faster than the per-row walk for a whole batch
+            estimates[start:start + batch_size] = np.expm1(bundle['pipeline'].predict(X))
+    result = df[[col for col in ['Player', 'team', 'Position', 'Age', TARGET_COLUMN] if col in df.columns]].copy()
+    result['estimated_value_eur'] = estimates.round()
+    if TARGET_COLUMN in result.columns:
+        result['value_gap_eur'] = result['estimated_value_eur'] - result[TARGET_COLUMN] # > 0: cheaper than the model's estimate
+    return result.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train / apply the transfer value model on the joined transfers + fbref table")
+    parser.add_argument('mode', choices=['train', 'score', 'player'])
+    parser.add_argument('players', nargs='*', help="Player names (mode 'player')")
+    parser.add_argument('--model', choices=VALUE_MODELS, default='ridge')
+    parser.add_argument('--where', default=None, help="Only use / score the players matching this query (player_query.py syntax)")
+    parser.add_argument('--folds', type=int, default=CV_FOLDS)
+    parser.add_argument('--workers', type=int, default=None, help="Processes for the cross-validation (default: all cores)")
+    parser.add_argument('--model-path', default=VALUE_MODEL_PATH)
+    parser.add_argument('--output', default='value_estimates.csv', help="CSV written by mode 'score'")
+    parser.add_argument('--transfers', default=TRANSFERS_CSV)
+    parser.add_argument('--results', default=RESULTS_FEATHER, help="fbref results (.feather; the .csv is the fallback)")
+    args = parser.parse_args()
+
+    try:
+        table = PlayerTable.load(args.transfers, args.results, os.path.splitext(args.results)[0] + '.csv')
+        players = table.query(args.where) if args.where else table.df
+    except (FileNotFoundError, KeyError, pd.errors.EmptyDataError, QueryError) as e:
+        print(f"Error loading the player table: {e}")
+        sys.exit(1)
+    print(f"Loaded {len(players)} matched players.")
+
+    if args.mode == 'train':
+        start = time.perf_counter()
+        bundle = train_value_model(players, args.model, args.folds, args.workers)
+        print(f"Trained the {args.model} model on {bundle['trained_rows']} players in {time.perf_counter() - start:.1f} s "
+              f"({args.folds}-fold CV, best {bundle['best_params']}).")
+        print(bundle['cv_results'].to_string(index=False, float_format='%.4f'))
+        save_value_model(bundle, args.model_path)
+        print(f"Saved the value model to '{args.model_path}'.")
+        sys.exit(0)
+
+    bundle = load_value_model(args.model_path)
+    if bundle is None:
+        print(f"Error: no value model at '{args.model_path}'. Run 'python value_model.py train' first.")
+        sys.exit(1)
+
+    if args.mode == 'score':
+        start = time.perf_counter()
+        estimates = score_pool(players, bundle)
+        print(f"Scored {len(estimates)} players in {(time.perf_counter() - start) * 1000:.1f} ms ({bundle['kind']} model).")
+        estimates.sort_values('value_gap_eur' if 'value_gap_eur' in estimates.columns else 'estimated_value_eur',
+                              ascending=False).to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"Saved the estimates to '{args.output}'.")
+    else:
+        wanted = {name.casefold() for name in args.players}
+        records = [row for row in players.to_dict('records') if str(row['Player']).casefold() in wanted]
+        if not records:
+            print("Error: none of these players is in the joined table.")
+            sys.exit(1)
+        for record in records:
+            start = time.perf_counter()
+            estimate = bundle['scorer'].score_player(record)
+            elapsed = time.perf_counter() - start
+            print(f"{record['Player']} ({record.get('team', '')}): estimated €{estimate:,.0f}, "
+                  f"listed €{_as_float(record.get(TARGET_COLUMN)):,.0f} ({elapsed * 1e6:.0f} µs)")